@@ -4,20 +4,32 @@ Customer Support Agent using LangGraph
 from typing import Annotated, Optional
 from typing_extensions import TypedDict
 from datetime import datetime
-import uuid
+import asyncio
 import logging
+import weakref
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_core.messages import ToolMessage
-from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 
+from langgraph.errors import GraphBubbleUp
 from langgraph.graph.message import AnyMessage, add_messages
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, StateGraph, START
 from langgraph.prebuilt import tools_condition, ToolNode
 
-from .tools import ALL_TOOLS, SAFE_TOOLS, SENSITIVE_TOOLS, fetch_user_flight_information
+from .checkpoint import create_checkpointer
+from .history import HistoryManager, format_summary
+from .llm_cache import get_llm_cache
+from .metrics import INTERRUPTS, REPROMPTS, TOOL_ERRORS
+from .tool_output import compact_tool_message
+from .tools import (
+    ALL_TOOLS,
+    SAFE_TOOLS,
+    SENSITIVE_TOOLS,
+    fetch_user_flight_information,
+    itinerary_version,
+)
 from .config import settings
 
 # Configure logging
@@ -49,45 +61,74 @@ except ImportError:
 class State(TypedDict):
     messages: Annotated[list[AnyMessage], add_messages]
     user_info: Optional[str]
+    summary: Optional[str]  # Rolling summary of turns trimmed from messages
+    user_info_key: Optional[str]  # "<passenger_id>@<itinerary version>" user_info was built from
 
 
 class Assistant:
     def __init__(self, runnable: Runnable):
         self.runnable = runnable
     
-    def __call__(self, state: State, config: RunnableConfig):
+    def _log_call(self, state: State):
         if settings.verbose_logging:
             logger.info(f"🤖 Assistant called with {len(state.get('messages', []))} messages")
             if state.get('messages'):
                 last_msg = state['messages'][-1]
                 logger.info(f"📝 Last message: {type(last_msg).__name__} - {getattr(last_msg, 'content', '')[:100]}...")
+    
+    def _reprompt_state(self, state: State, result) -> Optional[State]:
+        """Return the state to retry with if the LLM gave an empty response, else None"""
+        if settings.verbose_logging:
+            logger.info(f"🔍 LLM Response: {result.content[:200] if result.content else 'No content'}...")
+            if hasattr(result, 'tool_calls') and result.tool_calls:
+                logger.info(f"🔧 Tool calls requested: {[call.get('name', 'unknown') for call in result.tool_calls]}")
         
-        while True:
-            result = self.runnable.invoke(state)
-            
+        # If the LLM happens to return an empty response, we will re-prompt it
+        if not result.tool_calls and (
+            not result.content
+            or isinstance(result.content, list)
+            and not result.content[0].get("text")
+        ):
+            messages = state["messages"] + [("user", "Respond with a real output.")]
+            REPROMPTS.inc()
             if settings.verbose_logging:
-                logger.info(f"🔍 LLM Response: {result.content[:200] if result.content else 'No content'}...")
-                if hasattr(result, 'tool_calls') and result.tool_calls:
-                    logger.info(f"🔧 Tool calls requested: {[call.get('name', 'unknown') for call in result.tool_calls]}")
-            
-            # If the LLM happens to return an empty response, we will re-prompt it
-            if not result.tool_calls and (
-                not result.content
-                or isinstance(result.content, list)
-                and not result.content[0].get("text")
-            ):
-                messages = state["messages"] + [("user", "Respond with a real output.")]
-                state = {**state, "messages": messages}
-                if settings.verbose_logging:
-                    logger.warning("⚠️ Empty response, re-prompting...")
-            else:
+                logger.warning("⚠️ Empty response, re-prompting...")
+            return {**state, "messages": messages}
+        return None
+    
+    def __call__(self, state: State, config: RunnableConfig):
+        self._log_call(state)
+        while True:
+            result = self.runnable.invoke(state, config)
+            retry_state = self._reprompt_state(state, result)
+            if retry_state is None:
+                break
+            state = retry_state
+        return {"messages": result}
+    
+    async def acall(self, state: State, config: RunnableConfig):
+        """Async variant used by ainvoke/astream so the LLM call never blocks the event loop"""
+        self._log_call(state)
+        while True:
+            result = await self.runnable.ainvoke(state, config)
+            retry_state = self._reprompt_state(state, result)
+            if retry_state is None:
                 break
+            state = retry_state
         return {"messages": result}
+    
+    def as_runnable(self) -> Runnable:
+        return RunnableLambda(self, afunc=self.acall, name="assistant")
 
 
 def handle_tool_error(state) -> dict:
     error = state.get("error")
+    if isinstance(error, GraphBubbleUp):
+        # Not a tool failure: the fallback re-raises it for the graph to pause on
+        raise error
     tool_calls = state["messages"][-1].tool_calls
+    for tc in tool_calls:
+        TOOL_ERRORS.labels(tc["name"], "fallback").inc()
     return {
         "messages": [
             ToolMessage(
@@ -99,14 +140,124 @@ def handle_tool_error(state) -> dict:
     }
 
 
-def create_tool_node_with_fallback(tools: list) -> ToolNode:
-    return ToolNode(tools).with_fallbacks(
+class ToolCallLimiter:
+    """Per-call concurrency cap, timeout and error isolation for a ToolNode.
+
+    ToolNode already runs the calls of one AI message concurrently; this
+    bounds how many run at once across the process and gives each call its
+    own timeout, so one slow search can't hold up the turn. A call that
+    times out or raises becomes an error ToolMessage for that call alone,
+    instead of the fallback replacing every result with the error.
+
+    Timeouts apply on the async path only. A timed-out sync tool keeps its
+    executor thread until it returns; only its result is discarded.
+    """
+
+    def __init__(self, max_concurrency: int, default_timeout: float, timeouts: Optional[dict] = None):
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        # asyncio primitives are bound to one event loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def timeout_for(self, name: str) -> Optional[float]:
+        return self.timeouts.get(name, self.default_timeout) or None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    @staticmethod
+    def _error(request, content: str, reason: str = "exception") -> ToolMessage:
+        call = request.tool_call
+        TOOL_ERRORS.labels(call["name"], reason).inc()
+        return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"], status="error")
+
+    def __call__(self, request, execute):
+        try:
+            return execute(request)
+        except GraphBubbleUp:
+            # interrupt() and other graph control flow must reach the graph
+            raise
+        except Exception as e:
+            return self._error(request, f"Error: {repr(e)}\n please fix your mistakes.")
+
+    async def acall(self, request, execute):
+        name = request.tool_call["name"]
+        timeout = self.timeout_for(name)
+        async with self._semaphore():
+            try:
+                return await asyncio.wait_for(execute(request), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Tool {name} timed out after {timeout}s")
+                return self._error(
+                    request, f"Error: {name} timed out after {timeout}s. Try again or use another tool.", "timeout"
+                )
+            except GraphBubbleUp:
+                raise
+            except Exception as e:
+                return self._error(request, f"Error: {repr(e)}\n please fix your mistakes.")
+
+
+def create_tool_node_with_fallback(tools: list, limiter: Optional[ToolCallLimiter] = None) -> ToolNode:
+    """Tool node whose results reach the model compactly encoded, optionally behind a limiter"""
+
+    def wrap_tool_call(request, execute):
+        return compact_tool_message(limiter(request, execute) if limiter else execute(request))
+
+    async def awrap_tool_call(request, execute):
+        return compact_tool_message(await (limiter.acall(request, execute) if limiter else execute(request)))
+
+    return ToolNode(tools, wrap_tool_call=wrap_tool_call, awrap_tool_call=awrap_tool_call).with_fallbacks(
         [RunnableLambda(handle_tool_error)], exception_key="error"
     )
 
 
+def create_safe_tool_limiter() -> ToolCallLimiter:
+    return ToolCallLimiter(
+        max_concurrency=settings.tool_max_concurrency,
+        default_timeout=settings.tool_timeout,
+        timeouts=settings.tool_timeouts,
+    )
+
+
+def user_info_key(config: RunnableConfig) -> Optional[str]:
+    """Cache key for the user info of the configured passenger, None if it can't be cached"""
+    passenger_id = config.get("configurable", {}).get("passenger_id")
+    if not passenger_id:
+        return None
+    version = itinerary_version(passenger_id)
+    if version is None:
+        return None
+    return f"{passenger_id}@{version}"
+
+
 def get_llm():
+    """Get the best available LLM, with the response cache attached if enabled"""
+    llm = create_llm()
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        llm.cache = llm_cache
+    return llm
+
+
+def create_summarizer_llm():
+    """Chat model for history summaries: uncached, and None with the fake provider"""
+    if settings.llm_provider == "fake":
+        # The echo model would wrap the previous summary in the new one every turn;
+        # the extractive summary is the offline stand-in
+        return None
+    return create_llm()
+
+
+def create_llm():
     """Get the best available LLM based on API keys"""
+    if settings.llm_provider == "fake":
+        from .fake_llm import FakeChatModel
+        return FakeChatModel(latency=settings.fake_llm_latency)
     if GEMINI_AVAILABLE:
         return ChatGoogleGenerativeAI(
             model="gemini-2.0-flash",
@@ -141,37 +292,58 @@ def create_customer_support_agent():
             "Use the provided tools to search for flights, company policies, and other information to assist the user's queries. "
             "When searching, be persistent. Expand your query bounds if the first search returns no results. "
             "If a search comes up empty, expand your search before giving up. "
+            "Hotel, car rental and excursion searches return one page of results; "
+            "only request the next page (with next_cursor) if the user needs more options. "
+            "Pass the user's price tier and dates to those searches instead of filtering the results yourself. "
             "Always be polite, professional, and helpful. "
             "Current user info: {user_info} "
+            "{conversation_summary}"
             "Current time: {time}.",
         ),
         ("placeholder", "{messages}"),
     ]).partial(time=datetime.now)
     
     # Create assistant runnable
-    assistant_runnable = assistant_prompt | llm.bind_tools(ALL_TOOLS)
+    assistant_runnable = (
+        RunnablePassthrough.assign(conversation_summary=format_summary)
+        | assistant_prompt
+        | llm.bind_tools(ALL_TOOLS)
+    )
     
     # Define state graph
     builder = StateGraph(State)
     
-    def user_info(state: State):
-        """Fetch user info at the start"""
+    def user_info(state: State, config: RunnableConfig):
+        """Fetch the configured passenger's itinerary info"""
         try:
-            config = RunnableConfig(configurable={"passenger_id": "3442 587242"})  # Default for demo
+            # Read the version first so a change committed meanwhile triggers another refresh
+            key = user_info_key(config)
             user_flights = fetch_user_flight_information.invoke({}, config)
-            return {"user_info": f"User has {len(user_flights)} flight bookings"}
+            return {"user_info": f"User has {len(user_flights)} flight bookings", "user_info_key": key}
         except Exception as e:
-            return {"user_info": f"Could not fetch user info: {str(e)}"}
+            return {"user_info": f"Could not fetch user info: {str(e)}", "user_info_key": None}
+    
+    def route_entry(state: State, config: RunnableConfig):
+        """Skip fetch_user_info while this thread's cached user info is current"""
+        # Under ainvoke LangGraph runs sync edge functions on executor threads, so
+        # user_info_key's itinerary-version read (one primary-key lookup) never
+        # blocks the event loop; it does hold a thread for the duration
+        key = user_info_key(config)
+        if key is not None and state.get("user_info_key") == key:
+            return "manage_history"
+        return "fetch_user_info"
     
     # Add nodes
     builder.add_node("fetch_user_info", user_info)
-    builder.add_node("assistant", Assistant(assistant_runnable))
-    builder.add_node("safe_tools", create_tool_node_with_fallback(SAFE_TOOLS))
+    builder.add_node("manage_history", HistoryManager(create_summarizer_llm()).as_runnable())
+    builder.add_node("assistant", Assistant(assistant_runnable).as_runnable())
+    builder.add_node("safe_tools", create_tool_node_with_fallback(SAFE_TOOLS, create_safe_tool_limiter()))
     builder.add_node("sensitive_tools", create_tool_node_with_fallback(SENSITIVE_TOOLS))
     
     # Add edges
-    builder.add_edge(START, "fetch_user_info")
-    builder.add_edge("fetch_user_info", "assistant")
+    builder.add_conditional_edges(START, route_entry, ["fetch_user_info", "manage_history"])
+    builder.add_edge("fetch_user_info", "manage_history")
+    builder.add_edge("manage_history", "assistant")
     
     def route_tools(state: State):
         """Route to appropriate tool node based on tool type"""
@@ -187,6 +359,8 @@ def create_customer_support_agent():
         sensitive_tool_names = {t.name for t in SENSITIVE_TOOLS}
         for tool_call in ai_message.tool_calls:
             if tool_call["name"] in sensitive_tool_names:
+                # The graph stops here for approval (interrupt_before)
+                INTERRUPTS.labels("sensitive_tools").inc()
                 return "sensitive_tools"
         
         return "safe_tools"
@@ -199,8 +373,8 @@ def create_customer_support_agent():
     builder.add_edge("safe_tools", "assistant")
     builder.add_edge("sensitive_tools", "assistant")
     
-    # Create checkpointer
-    memory = MemorySaver()
+    # Create checkpointer (in-memory or shared SQLite, per settings)
+    memory = create_checkpointer()
     
     # Compile graph with interrupt before sensitive tools
     graph = builder.compile(
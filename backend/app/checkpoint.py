@@ -0,0 +1,279 @@
+"""
+Graph checkpointer selection: in-process memory or a shared SQLite file
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from .config import settings
+from .metrics import instrument_checkpointer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Open aiosqlite connections, closed on application shutdown
+_connections = []
+
+# Bounded in-memory savers swept by run_session_sweeper()
+_bounded_savers = []
+
+try:
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    SQLITE_CHECKPOINTER_AVAILABLE = True
+except ImportError:
+    SQLITE_CHECKPOINTER_AVAILABLE = False
+
+
+if SQLITE_CHECKPOINTER_AVAILABLE:
+    class DurableSqliteSaver(AsyncSqliteSaver):
+        """AsyncSqliteSaver tuned for several worker processes sharing one file.
+
+        The base class already switches the file to WAL; this adds the same
+        synchronous level as the travel database. The connection's busy
+        timeout lets a worker wait out another worker's write instead of
+        failing with "database is locked".
+        """
+
+        async def setup(self) -> None:
+            if self.is_setup:
+                return
+            await super().setup()
+            await self.conn.execute(f"PRAGMA synchronous={settings.db_synchronous}")
+
+
+class BoundedMemorySaver(MemorySaver):
+    """MemorySaver that cannot grow without bound.
+
+    * ``max_sessions``: least recently used threads are evicted past this many.
+    * ``max_checkpoints_per_thread``: older checkpoints of a thread (and the
+      writes and channel blobs only they reference) are pruned, keeping the
+      latest ones, which is all resuming or approving needs.
+    * ``idle_ttl``: threads untouched for this many seconds are dropped by
+      ``sweep()``, which ``run_session_sweeper`` calls periodically.
+
+    A value of 0 disables that bound.
+    """
+
+    def __init__(self, *, max_sessions: int = 0, max_checkpoints_per_thread: int = 0,
+                 idle_ttl: float = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.idle_ttl = idle_ttl
+        self.evicted = 0
+        self.expired = 0
+        # Serialized bytes held, kept up to date by every put, prune and delete
+        self._bytes = 0
+        self._last_access: OrderedDict[str, float] = OrderedDict()
+        # thread_id -> keys into self.blobs / self.writes, so dropping a thread is O(its size)
+        self._blob_keys = defaultdict(set)
+        self._write_keys = defaultdict(set)
+        self._lock = threading.RLock()
+
+    def _checkpoint_bytes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> int:
+        entry = self.storage.get(thread_id, {}).get(checkpoint_ns, {}).get(checkpoint_id)
+        return len(entry[0][1]) + len(entry[1][1]) if entry else 0
+
+    def _write_bytes(self, key: tuple) -> int:
+        return sum(len(value[1]) for _, _, value, _ in self.writes.get(key, {}).values())
+
+    def _blob_bytes(self, key: tuple) -> int:
+        blob = self.blobs.get(key)
+        return len(blob[1]) if blob else 0
+
+    def _touch(self, thread_id: str):
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            # Avoid the defaultdict creating empty entries for unknown threads
+            if thread_id not in self.storage:
+                return None
+            self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        blob_keys = [(thread_id, checkpoint_ns, channel, version) for channel, version in new_versions.items()]
+        with self._lock:
+            self._bytes -= self._checkpoint_bytes(thread_id, checkpoint_ns, checkpoint["id"]) + sum(
+                map(self._blob_bytes, blob_keys)
+            )
+            result = super().put(config, checkpoint, metadata, new_versions)
+            self._bytes += self._checkpoint_bytes(thread_id, checkpoint_ns, checkpoint["id"]) + sum(
+                map(self._blob_bytes, blob_keys)
+            )
+            self._blob_keys[thread_id].update(blob_keys)
+            self._touch(thread_id)
+            self._prune_checkpoints(thread_id, checkpoint_ns)
+            self._evict_lru(keep=thread_id)
+            return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        key = (thread_id, config["configurable"].get("checkpoint_ns", ""), config["configurable"]["checkpoint_id"])
+        with self._lock:
+            self._bytes -= self._write_bytes(key)
+            super().put_writes(config, writes, task_id, task_path)
+            self._bytes += self._write_bytes(key)
+            self._write_keys[thread_id].add(key)
+            self._touch(thread_id)
+
+    def delete_thread(self, thread_id: str):
+        with self._lock:
+            for checkpoints in self.storage.pop(thread_id, {}).values():
+                for checkpoint, metadata, _ in checkpoints.values():
+                    self._bytes -= len(checkpoint[1]) + len(metadata[1])
+            for key in self._write_keys.pop(thread_id, ()):
+                self._bytes -= self._write_bytes(key)
+                self.writes.pop(key, None)
+            for key in self._blob_keys.pop(thread_id, ()):
+                self._bytes -= self._blob_bytes(key)
+                self.blobs.pop(key, None)
+            self._last_access.pop(thread_id, None)
+
+    def _prune_checkpoints(self, thread_id: str, checkpoint_ns: str):
+        if not self.max_checkpoints_per_thread:
+            return
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        excess = len(checkpoints) - self.max_checkpoints_per_thread
+        if excess <= 0:
+            return
+        # Checkpoint ids are time-ordered, so sorting them sorts by age
+        ordered = sorted(checkpoints)
+        oldest_kept = self.serde.loads_typed(checkpoints[ordered[excess]][0])["channel_versions"]
+        for checkpoint_id in ordered[:excess]:
+            self._bytes -= self._checkpoint_bytes(thread_id, checkpoint_ns, checkpoint_id)
+            pruned = self.serde.loads_typed(checkpoints.pop(checkpoint_id)[0])
+            write_key = (thread_id, checkpoint_ns, checkpoint_id)
+            self._bytes -= self._write_bytes(write_key)
+            self.writes.pop(write_key, None)
+            self._write_keys[thread_id].discard(write_key)
+            # A blob is still needed if a kept checkpoint can reference it; versions only grow
+            for channel, version in pruned["channel_versions"].items():
+                kept_version = oldest_kept.get(channel)
+                if kept_version is not None and version < kept_version:
+                    blob_key = (thread_id, checkpoint_ns, channel, version)
+                    self._bytes -= self._blob_bytes(blob_key)
+                    self.blobs.pop(blob_key, None)
+                    self._blob_keys[thread_id].discard(blob_key)
+
+    def _evict_lru(self, keep: str):
+        if not self.max_sessions:
+            return
+        while len(self._last_access) > self.max_sessions:
+            oldest = next(iter(self._last_access))
+            if oldest == keep:
+                break
+            self.delete_thread(oldest)
+            self.evicted += 1
+
+    def sweep(self) -> int:
+        """Drop threads idle for longer than ``idle_ttl``; returns how many"""
+        if not self.idle_ttl:
+            return 0
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            # _last_access is in access order, so stop at the first fresh thread
+            idle = []
+            for thread_id, last_access in self._last_access.items():
+                if last_access > cutoff:
+                    break
+                idle.append(thread_id)
+            for thread_id in idle:
+                self.delete_thread(thread_id)
+            self.expired += len(idle)
+        return len(idle)
+
+    def held_bytes(self) -> int:
+        """Serialized bytes of every checkpoint, write and blob, counted from scratch"""
+        with self._lock:
+            checkpoint_bytes = sum(
+                len(checkpoint[1]) + len(metadata[1])
+                for namespaces in self.storage.values()
+                for checkpoints in namespaces.values()
+                for checkpoint, metadata, _ in checkpoints.values()
+            )
+            write_bytes = sum(
+                len(value[1])
+                for writes in self.writes.values()
+                for _, _, value, _ in writes.values()
+            )
+            return checkpoint_bytes + write_bytes + sum(len(blob[1]) for blob in self.blobs.values())
+
+    def stats(self) -> dict:
+        """Gauges for live sessions and the serialized bytes this saver holds, in O(1)"""
+        with self._lock:
+            return {
+                "live_sessions": len(self._last_access),
+                "bytes_held": self._bytes,
+                "evicted_sessions": self.evicted,
+                "expired_sessions": self.expired,
+            }
+
+
+def session_stats() -> dict:
+    """Combined gauges of every bounded in-memory saver in this process"""
+    totals = {"live_sessions": 0, "bytes_held": 0, "evicted_sessions": 0, "expired_sessions": 0}
+    for saver in _bounded_savers:
+        for key, value in saver.stats().items():
+            totals[key] += value
+    return totals
+
+
+async def run_session_sweeper(interval: float = None):
+    """Background task expiring idle sessions until cancelled"""
+    interval = interval or settings.session_sweep_interval
+    while True:
+        await asyncio.sleep(interval)
+        for saver in list(_bounded_savers):
+            expired = saver.sweep()
+            if expired:
+                logger.info(f"Expired {expired} idle sessions")
+
+
+def create_checkpointer():
+    """Build the checkpointer selected by ``settings.checkpointer``.
+
+    ``memory`` keeps sessions in this process only, bounded by the
+    ``session_*`` settings (see BoundedMemorySaver). ``sqlite`` stores them in
+    ``settings.checkpoint_db``, so any worker can resume any thread_id,
+    including approvals pending before ``sensitive_tools``. It has to be
+    created inside the running event loop that will use it.
+    """
+    if settings.checkpointer == "sqlite":
+        if not SQLITE_CHECKPOINTER_AVAILABLE:
+            raise ValueError(
+                "CHECKPOINTER=sqlite requires the langgraph-checkpoint-sqlite and aiosqlite packages"
+            )
+        conn = aiosqlite.connect(settings.checkpoint_db, timeout=settings.db_busy_timeout)
+        _connections.append(conn)
+        logger.info(f"Using SQLite checkpointer at {settings.checkpoint_db}")
+        return instrument_checkpointer(DurableSqliteSaver(conn))
+    if settings.checkpointer != "memory":
+        raise ValueError(f"Unknown checkpointer '{settings.checkpointer}' (expected 'memory' or 'sqlite')")
+    saver = BoundedMemorySaver(
+        max_sessions=settings.session_max_sessions,
+        max_checkpoints_per_thread=settings.session_max_checkpoints,
+        idle_ttl=settings.session_idle_ttl,
+    )
+    _bounded_savers.append(saver)
+    return instrument_checkpointer(saver)
+
+
+async def close_checkpointers():
+    """Close the SQLite checkpointer connections opened by this process"""
+    while _connections:
+        conn = _connections.pop()
+        try:
+            await conn.close()
+        except Exception as e:
+            logger.warning(f"Error closing checkpointer connection: {e}")
@@ -2,13 +2,22 @@
 Application configuration
 """
 import os
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite:///./travel2.sqlite"
+    db_busy_timeout: float = 5.0  # Seconds to wait on a locked database
+    db_synchronous: str = "NORMAL"  # Safe with WAL, far fewer fsyncs than FULL
+    db_mmap_size: int = 256 * 1024 * 1024  # Bytes of the DB file to memory-map
+    db_cache_size_kb: int = 64 * 1024  # Page cache per pooled connection
+    db_statement_cache_size: int = 256  # Prepared statements kept per connection
+    date_shift_chunk_rows: int = 50_000  # Rows per UPDATE when shifting sample dates at startup
+    date_shift_min_seconds: float = 3600.0  # Skip the startup date shift if less time than this has passed
+    sample_db_source: str = "download"  # "download" the travel2 sample or "generate" a synthetic one
+    sample_db_passengers: int = 10_000  # Size of the generated database (about 8 rows per passenger)
     
     # API Keys
     tavily_api_key: str = ""
@@ -25,6 +34,63 @@ class Settings(BaseSettings):
     debug: bool = True
     log_level: str = "INFO"
     verbose_logging: bool = False  # Set to True for detailed tool/agent logging
+    llm_provider: str = "auto"  # "auto" picks by API key; "fake" uses the offline FakeChatModel
+    fake_llm_latency: float = 0.0  # Simulated provider latency for the fake model, in seconds
+    llm_cache: bool = False  # Serve repeated prompts from a local SQLite cache (use with a low temperature)
+    llm_cache_db: str = ".cache/llm_cache.sqlite"
+    llm_cache_ttl: float = 24 * 3600.0  # Seconds a cached response stays valid (0 = forever)
+    llm_cache_max_entries: int = 10_000  # Least recently used responses evicted beyond this
+    tool_executor_workers: int = 32  # Threads for sync tools/DB calls offloaded from the event loop
+    tool_max_concurrency: int = 32  # Safe tool calls running at once across all sessions
+    tool_timeout: float = 30.0  # Seconds before a safe tool call is reported as timed out (0 = no limit)
+    tool_timeouts: Dict[str, float] = {"tavily_search": 15.0, "lookup_policy": 10.0}  # Per-tool overrides
+    search_page_size: int = 10  # Hotel/car/excursion rows per page when the assistant doesn't ask for a limit
+    search_max_rows: int = 50  # Cap on rows per page, whatever limit the assistant asks for
+    search_rank_candidates: int = 1000  # Best full-text matches a search can page through (the rest are flagged)
+    compact_tool_results: bool = True  # Send tool results to the model as compact tables instead of JSON
+    tool_result_max_chars: int = 8000  # Tool results are cut to this many characters, with a marker (0 = no limit)
+    metrics_enabled: bool = True  # Serve Prometheus metrics at /metrics (needs prometheus_client)
+    trace_enabled: bool = False  # Record a span timeline per chat request, served at /debug/requests/{session_id}
+    trace_token: str = ""  # When set, /debug/requests needs it in the X-Debug-Token header
+    trace_buffer_size: int = 200  # Most recent request timelines kept in memory
+    trace_max_spans: int = 1000  # Spans kept per request; later ones are only counted
+    trace_slow_threshold: float = 10.0  # Requests slower than this (seconds) are written to trace_slow_log (0 = never)
+    trace_slow_log: str = ".cache/slow_requests.jsonl"
+    
+    # Sessions
+    checkpointer: str = "memory"  # "memory" (single process) or "sqlite" (shared by all workers, survives restarts)
+    checkpoint_db: str = "checkpoints.sqlite"
+    session_max_sessions: int = 1000  # In-memory only: least recently used threads evicted beyond this (0 = unbounded)
+    session_max_checkpoints: int = 20  # In-memory only: checkpoints kept per thread (0 = all)
+    session_idle_ttl: float = 3600.0  # In-memory only: seconds before an idle thread is dropped (0 = never)
+    session_sweep_interval: float = 60.0  # Seconds between idle-session sweeps
+    history_max_turns: int = 6  # User turns kept verbatim; older ones are folded into the summary (0 = all)
+    history_token_budget: int = 6000  # Approximate tokens of kept history before more turns are folded (0 = no limit)
+    history_tool_result_turns: int = 2  # Turns whose tool results are kept in full; older ones are stubbed
+    history_summary_llm: bool = True  # Summarize with the chat model; False uses a cheap extractive summary
+    history_summary_max_chars: int = 2000  # Cap on the rolling summary
+    
+    # Policy retrieval
+    policy_faq_cache: str = ".cache/swiss_faq.md"  # Local copy of the FAQ; also the fallback if a download fails
+    policy_faq_max_age: float = 86400.0  # Seconds before startup re-downloads the FAQ copy (0 = never)
+    policy_faq_refresh: bool = False  # Re-download the FAQ at every startup, whatever the copy's age
+    embedding_cache_dir: str = ".cache/embeddings"  # vectors-<digest>.npy + manifest.json keyed by content hash
+    embedding_batch_size: int = 100  # Chunks per embed_documents call
+    query_cache_size: int = 1024  # Normalized policy queries kept (embeddings and top-k results)
+    query_cache_ttl: float = 3600.0  # Seconds before a cached query is re-embedded
+    policy_index_int8: bool = False  # Store policy vectors as int8 (4x less memory, scores off by ~0.001)
+    policy_retrieval: str = "hybrid"  # "hybrid" (BM25 fused with vectors), "bm25" (offline only) or "vector"
+    policy_fusion_candidates: int = 20  # Results from each ranking fed to reciprocal rank fusion
+    policy_rrf_k: int = 60  # Reciprocal rank fusion constant: higher flattens the weight of top ranks
+    policy_embedding_retry: float = 60.0  # Seconds policy lookups use BM25 alone after an embedding call fails
+    policy_setup_retry: float = 60.0  # Seconds before a failed policy retriever setup (e.g. FAQ download) is retried
+    
+    # Web search
+    web_search_backend: str = "tavily"  # "tavily" or "stub" (offline, for CI/benchmarks)
+    web_search_cache_size: int = 512  # Normalized queries kept with their formatted results
+    web_search_cache_ttl: float = 900.0  # Seconds before a query hits the backend again
+    web_search_stub_file: str = ""  # Optional JSON {query: [{title, content, url}]} for the stub
+    web_search_stub_latency: float = 0.0  # Simulated round trip of the stub, in seconds
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
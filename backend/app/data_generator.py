@@ -0,0 +1,360 @@
+"""
+Synthetic travel2-schema database generator for scale testing
+"""
+import argparse
+import logging
+import math
+import os
+import random
+import sqlite3
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Hubs first: airport and city popularity fall off Zipf-style down these lists
+AIRPORTS = ["ZRH", "GVA", "BSL", "FRA", "LHR", "CDG", "AMS", "MUC", "VIE", "FCO", "MAD", "BCN"]
+CITIES = ["Zurich", "Geneva", "Basel", "Paris", "London", "Frankfurt", "Amsterdam", "Munich"]
+PRICE_TIERS = ["Economy", "Midscale", "Upper Midscale", "Upscale", "Luxury"]
+PRICE_TIER_WEIGHTS = [25, 35, 20, 15, 5]
+KEYWORDS = ["museum", "history", "hiking", "lake", "food", "wine", "art", "skiing", "boat", "castle"]
+FARE_CONDITIONS = ["Economy", "Comfort", "Business"]
+FARE_WEIGHTS = [80, 8, 12]
+FARE_PRICE = {"Economy": (80, 600), "Comfort": (300, 900), "Business": (700, 3000)}
+# (code, name, city, (longitude, latitude), timezone) for every airport in AIRPORTS
+AIRPORT_DATA = [
+    ("ZRH", "Zurich Airport", "Zurich", (8.5492, 47.4647), "Europe/Zurich"),
+    ("GVA", "Geneva Airport", "Geneva", (6.1090, 46.2381), "Europe/Zurich"),
+    ("BSL", "EuroAirport Basel Mulhouse Freiburg", "Basel", (7.5299, 47.5896), "Europe/Zurich"),
+    ("FRA", "Frankfurt Airport", "Frankfurt", (8.5706, 50.0333), "Europe/Berlin"),
+    ("LHR", "Heathrow Airport", "London", (-0.4543, 51.4700), "Europe/London"),
+    ("CDG", "Charles de Gaulle Airport", "Paris", (2.5479, 49.0097), "Europe/Paris"),
+    ("AMS", "Amsterdam Airport Schiphol", "Amsterdam", (4.7634, 52.3105), "Europe/Amsterdam"),
+    ("MUC", "Munich Airport", "Munich", (11.7861, 48.3538), "Europe/Berlin"),
+    ("VIE", "Vienna International Airport", "Vienna", (16.5697, 48.1103), "Europe/Vienna"),
+    ("FCO", "Rome Fiumicino Airport", "Rome", (12.2508, 41.8003), "Europe/Rome"),
+    ("MAD", "Madrid Barajas Airport", "Madrid", (-3.5676, 40.4983), "Europe/Madrid"),
+    ("BCN", "Barcelona El Prat Airport", "Barcelona", (2.0785, 41.2974), "Europe/Madrid"),
+]
+# (code, model, range in km) of the aircraft flights are assigned
+AIRCRAFT = [
+    ("320", "Airbus A320-200", 5700),
+    ("321", "Airbus A321-200", 5600),
+    ("319", "Airbus A319-100", 6700),
+    ("773", "Boeing 777-300", 11100),
+    ("CR2", "Bombardier CRJ-200", 2700),
+]
+# Seat rows per aircraft (boarding passes use rows 1-30, seats A-F): Business, Comfort, then Economy
+BUSINESS_ROWS, COMFORT_ROWS, SEAT_ROWS = 4, 7, 30
+
+SCHEMA = """
+CREATE TABLE flights (
+    flight_id INTEGER, flight_no TEXT, scheduled_departure TEXT, scheduled_arrival TEXT,
+    departure_airport TEXT, arrival_airport TEXT, status TEXT, aircraft_code TEXT,
+    actual_departure TEXT, actual_arrival TEXT
+);
+CREATE TABLE bookings (book_ref TEXT, book_date TEXT, total_amount INTEGER);
+CREATE TABLE tickets (ticket_no TEXT, book_ref TEXT, passenger_id TEXT);
+CREATE TABLE ticket_flights (ticket_no TEXT, flight_id INTEGER, fare_conditions TEXT, amount INTEGER);
+CREATE TABLE boarding_passes (ticket_no TEXT, flight_id INTEGER, boarding_no INTEGER, seat_no TEXT);
+CREATE TABLE car_rentals (
+    id INTEGER, name TEXT, location TEXT, price_tier TEXT, start_date TEXT, end_date TEXT, booked INTEGER
+);
+CREATE TABLE hotels (
+    id INTEGER, name TEXT, location TEXT, price_tier TEXT, checkin_date TEXT, checkout_date TEXT, booked INTEGER
+);
+CREATE TABLE trip_recommendations (
+    id INTEGER, name TEXT, location TEXT, keywords TEXT, details TEXT, booked INTEGER
+);
+CREATE TABLE aircrafts_data (aircraft_code TEXT, model TEXT, range INTEGER);
+CREATE TABLE airports_data (
+    airport_code TEXT, airport_name TEXT, city TEXT, coordinates TEXT, timezone TEXT
+);
+CREATE TABLE seats (aircraft_code TEXT, seat_no TEXT, fare_conditions TEXT);
+"""
+
+# The sample data is in US Eastern (summer) time
+TZ = timezone(timedelta(hours=-4))
+NULL_TIMESTAMP = "\\N"
+DAY = 86400
+
+# The frontend's and CLI's default passenger, so the demo has bookings on generated data too
+DEMO_PASSENGER_ID = "3442 587242"
+
+
+def passenger_id(n: int) -> str:
+    """Passenger id of the n-th generated passenger, in the sample's "1234 567890" form.
+
+    Passenger 0 is the demo passenger.
+    """
+    if n == 0:
+        return DEMO_PASSENGER_ID
+    return f"{3000 + n % 7000:04d} {n:06d}"
+
+
+def ticket_no(n: int, leg: int) -> str:
+    """Ticket number of the n-th passenger's leg-th ticket"""
+    return f"{n:010d}{leg:03d}"
+
+
+def _zipf_weights(count: int, exponent: float = 1.0) -> list[float]:
+    return [1 / (rank + 1) ** exponent for rank in range(count)]
+
+
+def _ts(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, TZ).isoformat(" ", timespec="microseconds")
+
+
+class _BatchWriter:
+    """Buffers rows per table and flushes them with executemany every ``batch_size`` rows"""
+
+    def __init__(self, conn: sqlite3.Connection, batch_size: int):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.rows: dict[str, list] = {}
+        self.counts: dict[str, int] = {}
+
+    def add(self, table: str, row: tuple):
+        buffer = self.rows.setdefault(table, [])
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table: Optional[str] = None):
+        for name in [table] if table else list(self.rows):
+            buffer = self.rows.get(name)
+            if buffer:
+                placeholders = ",".join("?" * len(buffer[0]))
+                self.conn.executemany(f"INSERT INTO {name} VALUES ({placeholders})", buffer)
+                self.counts[name] = self.counts.get(name, 0) + len(buffer)
+                buffer.clear()
+
+
+def _write_reference_data(writer: _BatchWriter):
+    """Airports, aircraft and their seat maps: the sample's lookup tables, which the tools don't query"""
+    for code, name, city, (longitude, latitude), timezone_name in AIRPORT_DATA:
+        writer.add("airports_data", (code, name, city, f"({longitude},{latitude})", timezone_name))
+    for code, model, range_km in AIRCRAFT:
+        writer.add("aircrafts_data", (code, model, range_km))
+        for row in range(1, SEAT_ROWS + 1):
+            fare = "Business" if row <= BUSINESS_ROWS else "Comfort" if row <= COMFORT_ROWS else "Economy"
+            for letter in "ABCDEF":
+                writer.add("seats", (code, f"{row}{letter}", fare))
+    writer.flush()
+
+
+def _write_flights(writer: _BatchWriter, rng: random.Random, count: int, now: float) -> array:
+    """Write ``count`` flights from 30 days ago to 60 days ahead; returns their departure epochs"""
+    weights = _zipf_weights(len(AIRPORTS))
+    routes = [(a, b) for a in AIRPORTS for b in AIRPORTS if a != b]
+    route_weights = [weights[AIRPORTS.index(a)] * weights[AIRPORTS.index(b)] for a, b in routes]
+    # A stable block time per route, 45 minutes to 3.5 hours
+    block_minutes = {route: 45 + (sum(map(ord, route[0] + route[1])) * 37) % 165 for route in routes}
+    departures = array("d", [0.0])  # 1-based like flight_id
+
+    for flight_id, route in enumerate(rng.choices(routes, route_weights, k=count), start=1):
+        # Busier in the morning and early evening: pick the hour from a two-peak mix
+        day = math.floor(now / DAY) + rng.randint(-30, 60)
+        hour = rng.gauss(8, 2) if rng.random() < 0.55 else rng.gauss(18, 2.5)
+        departure = day * DAY + (min(max(hour, 5), 23) * 3600) // 300 * 300
+        arrival = departure + block_minutes[route] * 60
+        departures.append(departure)
+
+        actual_departure = actual_arrival = NULL_TIMESTAMP
+        if rng.random() < 0.015:
+            status = "Cancelled"
+        elif arrival < now:
+            status = "Arrived"
+            delay = rng.expovariate(1 / 600)
+            actual_departure, actual_arrival = _ts(departure + delay), _ts(arrival + delay)
+        elif departure < now:
+            status = "Departed"
+            actual_departure = _ts(departure + rng.expovariate(1 / 600))
+        elif departure < now + DAY:
+            status = "Delayed" if rng.random() < 0.1 else "On Time"
+        else:
+            status = "Scheduled"
+
+        writer.add("flights", (
+            flight_id, f"LX{flight_id % 10000:04d}", _ts(departure), _ts(arrival), route[0], route[1],
+            status, rng.choice(AIRCRAFT)[0], actual_departure, actual_arrival,
+        ))
+    writer.flush("flights")
+    return departures
+
+
+def _write_passengers(
+    writer: _BatchWriter,
+    rng: random.Random,
+    passengers: int,
+    tickets_per_passenger: int,
+    departures: array,
+    checkin_rate: float,
+    now: float,
+):
+    """One booking per passenger with its tickets, flight legs and boarding passes.
+
+    This loop produces almost every row, so it sticks to ``rng.random()`` and
+    plain list appends rather than the slower ``randint``/``choices`` helpers.
+    """
+    flights = len(departures) - 1
+    random_ = rng.random
+    economy, comfort = (sum(FARE_WEIGHTS[:i + 1]) / sum(FARE_WEIGHTS) for i in range(2))
+    fares = [(fare, FARE_PRICE[fare][0], FARE_PRICE[fare][1] - FARE_PRICE[fare][0] + 1) for fare in FARE_CONDITIONS]
+    bookings, tickets, ticket_flights, boarding_passes = (
+        writer.rows.setdefault(table, [])
+        for table in ("bookings", "tickets", "ticket_flights", "boarding_passes")
+    )
+
+    for n in range(passengers):
+        book_ref = f"{n:06X}"
+        pid = passenger_id(n)
+        total = 0
+        earliest = now
+        for leg in range(tickets_per_passenger):
+            ticket = ticket_no(n, leg)
+            tickets.append((ticket, book_ref, pid))
+            # About a third of tickets are returns with a second flight
+            first = 1 + int(random_() * flights)
+            legs = [first]
+            if flights > 1 and random_() < 0.35:
+                second = 1 + int(random_() * (flights - 1))
+                legs.append(second + (second >= first))
+            for boarding_no, flight_id in enumerate(legs, 1):
+                draw = random_()
+                fare, low, spread = fares[0] if draw < economy else fares[1] if draw < comfort else fares[2]
+                amount = low + int(random_() * spread)
+                total += amount
+                departure = departures[flight_id]
+                earliest = min(earliest, departure)
+                ticket_flights.append((ticket, flight_id, fare, amount))
+                # Everyone on a departed flight checked in; most future travellers already have
+                if departure < now or random_() < checkin_rate:
+                    seat = f"{1 + int(random_() * 30)}{'ABCDEF'[int(random_() * 6)]}"
+                    boarding_passes.append((ticket, flight_id, boarding_no, seat))
+        book_date = earliest - (1 + random_() * 59) * DAY
+        bookings.append((book_ref, _ts(book_date), total))
+        if len(ticket_flights) >= writer.batch_size:
+            writer.flush()
+    writer.flush()
+
+
+def _write_listings(writer: _BatchWriter, rng: random.Random, table: str, count: int, now: float):
+    city_weights = _zipf_weights(len(CITIES), 0.8)
+    label = {"car_rentals": "Car Rental", "hotels": "Hotel"}[table]
+    for i in range(1, count + 1):
+        city = rng.choices(CITIES, city_weights)[0]
+        start = datetime.fromtimestamp(now + rng.randint(-10, 60) * DAY, TZ).date()
+        end = start + timedelta(days=max(1, int(rng.lognormvariate(1.2, 0.6))))
+        writer.add(table, (
+            i, f"{city} {label} {i}", city, rng.choices(PRICE_TIERS, PRICE_TIER_WEIGHTS)[0],
+            start.isoformat(), end.isoformat(), int(rng.random() < 0.1),
+        ))
+    writer.flush(table)
+
+
+def _write_excursions(writer: _BatchWriter, rng: random.Random, count: int):
+    city_weights = _zipf_weights(len(CITIES), 0.8)
+    for i in range(1, count + 1):
+        city = rng.choices(CITIES, city_weights)[0]
+        keywords = rng.sample(KEYWORDS, rng.randint(2, 4))
+        writer.add("trip_recommendations", (
+            i, f"{city} {keywords[0].title()} Excursion {i}", city, ", ".join(keywords),
+            f"A day of {' and '.join(keywords)} around {city}.", int(rng.random() < 0.05),
+        ))
+    writer.flush("trip_recommendations")
+
+
+def generate_travel_db(
+    path: str,
+    passengers: int = 10_000,
+    flights: Optional[int] = None,
+    tickets_per_passenger: int = 2,
+    hotels: int = 500,
+    car_rentals: int = 500,
+    excursions: int = 500,
+    checkin_rate: float = 0.8,
+    seed: int = 42,
+    batch_size: int = 50_000,
+    now: Optional[float] = None,
+) -> str:
+    """Write a travel2-compatible database at ``path`` and return the path.
+
+    Rows are generated and inserted in batches of ``batch_size`` inside a
+    single transaction with journaling off, so memory stays flat however
+    large the database (only one float per flight is kept). Passenger ``n``
+    is ``passenger_id(n)`` and owns tickets ``ticket_no(n, 0..tickets_per_passenger-1)``;
+    passenger 0 is the app's default demo passenger.
+    Timestamps are relative to ``now``; indexes are left to the migrations.
+    """
+    rng = random.Random(seed)
+    now = time.time() if now is None else now
+    flights = flights if flights is not None else max(100, passengers // 20)
+    if os.path.exists(path):
+        os.remove(path)
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        # A half-written file is simply regenerated, so skip the journal and fsyncs
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(SCHEMA)
+        writer = _BatchWriter(conn, batch_size)
+        conn.execute("BEGIN")
+        _write_reference_data(writer)
+        departures = _write_flights(writer, rng, flights, now)
+        _write_passengers(writer, rng, passengers, tickets_per_passenger, departures, checkin_rate, now)
+        _write_listings(writer, rng, "car_rentals", car_rentals, now)
+        _write_listings(writer, rng, "hotels", hotels, now)
+        _write_excursions(writer, rng, excursions)
+        writer.flush()
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    logger.info(f"Generated {path}: {writer.counts}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic travel2-schema SQLite database")
+    parser.add_argument("path", help="Output database file (replaced if it exists)")
+    parser.add_argument("--passengers", type=int, default=10_000)
+    parser.add_argument("--flights", type=int, help="Defaults to passengers / 20")
+    parser.add_argument("--tickets-per-passenger", type=int, default=2)
+    parser.add_argument("--hotels", type=int, default=500)
+    parser.add_argument("--car-rentals", type=int, default=500)
+    parser.add_argument("--excursions", type=int, default=500)
+    parser.add_argument("--checkin-rate", type=float, default=0.8, help="Share of future legs with a boarding pass")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generate_travel_db(
+        args.path,
+        passengers=args.passengers,
+        flights=args.flights,
+        tickets_per_passenger=args.tickets_per_passenger,
+        hotels=args.hotels,
+        car_rentals=args.car_rentals,
+        excursions=args.excursions,
+        checkin_rate=args.checkin_rate,
+        seed=args.seed,
+    )
+    elapsed = time.perf_counter() - start
+    conn = sqlite3.connect(args.path)
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    total = 0
+    for table in tables:
+        count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        total += count
+        print(f"{table:<22} {count:>12,}")
+    conn.close()
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
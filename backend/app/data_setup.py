@@ -4,10 +4,14 @@ Database setup and data initialization
 import os
 import shutil
 import sqlite3
-import pandas as pd
+import tempfile
+import time
 import requests
-from datetime import datetime
-import pytz
+from datetime import datetime, timedelta
+
+from .config import settings
+from .data_generator import generate_travel_db
+from .migrations import migrate
 
 
 def setup_sample_database():
@@ -16,70 +20,203 @@ def setup_sample_database():
     local_file = "travel2.sqlite"
     backup_file = "travel2.backup.sqlite"
     
-    # Download the database if it doesn't exist
+    # Download (or generate) the database if it doesn't exist
     if not os.path.exists(local_file):
-        print("Downloading sample database...")
-        response = requests.get(db_url)
-        response.raise_for_status()
-        with open(local_file, "wb") as f:
-            f.write(response.content)
+        if settings.sample_db_source == "generate":
+            print(f"Generating synthetic sample database ({settings.sample_db_passengers} passengers)...")
+            generate_travel_db(local_file, passengers=settings.sample_db_passengers)
+        else:
+            print("Downloading sample database...")
+            response = requests.get(db_url)
+            response.raise_for_status()
+            with open(local_file, "wb") as f:
+                f.write(response.content)
         shutil.copy(local_file, backup_file)
-        print("Sample database downloaded successfully!")
+        print("Sample database ready!")
     
-    return update_dates(local_file)
-
+    update_dates(local_file)
+    migrate(local_file)
+    return local_file
 
-def update_dates(file):
-    """Update the dates in the database to current time"""
-    shutil.copy("travel2.backup.sqlite", file)
-    conn = sqlite3.connect(file)
-    cursor = conn.cursor()
-
-    tables = pd.read_sql(
-        "SELECT name FROM sqlite_master WHERE type='table';", conn
-    ).name.tolist()
-    tdf = {}
-    for t in tables:
-        tdf[t] = pd.read_sql(f"SELECT * from {t}", conn)
-
-    example_time = pd.to_datetime(
-        tdf["flights"]["actual_departure"].replace("\\N", pd.NaT)
-    ).max()
-    current_time = pd.to_datetime("now").tz_localize(example_time.tz)
-    time_diff = current_time - example_time
-
-    tdf["bookings"]["book_date"] = (
-        pd.to_datetime(tdf["bookings"]["book_date"].replace("\\N", pd.NaT), utc=True)
-        + time_diff
-    )
 
-    datetime_columns = [
+# Datetime columns shifted so the sample data is always relative to "now"
+SHIFTED_COLUMNS = {
+    "flights": [
         "scheduled_departure",
-        "scheduled_arrival", 
+        "scheduled_arrival",
         "actual_departure",
         "actual_arrival",
-    ]
-    for column in datetime_columns:
-        tdf["flights"][column] = (
-            pd.to_datetime(tdf["flights"][column].replace("\\N", pd.NaT)) + time_diff
-        )
+    ],
+    "bookings": ["book_date"],
+}
 
-    for table_name, df in tdf.items():
-        df.to_sql(table_name, conn, if_exists="replace", index=False)
-    del df
-    del tdf
-    conn.commit()
-    conn.close()
+# Listing availability dates, shifted by whole days so they stay dates
+SHIFTED_DATE_COLUMNS = {
+    "hotels": ["checkin_date", "checkout_date"],
+    "car_rentals": ["start_date", "end_date"],
+}
 
-    return file
+DAY = 86400
+
+METADATA_TABLE = "app_metadata"
+
+
+def _parse_timestamp(value):
+    if value is None or value == "\\N":
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
 
 
-def get_company_policies():
-    """Download company policies for the retriever"""
-    response = requests.get(
-        "https://storage.googleapis.com/benchmarks-artifacts/travel-db/swiss_faq.md"
+def _shift_timestamp(value, seconds):
+    """SQL function: shift an ISO timestamp, keeping its UTC offset; '\\N' becomes NULL"""
+    parsed = _parse_timestamp(value)
+    if parsed is None:
+        return None if value == "\\N" else value
+    return (parsed + timedelta(seconds=seconds)).isoformat(" ", timespec="microseconds")
+
+
+def _shift_date(value, days):
+    """SQL function: shift a date (or timestamp) by whole days, keeping its format"""
+    parsed = _parse_timestamp(value)
+    if parsed is None:
+        return None if value == "\\N" else value
+    shifted = parsed + timedelta(days=days)
+    return shifted.date().isoformat() if len(value) == 10 else shifted.isoformat(" ")
+
+
+def _timestamp_epoch(value):
+    parsed = _parse_timestamp(value)
+    return parsed.timestamp() if parsed is not None else None
+
+
+def get_metadata(conn, key, default=None):
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {METADATA_TABLE} (key TEXT PRIMARY KEY, value TEXT)"
     )
-    response.raise_for_status()
+    row = conn.execute(f"SELECT value FROM {METADATA_TABLE} WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def set_metadata(conn, key, value):
+    conn.execute(
+        f"INSERT INTO {METADATA_TABLE} (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, str(value)),
+    )
+
+
+def _shift_table(conn, table, columns, amount, chunk_rows, function="shift_ts"):
+    """Shift the given columns in place, one rowid range per statement"""
+    low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}").fetchone()
+    if low is None:
+        return
+    assignments = ", ".join(f"{column} = {function}({column}, ?)" for column in columns)
+    statement = f"UPDATE {table} SET {assignments} WHERE rowid >= ? AND rowid < ?"
+    for start in range(low, high + 1, chunk_rows):
+        conn.execute(statement, [amount] * len(columns) + [start, start + chunk_rows])
+
+
+def update_dates(file):
+    """Update the dates in the database to current time.
+
+    Shifts the flight and booking timestamps, and the hotel and car rental
+    availability dates by whole days, in place and inside one transaction, so
+    schema and indexes survive. The original data's reference time and the
+    offsets applied so far are kept in ``app_metadata``; a restart applies just
+    the time elapsed since the previous shift.
+    """
+    if not os.path.exists(file):
+        shutil.copy("travel2.backup.sqlite", file)
+    conn = sqlite3.connect(file, isolation_level=None)
+    conn.create_function("shift_ts", 2, _shift_timestamp, deterministic=True)
+    conn.create_function("shift_date", 2, _shift_date, deterministic=True)
+    conn.create_function("ts_epoch", 1, _timestamp_epoch, deterministic=True)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        applied = float(get_metadata(conn, "date_shift_applied", 0))
+        reference = get_metadata(conn, "date_shift_reference")
+        if reference is None:
+            # Latest actual departure in the untouched data, measured once
+            latest = conn.execute("SELECT MAX(ts_epoch(actual_departure)) FROM flights").fetchone()[0]
+            if latest is None:
+                conn.execute("COMMIT")
+                return file
+            reference = latest - applied
+            set_metadata(conn, "date_shift_reference", reference)
+
+        delta = (time.time() - float(reference)) - applied
+        if abs(delta) >= settings.date_shift_min_seconds:
+            for table, columns in SHIFTED_COLUMNS.items():
+                _shift_table(conn, table, columns, delta, settings.date_shift_chunk_rows)
+            applied += delta
+            set_metadata(conn, "date_shift_applied", applied)
+
+        # Databases shifted before listing dates were included catch up on the whole offset here
+        days_applied = int(get_metadata(conn, "date_shift_days_applied", 0))
+        days = int(applied // DAY) - days_applied
+        if days:
+            for table, columns in SHIFTED_DATE_COLUMNS.items():
+                _shift_table(conn, table, columns, days, settings.date_shift_chunk_rows, "shift_date")
+            set_metadata(conn, "date_shift_days_applied", days_applied + days)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    return file
+
+
+def _read_text(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _write_text(path, text):
+    """Replace ``path`` through a temp file unique to this call, so concurrent workers can't mix writes"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def get_company_policies(cache_file=None):
+    """Download company policies for the retriever, reusing a fresh on-disk copy.
+
+    The copy is re-downloaded once it is older than ``policy_faq_max_age`` (or
+    always, with ``policy_faq_refresh``); if that download fails, the stale
+    copy is used instead.
+    """
+    cache_file = cache_file or settings.policy_faq_cache
+    cached = cache_file and os.path.exists(cache_file)
+    if cached and not settings.policy_faq_refresh:
+        age = time.time() - os.path.getmtime(cache_file)
+        if not settings.policy_faq_max_age or age < settings.policy_faq_max_age:
+            return _read_text(cache_file)
+
+    try:
+        response = requests.get(
+            "https://storage.googleapis.com/benchmarks-artifacts/travel-db/swiss_faq.md",
+            timeout=30,
+        )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        if not cached:
+            raise
+        print(f"Warning: Could not refresh company policies, using the copy in {cache_file}: {e}")
+        return _read_text(cache_file)
+    if cache_file:
+        _write_text(cache_file, response.text)
     return response.text
 
 
@@ -0,0 +1,153 @@
+"""
+Pooled SQLite connections shared by the customer support tools
+"""
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Optional, Sequence
+
+from .config import settings
+from .metrics import SQL_LATENCY, statement_label, timed
+from .tracing import span
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Global database file path
+DB_FILE = "travel2.sqlite"
+
+
+class ConnectionManager:
+    """Hand out one long-lived, tuned connection per thread.
+
+    Opening a connection per tool call costs a file open, a schema parse and a
+    cold page cache. Instead every thread keeps its own connection for the
+    lifetime of the process, with WAL enabled so readers never block the
+    occasional booking write. ``cached_statements`` keeps the prepared
+    statements of the hot tool queries around between calls.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = []
+        self._generation = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=settings.db_busy_timeout,
+            cached_statements=settings.db_statement_cache_size,
+            # Each connection is only used by the thread that opened it; this
+            # just lets close_all() close them from whichever thread calls it.
+            check_same_thread=False,
+        )
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.DatabaseError as e:
+            logger.warning(f"Could not enable WAL on {self.db_file}: {e}")
+        conn.execute(f"PRAGMA synchronous={settings.db_synchronous}")
+        conn.execute(f"PRAGMA mmap_size={int(settings.db_mmap_size)}")
+        conn.execute(f"PRAGMA cache_size=-{int(settings.db_cache_size_kb)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is None or local.generation != self._generation:
+            conn = self._connect()
+            with self._lock:
+                self._connections.append(conn)
+                local.conn = conn
+                local.generation = self._generation
+        return conn
+
+    def close_all(self):
+        """Close every pooled connection; threads reconnect on next use."""
+        with self._lock:
+            self._generation += 1
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    @contextmanager
+    def transaction(self, name: str = "transaction"):
+        """Run the block in a transaction on this thread's connection."""
+        conn = self.get_connection()
+        with timed(SQL_LATENCY, name), span("sql", name):
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+
+# Global connection manager instance
+manager = ConnectionManager(DB_FILE)
+
+
+def configure(db_file: str):
+    """Point the pooled connections at a different database file."""
+    manager.close_all()
+    manager.db_file = db_file
+
+
+def get_connection() -> sqlite3.Connection:
+    return manager.get_connection()
+
+
+def transaction(name: str = "transaction"):
+    """Transaction on this thread's connection, timed as one statement called ``name``."""
+    return manager.transaction(name)
+
+
+def close_all():
+    manager.close_all()
+
+
+def fetch_all(query: str, params: Sequence[Any] = (), name: Optional[str] = None) -> list[dict]:
+    """Run a read query and return the rows as dicts.
+
+    ``name`` labels the statement in the SQL latency metrics; it defaults to
+    the verb and table, e.g. "select flights".
+    """
+    name = name or statement_label(query)
+    with timed(SQL_LATENCY, name), span("sql", name):
+        cursor = get_connection().execute(query, params)
+        try:
+            column_names = [column[0] for column in cursor.description]
+            return [dict(zip(column_names, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+
+def fetch_one(query: str, params: Sequence[Any] = (), name: Optional[str] = None) -> Optional[dict]:
+    """Run a read query and return the first row as a dict, if any."""
+    name = name or statement_label(query)
+    with timed(SQL_LATENCY, name), span("sql", name):
+        cursor = get_connection().execute(query, params)
+        try:
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            column_names = [column[0] for column in cursor.description]
+            return dict(zip(column_names, row))
+        finally:
+            cursor.close()
+
+
+def execute(query: str, params: Sequence[Any] = (), name: Optional[str] = None) -> int:
+    """Run a single write statement in its own transaction and return the rowcount."""
+    with transaction(name or statement_label(query)) as conn:
+        cursor = conn.execute(query, params)
+        rowcount = cursor.rowcount
+        cursor.close()
+    return rowcount
@@ -0,0 +1,122 @@
+"""
+Deterministic offline chat model for benchmarks and load tests
+"""
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+# "call:cancel_ticket {"ticket_no": "123"}" makes the fake model request that tool
+TOOL_CALL_PATTERN = re.compile(r"^call:(\w+)\s*(\{.*\})?\s*$", re.DOTALL)
+
+
+class FakeChatModel(BaseChatModel):
+    """Answers every turn by echoing the last user message after ``latency`` seconds.
+
+    Selected with ``LLM_PROVIDER=fake``. The async path sleeps with
+    ``asyncio.sleep`` so it behaves like a real network-bound provider, and
+    streaming yields the answer word by word with the latency spread across it.
+    A user message of the form ``call:<tool> <json args>`` is answered with
+    that tool call instead, and a tool result is answered by quoting it, so
+    scripts can drive tool and approval flows deterministically.
+    """
+
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        if messages and isinstance(messages[-1], ToolMessage):
+            message = AIMessage(content=f"Tool result: {messages[-1].content}")
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        last_user = next(
+            (m.content for m in reversed(messages) if isinstance(m, HumanMessage)), ""
+        )
+        match = TOOL_CALL_PATTERN.match(last_user)
+        if match:
+            message = AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": match.group(1),
+                    "args": json.loads(match.group(2) or "{}"),
+                    # Unique within a thread, and stable across runs
+                    "id": f"call_{len(messages)}",
+                }],
+            )
+        else:
+            message = AIMessage(content=f"You said: {last_user}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, messages: List[BaseMessage]) -> list[AIMessageChunk]:
+        message = self._respond(messages).generations[0].message
+        if message.tool_calls:
+            return [AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}
+                    for i, tc in enumerate(message.tool_calls)
+                ],
+            )]
+        words = message.content.split(" ")
+        return [AIMessageChunk(content=word + " ") for word in words[:-1]] + [AIMessageChunk(content=words[-1])]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        chunks = self._chunks(messages)
+        for chunk in chunks:
+            if self.latency:
+                time.sleep(self.latency / len(chunks))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        chunks = self._chunks(messages)
+        for chunk in chunks:
+            if self.latency:
+                await asyncio.sleep(self.latency / len(chunks))
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,214 @@
+"""
+Conversation history windowing and rolling summary
+"""
+import logging
+from typing import Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from .config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STALE_TOOL_RESULT = "[Earlier tool result omitted]"
+# Tool results shorter than this are cheap enough to keep
+STALE_TOOL_MIN_CHARS = 200
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a customer support conversation for Swiss Airlines. "
+    "Merge the new conversation lines into the existing summary. Keep ticket numbers, flight ids, "
+    "booking ids, dates and anything the customer asked for or agreed to; drop pleasantries. "
+    "Reply with the updated summary only, in at most {max_chars} characters."
+)
+# Summaries run outside the graph's callbacks: they are not chat turns, so they stay
+# out of the chat metrics, the request traces and the streamed messages
+SUMMARY_CONFIG: RunnableConfig = {"callbacks": [], "run_name": "summarize_history"}
+
+
+def format_summary(state) -> str:
+    """Prompt fragment carrying the rolling summary, empty until there is one"""
+    summary = state.get("summary")
+    return f"Summary of the earlier conversation: {summary} " if summary else ""
+
+
+def split_turns(messages: list[AnyMessage]) -> list[list[AnyMessage]]:
+    """Group messages into turns, each starting at a human message.
+
+    An AI tool call and its ToolMessages always land in the same turn, so
+    keeping or dropping whole turns never orphans either side of the pair.
+    """
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+def transcript(messages: list[AnyMessage], tool_chars: int = 200) -> str:
+    """Plain-text rendering of messages for the summarizer"""
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"Customer: {_text(message.content)}")
+        elif isinstance(message, AIMessage):
+            if message.content:
+                lines.append(f"Assistant: {_text(message.content)}")
+            for call in message.tool_calls:
+                lines.append(f"Assistant called {call['name']}({call['args']})")
+        elif isinstance(message, ToolMessage):
+            lines.append(f"Tool {message.name or ''} returned: {_text(message.content)[:tool_chars]}")
+    return "\n".join(lines)
+
+
+def fallback_summary(summary: str, dropped: list[AnyMessage], max_chars: int) -> str:
+    """Extractive summary used when no LLM summarizer is available"""
+    combined = "\n".join(part for part in (summary, transcript(dropped, tool_chars=80)) if part)
+    # Keep the most recent part of the conversation
+    return combined[-max_chars:]
+
+
+def _stub_stale_tool_results(turns: list[list[AnyMessage]], fresh_turns: int) -> list[ToolMessage]:
+    """Replacements (same id) for large tool results older than the last ``fresh_turns`` turns"""
+    stale = turns[:-fresh_turns] if fresh_turns > 0 else turns
+    return [
+        ToolMessage(
+            content=STALE_TOOL_RESULT,
+            tool_call_id=message.tool_call_id,
+            name=message.name,
+            id=message.id,
+        )
+        for turn in stale
+        for message in turn
+        if isinstance(message, ToolMessage) and len(_text(message.content)) > STALE_TOOL_MIN_CHARS
+    ]
+
+
+def plan_window(
+    messages: list[AnyMessage],
+    max_turns: int,
+    token_budget: int,
+    tool_result_turns: int,
+) -> tuple[list[AnyMessage], list[ToolMessage]]:
+    """Decide which messages to fold into the summary and which tool results to stub.
+
+    Keeps at most ``max_turns`` of the latest turns, then drops more of the
+    oldest ones while the kept messages exceed ``token_budget`` (the latest
+    turn is always kept whole). Returns ``(dropped, stubs)``.
+    """
+    turns = split_turns(messages)
+    keep_from = max(len(turns) - max_turns, 0) if max_turns else 0
+    kept = turns[keep_from:]
+    stubs = {m.id: m for m in _stub_stale_tool_results(kept, tool_result_turns)}
+
+    if token_budget:
+        def kept_tokens(turns):
+            return count_tokens_approximately(
+                stubs.get(m.id, m) for turn in turns for m in turn
+            )
+        while len(kept) > 1 and kept_tokens(kept) > token_budget:
+            keep_from += 1
+            kept = kept[1:]
+
+    dropped = [m for turn in turns[:keep_from] for m in turn]
+    dropped_ids = {m.id for m in dropped}
+    return dropped, [stub for stub in stubs.values() if stub.id not in dropped_ids]
+
+
+class HistoryManager:
+    """Graph node that keeps the history sent to the assistant bounded.
+
+    Runs once per user message. Older turns are removed from ``messages``
+    and folded into ``summary``, and stale tool payloads are replaced with a
+    short marker, so both the prompt and the checkpoints stop growing with
+    the conversation.
+    """
+
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        # A model of its own, not the assistant's: no response cache and no tools bound
+        self.llm = llm if settings.history_summary_llm else None
+
+    def _plan(self, state) -> Optional[tuple[list[AnyMessage], list[ToolMessage]]]:
+        if not settings.history_max_turns and not settings.history_token_budget:
+            return None
+        dropped, stubs = plan_window(
+            state["messages"],
+            settings.history_max_turns,
+            settings.history_token_budget,
+            settings.history_tool_result_turns,
+        )
+        if not dropped and not stubs:
+            return None
+        if settings.verbose_logging:
+            logger.info(f"✂️ Folding {len(dropped)} messages into the summary, stubbing {len(stubs)} tool results")
+        return dropped, stubs
+
+    def _summary_messages(self, summary: str, dropped: list[AnyMessage]) -> list:
+        max_chars = settings.history_summary_max_chars
+        return [
+            SystemMessage(content=SUMMARY_PROMPT.format(max_chars=max_chars)),
+            HumanMessage(content=f"Existing summary:\n{summary or '(none)'}\n\nNew lines:\n{transcript(dropped)}"),
+        ]
+
+    def _update(self, dropped, stubs, summary: str) -> dict:
+        update = {"messages": [RemoveMessage(id=m.id) for m in dropped] + stubs}
+        if dropped:
+            update["summary"] = summary[: settings.history_summary_max_chars]
+        return update
+
+    def __call__(self, state):
+        plan = self._plan(state)
+        if plan is None:
+            return {}
+        dropped, stubs = plan
+        summary = state.get("summary") or ""
+        if dropped:
+            summary = self._summarize(summary, dropped)
+        return self._update(dropped, stubs, summary)
+
+    async def acall(self, state):
+        plan = self._plan(state)
+        if plan is None:
+            return {}
+        dropped, stubs = plan
+        summary = state.get("summary") or ""
+        if dropped:
+            summary = await self._asummarize(summary, dropped)
+        return self._update(dropped, stubs, summary)
+
+    def _summarize(self, summary: str, dropped: list[AnyMessage]) -> str:
+        if self.llm is not None:
+            try:
+                return _text(self.llm.invoke(self._summary_messages(summary, dropped), SUMMARY_CONFIG).content)
+            except Exception as e:
+                logger.warning(f"History summarization failed, using extractive summary: {e}")
+        return fallback_summary(summary, dropped, settings.history_summary_max_chars)
+
+    async def _asummarize(self, summary: str, dropped: list[AnyMessage]) -> str:
+        if self.llm is not None:
+            try:
+                result = await self.llm.ainvoke(self._summary_messages(summary, dropped), SUMMARY_CONFIG)
+                return _text(result.content)
+            except Exception as e:
+                logger.warning(f"History summarization failed, using extractive summary: {e}")
+        return fallback_summary(summary, dropped, settings.history_summary_max_chars)
+
+    def as_runnable(self) -> Runnable:
+        return RunnableLambda(self, afunc=self.acall, name="manage_history")
@@ -0,0 +1,221 @@
+"""
+Persistent SQLite cache for chat model responses
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import warnings
+from typing import Any, Optional, Sequence
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from .config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# langchain_core.load is stable enough for our own round-trips
+warnings.filterwarnings("ignore", category=LangChainBetaWarning, module=__name__)
+
+# The prompt renders datetime.now(); only the date may take part in the key
+CURRENT_TIME_PATTERN = re.compile(r"(Current time: \d{4}-\d{2}-\d{2})[ T][0-9:.+\-]*")
+
+# Keys whose string values are per-call identifiers rather than content
+ID_KEYS = {"id", "tool_call_id"}
+# Provider bookkeeping attached to AI messages that never repeats across calls
+VOLATILE_KEYS = {"response_metadata", "usage_metadata"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache(accessed_at);
+"""
+
+
+def _normalize(value: Any, ids: dict) -> Any:
+    if isinstance(value, dict):
+        normalized = {}
+        for key, item in value.items():
+            if key in VOLATILE_KEYS:
+                continue
+            if key in ID_KEYS and isinstance(item, str):
+                # Keep which tool result answers which call, not the random ids themselves
+                normalized[key] = ids.setdefault(item, f"id_{len(ids)}")
+            else:
+                normalized[key] = _normalize(item, ids)
+        return normalized
+    if isinstance(value, list):
+        return [_normalize(item, ids) for item in value]
+    if isinstance(value, str):
+        return CURRENT_TIME_PATTERN.sub(r"\1", value)
+    return value
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Strip what changes between otherwise identical calls from a serialized prompt.
+
+    The current time is reduced to its date, message and tool call ids are
+    renumbered in order of appearance, and response/usage metadata of earlier
+    AI messages is dropped.
+    """
+    try:
+        data = json.loads(prompt)
+    except ValueError:
+        return CURRENT_TIME_PATTERN.sub(r"\1", prompt)
+    return json.dumps(_normalize(data, {}), sort_keys=True, separators=(",", ":"))
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Hash of the normalized messages and the model string.
+
+    ``llm_string`` already covers the model, temperature and other params and
+    the bound tool schemas.
+    """
+    digest = hashlib.sha256()
+    digest.update(normalize_prompt(prompt).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(llm_string.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    """LLM cache in a local SQLite file with a TTL and LRU size eviction.
+
+    Only worth enabling with a low temperature: a hit returns the earlier
+    response verbatim, including its tool calls.
+    """
+
+    def __init__(self, database_path: str, ttl: Optional[float] = None, max_entries: int = 10_000):
+        self.database_path = database_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(database_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(database_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and row[1] + self.ttl <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        try:
+            # Only langchain_core classes (generations, messages) can come back out
+            generations = loads(row[0], allowed_objects="core")
+        except Exception as e:
+            logger.warning(f"Dropping unreadable LLM cache entry: {e}")
+            with self._lock:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            return None
+        # The stored message keeps the id of the turn that produced it; add_messages would
+        # treat a replayed id as an update and overwrite that earlier message, so hand back
+        # an id-less message and let the reducer assign a fresh one.
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None:
+                message.id = None
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if not _cacheable(return_val):
+            return
+        key = cache_key(prompt, llm_string)
+        value = dumps(return_val)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        if not self.max_entries:
+            return
+        excess = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": size,
+            "maxsize": self.max_entries,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def _cacheable(generations: Sequence) -> bool:
+    """Empty replies make the assistant re-prompt; never serve them from cache"""
+    for generation in generations:
+        message = getattr(generation, "message", None)
+        if message is None:
+            if generation.text:
+                return True
+        elif message.content or getattr(message, "tool_calls", None):
+            return True
+    return False
+
+
+# Process-wide cache, created on first use when enabled
+_llm_cache: Optional[SQLiteLLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[SQLiteLLMCache]:
+    """The configured LLM cache, or None unless ``settings.llm_cache`` is on"""
+    global _llm_cache
+    if not settings.llm_cache:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = SQLiteLLMCache(
+                settings.llm_cache_db,
+                ttl=settings.llm_cache_ttl,
+                max_entries=settings.llm_cache_max_entries,
+            )
+            logger.info(f"LLM response cache enabled at {settings.llm_cache_db}")
+        return _llm_cache
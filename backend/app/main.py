@@ -1,19 +1,28 @@
 """
 FastAPI main application
 """
-from fastapi import FastAPI, HTTPException, Request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel, validator
 from typing import Optional
+import asyncio
+import json
+import secrets
 import uuid
 import os
 import logging
 
 from .config import settings
 from .agent import get_agent
+from .checkpoint import close_checkpointers, run_session_sweeper, session_stats
 from .data_setup import setup_sample_database
+from .tools import get_policy_retriever
+from .llm_cache import get_llm_cache
+from . import metrics, tracing
 
 # Configure logging
 logging.basicConfig(level=settings.log_level)
@@ -26,12 +35,29 @@ try:
 except Exception as e:
     logger.error(f"Failed to initialize database: {e}")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Bound the tool/DB thread pool, warm the policy retriever and run the idle-session sweeper"""
+    executor = ThreadPoolExecutor(
+        max_workers=settings.tool_executor_workers, thread_name_prefix="tool-worker"
+    )
+    asyncio.get_running_loop().set_default_executor(executor)
+    # In the background, so the first policy question doesn't pay for the FAQ download
+    asyncio.get_running_loop().run_in_executor(None, get_policy_retriever)
+    sweeper = asyncio.create_task(run_session_sweeper())
+    yield
+    sweeper.cancel()
+    await close_checkpointers()
+    tracing.recorder.close()
+    executor.shutdown(wait=False)
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     description="Customer Support Bot API",
     version="1.0.0",
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -66,6 +92,87 @@ class ErrorResponse(BaseModel):
     error: str
     details: Optional[str] = None
 
+REJECTION_MESSAGE = "I don't want to proceed with that action. Please help me with something else."
+
+def agent_config(session_id: str, passenger_id: Optional[str] = "3442 587242") -> dict:
+    return {
+        "configurable": {
+            "passenger_id": passenger_id,
+            "thread_id": session_id,
+        },
+        "callbacks": metrics.callbacks() + tracing.callbacks(),
+    }
+
+# Server-Sent Events helpers
+TOOL_NODES = {"safe_tools", "sensitive_tools"}
+
+def sse_frame(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def chunk_text(chunk) -> str:
+    """Extract the text of a streamed message chunk (plain string or content blocks)"""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") for block in content
+        if isinstance(block, dict) and block.get("type") == "text"
+    )
+
+async def stream_agent(agent, graph_input, config: dict, session_id: str, endpoint: str = "/chat/stream"):
+    """Run the graph with astream_events and translate it into SSE frames.
+
+    Emits ``token`` for assistant output, ``tool_start``/``tool_end`` around
+    each tool call, ``approval_required`` when the run stops before
+    ``sensitive_tools``, then ``done`` with the final message (or ``error``).
+    """
+    with tracing.request_trace(session_id, endpoint) as trace:
+        async for frame in _stream_frames(agent, graph_input, config, session_id, trace):
+            yield frame
+
+async def _stream_frames(agent, graph_input, config: dict, session_id: str, trace):
+    try:
+        async for event in agent.astream_events(graph_input, config, version="v2"):
+            kind = event["event"]
+            if kind == "on_chat_model_stream":
+                if event["metadata"].get("langgraph_node") != "assistant":
+                    continue
+                text = chunk_text(event["data"]["chunk"])
+                if text:
+                    yield sse_frame("token", {"content": text})
+            elif kind in ("on_tool_start", "on_tool_end"):
+                # fetch_user_info also invokes a tool internally; only report the tool nodes
+                if event["metadata"].get("langgraph_node") not in TOOL_NODES:
+                    continue
+                frame = "tool_start" if kind == "on_tool_start" else "tool_end"
+                yield sse_frame(frame, {"name": event["name"], "run_id": event["run_id"]})
+        
+        snapshot = await agent.aget_state(config)
+        messages = snapshot.values.get("messages", [])
+        if snapshot.next:
+            pending = messages[-1].tool_calls if messages else []
+            yield sse_frame("approval_required", {
+                "session_id": session_id,
+                "tool_calls": [{"name": tc["name"], "args": tc["args"]} for tc in pending],
+            })
+        yield sse_frame("done", {
+            "session_id": session_id,
+            "response": messages[-1].content if messages else "",
+            "has_interrupt": bool(snapshot.next),
+        })
+    except Exception as e:
+        logger.error(f"Stream error: {str(e)}")
+        if trace is not None:
+            trace.error = repr(e)
+        yield sse_frame("error", {"detail": str(e)})
+
+def sse_response(frames) -> StreamingResponse:
+    return StreamingResponse(
+        frames,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # API Routes
 @app.get("/")
 async def root():
@@ -79,7 +186,24 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": str(uuid.uuid4())}
+    health = {"status": "healthy", "timestamp": str(uuid.uuid4()), "sessions": session_stats()}
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        health["llm_cache"] = llm_cache.stats()
+    return health
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics"""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(
+            status_code=404,
+            detail="Metrics are disabled (set METRICS_ENABLED=true and install prometheus_client)"
+        )
+    for stat, value in session_stats().items():
+        metrics.SESSIONS.labels(stat).set(value)
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
@@ -92,20 +216,16 @@ async def chat_endpoint(request: ChatRequest):
         agent = get_agent()
         
         # Configure the agent run
-        config = {
-            "configurable": {
-                "passenger_id": request.passenger_id,
-                "thread_id": session_id,
-            }
-        }
+        config = agent_config(session_id, request.passenger_id)
         
         logger.info(f"Processing chat request for session {session_id}")
         
         # Invoke the agent
-        result = agent.invoke(
-            {"messages": [("user", request.message)]},
-            config
-        )
+        with tracing.request_trace(session_id, "/chat"):
+            result = await agent.ainvoke(
+                {"messages": [("user", request.message)]},
+                config
+            )
         
         # Extract response
         response_content = result["messages"][-1].content
@@ -125,29 +245,23 @@ async def chat_endpoint(request: ChatRequest):
         )
 
 @app.post("/chat/continue", response_model=ChatResponse)
-async def continue_chat(session_id: str, approve: bool = True):
+async def continue_chat(session_id: str, approve: bool = True, passenger_id: Optional[str] = "3442 587242"):
     """Continue a chat that was interrupted for approval"""
     try:
         agent = get_agent()
         
-        config = {
-            "configurable": {
-                "passenger_id": "3442 587242",  # Default for demo
-                "thread_id": session_id,
-            }
-        }
+        config = agent_config(session_id, passenger_id)
         
-        if approve:
-            # Continue with the interrupted action
-            result = agent.invoke(None, config)
-        else:
-            # Reject the action
-            result = agent.invoke(
-                {
-                    "messages": [("user", "I don't want to proceed with that action. Please help me with something else.")]
-                },
-                config
-            )
+        with tracing.request_trace(session_id, "/chat/continue"):
+            if approve:
+                # Continue with the interrupted action
+                result = await agent.ainvoke(None, config)
+            else:
+                # Reject the action
+                result = await agent.ainvoke(
+                    {"messages": [("user", REJECTION_MESSAGE)]},
+                    config
+                )
         
         response_content = result["messages"][-1].content
         
@@ -163,21 +277,35 @@ async def continue_chat(session_id: str, approve: bool = True):
             detail=f"Error continuing chat: {str(e)}"
         )
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Chat endpoint that streams tokens and tool progress as Server-Sent Events"""
+    session_id = request.session_id or str(uuid.uuid4())
+    agent = get_agent()
+    config = agent_config(session_id, request.passenger_id)
+    logger.info(f"Streaming chat request for session {session_id}")
+    return sse_response(
+        stream_agent(agent, {"messages": [("user", request.message)]}, config, session_id)
+    )
+
+@app.post("/chat/continue/stream")
+async def continue_chat_stream(session_id: str, approve: bool = True, passenger_id: Optional[str] = "3442 587242"):
+    """Streaming variant of /chat/continue"""
+    agent = get_agent()
+    config = agent_config(session_id, passenger_id)
+    graph_input = None if approve else {"messages": [("user", REJECTION_MESSAGE)]}
+    return sse_response(stream_agent(agent, graph_input, config, session_id, "/chat/continue/stream"))
+
 @app.get("/chat/{session_id}/status")
 async def get_chat_status(session_id: str):
     """Get the status of a chat session"""
     try:
         agent = get_agent()
         
-        config = {
-            "configurable": {
-                "passenger_id": "3442 587242",
-                "thread_id": session_id,
-            }
-        }
+        config = agent_config(session_id)
         
         # Get the current state
-        snapshot = agent.get_state(config)
+        snapshot = await agent.aget_state(config)
         
         return {
             "session_id": session_id,
@@ -193,6 +321,20 @@ async def get_chat_status(session_id: str):
             detail=f"Error checking status: {str(e)}"
         )
 
+@app.get("/debug/requests/{session_id}")
+async def debug_requests(
+    session_id: str, slow: bool = False, x_debug_token: Optional[str] = Header(default=None)
+):
+    """Span timelines of the session's recent requests (and, with slow=true, its logged slow ones)"""
+    if not settings.trace_enabled:
+        raise HTTPException(status_code=404, detail="Request tracing is disabled (TRACE_ENABLED=false)")
+    if settings.trace_token and not secrets.compare_digest(x_debug_token or "", settings.trace_token):
+        raise HTTPException(status_code=403, detail="Missing or wrong X-Debug-Token")
+    response = {"session_id": session_id, "requests": tracing.recorder.recent(session_id)}
+    if slow:
+        response["slow_requests"] = await asyncio.to_thread(tracing.recorder.slow, session_id)
+    return response
+
 # Mount static files for the frontend
 static_dir = os.path.join(os.path.dirname(__file__), "..", "..", "frontend")
 print(f"Looking for frontend at: {static_dir}")
@@ -0,0 +1,238 @@
+"""
+Prometheus metrics for the agent: graph nodes, tools, SQL, LLM/embedding calls and checkpoints
+"""
+import contextvars
+import functools
+import inspect
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+METRICS_ENABLED = PROMETHEUS_AVAILABLE and settings.metrics_enabled
+
+# SQLite statements and checkpoint reads mostly take well under a millisecond
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# LLM calls, tools and whole nodes take up to tens of seconds
+SLOW_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class _NoopMetric:
+    """Stands in for every metric when prometheus_client is missing or metrics are disabled"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+
+if METRICS_ENABLED:
+    NODE_LATENCY = Histogram(
+        "agent_node_duration_seconds", "Graph node run time", ["node"], buckets=SLOW_BUCKETS
+    )
+    TOOL_LATENCY = Histogram(
+        "agent_tool_duration_seconds", "Tool run time", ["tool", "status"], buckets=SLOW_BUCKETS
+    )
+    LLM_LATENCY = Histogram(
+        "agent_llm_duration_seconds", "Chat model call time", ["node", "model", "status"], buckets=SLOW_BUCKETS
+    )
+    EMBEDDING_LATENCY = Histogram(
+        "agent_embedding_duration_seconds", "Embedding call time", ["operation"], buckets=SLOW_BUCKETS
+    )
+    SQL_LATENCY = Histogram(
+        "agent_sql_duration_seconds", "SQLite statement time", ["statement"], buckets=FAST_BUCKETS
+    )
+    CHECKPOINT_LATENCY = Histogram(
+        "agent_checkpoint_duration_seconds", "Checkpointer read/write time", ["operation"], buckets=FAST_BUCKETS
+    )
+    REPROMPTS = Counter("agent_reprompts", "Empty LLM responses the assistant re-prompted")
+    TOOL_ERRORS = Counter("agent_tool_errors", "Tool calls answered with an error message", ["tool", "reason"])
+    INTERRUPTS = Counter("agent_interrupts", "Runs stopped for user approval", ["node"])
+    SESSIONS = Gauge("agent_sessions", "In-memory session store statistics", ["stat"])
+else:
+    NODE_LATENCY = TOOL_LATENCY = LLM_LATENCY = EMBEDDING_LATENCY = _NoopMetric()
+    SQL_LATENCY = CHECKPOINT_LATENCY = _NoopMetric()
+    REPROMPTS = TOOL_ERRORS = INTERRUPTS = SESSIONS = _NoopMetric()
+
+
+@contextmanager
+def timed(histogram, *labels: str):
+    """Observe the duration of the block, whether it returns or raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(*labels).observe(time.perf_counter() - start)
+
+
+STATEMENT_PATTERN = re.compile(r"^\s*(\w+).*?\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE | re.DOTALL)
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_label(query: str) -> str:
+    """Low-cardinality label for a SQL statement, e.g. "select flights" """
+    match = STATEMENT_PATTERN.match(query)
+    if match is None:
+        return query.split(None, 1)[0].lower() if query.strip() else "unknown"
+    return f"{match.group(1).lower()} {match.group(2).lower()}"
+
+
+def graph_node(name: Optional[str], tags: Optional[list], metadata: Optional[dict]) -> Optional[str]:
+    """The node name if a chain run is a whole graph node, else None.
+
+    A node run is the chain run LangGraph tags with ``graph:step:<n>``; the
+    runnables nested inside it (which may share the node's name) don't count.
+    """
+    node = (metadata or {}).get("langgraph_node")
+    if node is None or node.startswith("__") or name != node:
+        return None
+    if any(tag.startswith("graph:step:") for tag in tags or ()):
+        return node
+    return None
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times graph nodes, tools and chat model calls from LangChain callbacks"""
+
+    run_inline = True
+    # Runs that never finish (e.g. a tool cancelled by its timeout) are dropped beyond this
+    MAX_PENDING = 10_000
+
+    def __init__(self):
+        self._pending: dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, histogram, labels: tuple):
+        with self._lock:
+            if len(self._pending) >= self.MAX_PENDING:
+                self._pending.pop(next(iter(self._pending)))
+            self._pending[run_id] = (histogram, labels, time.perf_counter())
+
+    def _end(self, run_id: UUID, status: Optional[str] = None):
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+        if pending is None:
+            return
+        histogram, labels, start = pending
+        if status is not None:
+            labels = (*labels, status)
+        histogram.labels(*labels).observe(time.perf_counter() - start)
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id: UUID, tags: Optional[list] = None,
+        metadata: Optional[dict] = None, **kwargs: Any
+    ):
+        node = graph_node(kwargs.get("name"), tags, metadata)
+        if node is not None:
+            self._start(run_id, NODE_LATENCY, (node,))
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs: Any):
+        name = kwargs.get("name") or (serialized or {}).get("name", "unknown")
+        self._start(run_id, TOOL_LATENCY, (name,))
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, "success")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, "error")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs: Any):
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or kwargs.get("name") or (serialized or {}).get("name", "unknown")
+        self._start(run_id, LLM_LATENCY, (metadata.get("langgraph_node", "none"), model))
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, "success")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, "error")
+
+
+_callback_handler = MetricsCallbackHandler() if METRICS_ENABLED else None
+
+
+def callbacks() -> list:
+    """Callbacks to add to every agent run's config"""
+    return [_callback_handler] if _callback_handler is not None else []
+
+
+# Set while a checkpointer call is timed, so async methods that delegate to
+# their sync counterpart (MemorySaver) are only observed once
+_in_checkpoint = contextvars.ContextVar("in_checkpoint", default=False)
+
+CHECKPOINT_OPERATIONS = {
+    "get_tuple": "read",
+    "aget_tuple": "read",
+    "put": "write",
+    "aput": "write",
+    "put_writes": "write_pending",
+    "aput_writes": "write_pending",
+}
+
+
+def _timed_checkpoint_method(method, operation: str):
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            if _in_checkpoint.get():
+                return await method(*args, **kwargs)
+            token = _in_checkpoint.set(True)
+            try:
+                with timed(CHECKPOINT_LATENCY, operation):
+                    return await method(*args, **kwargs)
+            finally:
+                _in_checkpoint.reset(token)
+    else:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if _in_checkpoint.get():
+                return method(*args, **kwargs)
+            token = _in_checkpoint.set(True)
+            try:
+                with timed(CHECKPOINT_LATENCY, operation):
+                    return method(*args, **kwargs)
+            finally:
+                _in_checkpoint.reset(token)
+    return wrapper
+
+
+def instrument_checkpointer(saver):
+    """Time the reads and writes of a checkpointer instance in place"""
+    if METRICS_ENABLED:
+        for name, operation in CHECKPOINT_OPERATIONS.items():
+            setattr(saver, name, _timed_checkpoint_method(getattr(saver, name), operation))
+    return saver
+
+
+def render() -> tuple[bytes, str]:
+    """Exposition body and content type for the /metrics endpoint"""
+    return generate_latest(), CONTENT_TYPE_LATEST
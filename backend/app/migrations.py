@@ -0,0 +1,176 @@
+"""
+Versioned schema migrations for the travel database
+"""
+import logging
+import re
+import sqlite3
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def fts_statements(table: str, columns: list[str]) -> list[str]:
+    """External-content FTS5 index ``<table>_fts`` over ``columns``, kept in sync by triggers.
+
+    Rows are keyed by the table's ``id``. Booking only flips ``booked``, so the
+    update trigger fires only when an indexed column changes.
+    """
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {cols}, content='{table}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF id, {cols} ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});
+        END
+        """,
+    ]
+
+
+# (version, description, statements). Append new migrations; never edit applied ones.
+MIGRATIONS = [
+    (
+        1,
+        "Indexes for the tool hot queries",
+        [
+            # fetch_user_flight_information: tickets -> ticket_flights -> flights -> boarding_passes
+            "CREATE INDEX IF NOT EXISTS idx_tickets_passenger_id ON tickets(passenger_id)",
+            "CREATE INDEX IF NOT EXISTS idx_tickets_ticket_no ON tickets(ticket_no)",
+            "CREATE INDEX IF NOT EXISTS idx_ticket_flights_ticket_no ON ticket_flights(ticket_no)",
+            "CREATE INDEX IF NOT EXISTS idx_flights_flight_id ON flights(flight_id)",
+            "CREATE INDEX IF NOT EXISTS idx_boarding_passes_ticket_flight ON boarding_passes(ticket_no, flight_id)",
+            # search_flights: airport filters with a departure-time range
+            "CREATE INDEX IF NOT EXISTS idx_flights_departure_airport ON flights(departure_airport, scheduled_departure)",
+            "CREATE INDEX IF NOT EXISTS idx_flights_arrival_airport ON flights(arrival_airport, scheduled_departure)",
+            "CREATE INDEX IF NOT EXISTS idx_flights_scheduled_departure ON flights(scheduled_departure)",
+            # book_* tools update by id
+            "CREATE INDEX IF NOT EXISTS idx_car_rentals_id ON car_rentals(id)",
+            "CREATE INDEX IF NOT EXISTS idx_hotels_id ON hotels(id)",
+            "CREATE INDEX IF NOT EXISTS idx_trip_recommendations_id ON trip_recommendations(id)",
+        ],
+    ),
+    (
+        2,
+        "Itinerary versions for the cached user info",
+        [
+            # Bumped by update_ticket_to_new_flight/cancel_ticket in the same transaction as the change
+            """
+            CREATE TABLE IF NOT EXISTS passenger_itinerary_versions (
+                passenger_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+        ],
+    ),
+    (
+        3,
+        "Full-text indexes for the hotel, car rental and excursion searches",
+        [
+            *fts_statements("hotels", ["name", "location"]),
+            *fts_statements("car_rentals", ["name", "location"]),
+            *fts_statements("trip_recommendations", ["name", "location", "keywords"]),
+        ],
+    ),
+    (
+        4,
+        "Indexes for the price tier and availability filters",
+        [
+            # Case-insensitive tier, so a tier prefix (LIKE 'x%') is a range search in this
+            # index; the dates in the index reject unavailable rows before the table lookup.
+            # Date-only filters walk the id index and stop at the first page of matches.
+            """
+            CREATE INDEX IF NOT EXISTS idx_hotels_price_tier
+            ON hotels(price_tier COLLATE NOCASE, id, checkin_date, checkout_date)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_car_rentals_price_tier
+            ON car_rentals(price_tier COLLATE NOCASE, id, start_date, end_date)
+            """,
+        ],
+    ),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations, one transaction each, and return the schema version.
+
+    The version lives in ``PRAGMA user_version`` so it travels with the file.
+    """
+    current = get_schema_version(conn)
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    for version, description, statements in pending:
+        logger.info(f"Applying migration {version}: {description}")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            # PRAGMA does not accept bound parameters
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        current = version
+    if pending:
+        # Give the planner statistics for the new indexes
+        conn.execute("ANALYZE")
+    else:
+        conn.execute("PRAGMA optimize")
+    return current
+
+
+def migrate(db_file: str) -> int:
+    conn = sqlite3.connect(db_file, isolation_level=None)
+    try:
+        return apply_migrations(conn)
+    finally:
+        conn.close()
+
+
+def explain_query_plan(conn: sqlite3.Connection, query: str, params=()) -> list[str]:
+    """Return the detail column of EXPLAIN QUERY PLAN for a query."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+
+
+# An FTS5 MATCH is planned as "SCAN <fts> VIRTUAL TABLE INDEX n:M..." but is an index lookup
+FTS_MATCH_PLAN = re.compile(r"^SCAN \w+ VIRTUAL TABLE INDEX \d+:M")
+SUBQUERY_PLAN = re.compile(r"^(?:MATERIALIZE|CO-ROUTINE) (\w+)")
+
+
+def full_scans(conn: sqlite3.Connection, query: str, params=()) -> list[str]:
+    """Plan steps that walk a whole table (or a whole index) instead of searching it.
+
+    Walking the result of a subquery is not a table scan; its own steps are
+    checked like any other.
+    """
+    steps = explain_query_plan(conn, query, params)
+    subqueries = {m.group(1) for m in map(SUBQUERY_PLAN.match, steps) if m}
+    return [
+        step for step in steps
+        if step.startswith("SCAN ")
+        and not FTS_MATCH_PLAN.match(step)
+        and step.split()[1] not in subqueries
+    ]
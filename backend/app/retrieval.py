@@ -0,0 +1,544 @@
+"""
+Policy retrieval over the company FAQ with an on-disk embedding cache
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from .cache import MISSING, TTLCache, normalize_query
+from .config import settings
+from .metrics import EMBEDDING_LATENCY, timed
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+
+# Long-lived embedding client shared by the store and every query
+_embeddings_model = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings_model():
+    global _embeddings_model
+    if _embeddings_model is None:
+        with _embeddings_lock:
+            if _embeddings_model is None:
+                from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+                _embeddings_model = GoogleGenerativeAIEmbeddings(
+                    model=EMBEDDING_MODEL,
+                    google_api_key=settings.gemini_api_key
+                )
+    return _embeddings_model
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Content-hash keyed embeddings persisted as ``vectors-<digest>.npy`` + ``manifest.json``.
+
+    The manifest lists the hash of every embedded chunk in row order, so a warm
+    start memory-maps the matrix without a single embedding call, and an edited
+    FAQ only re-embeds the sections whose text actually changed. The vectors
+    file is named after its content and the manifest names it, so workers
+    saving at the same time can't pair one's vectors with the other's manifest.
+    """
+
+    def __init__(self, directory: str, model: str = EMBEDDING_MODEL):
+        self.directory = directory
+        self.model = model
+        self.manifest_path = os.path.join(directory, "manifest.json")
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _vectors_path(self, manifest: dict) -> str:
+        # Caches written before the vectors file was named in the manifest
+        return os.path.join(self.directory, os.path.basename(manifest.get("vectors", "vectors.npy")))
+
+    def load(self) -> tuple[list[str], Optional[np.ndarray]]:
+        """Return the cached hashes and a read-only memory map of their vectors."""
+        manifest = self._read_manifest()
+        if manifest.get("model") != self.model:
+            return [], None
+        try:
+            vectors = np.load(self._vectors_path(manifest), mmap_mode="r")
+        except (OSError, ValueError):
+            return [], None
+        hashes = manifest.get("hashes", [])
+        if vectors.ndim != 2 or vectors.shape[0] != len(hashes):
+            logger.warning(f"Ignoring inconsistent embedding cache in {self.directory}")
+            return [], None
+        return hashes, vectors
+
+    def _write_atomically(self, path: str, write):
+        """Write through a temp file unique to this call, then rename it over ``path``."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def save(self, hashes: list[str], vectors: np.ndarray):
+        """Atomically replace the cache; the manifest is written last."""
+        os.makedirs(self.directory, exist_ok=True)
+        previous = self._vectors_path(self._read_manifest())
+        name = f"vectors-{content_hash(self.model + chr(10) + chr(10).join(hashes))[:16]}.npy"
+        manifest = {"model": self.model, "dim": int(vectors.shape[1]), "hashes": hashes, "vectors": name}
+        self._write_atomically(
+            os.path.join(self.directory, name),
+            lambda f: np.save(f, np.ascontiguousarray(vectors, dtype=np.float32)),
+        )
+        self._write_atomically(self.manifest_path, lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+        if previous != os.path.join(self.directory, name):
+            # Open memory maps of the old matrix stay valid after the unlink
+            try:
+                os.unlink(previous)
+            except OSError:
+                pass
+
+    def embed(self, texts: list[str], embeddings_model=None) -> np.ndarray:
+        """Return one vector per text, embedding only texts missing from the cache."""
+        hashes = [content_hash(text) for text in texts]
+        cached_hashes, cached = self.load()
+        if cached is not None and cached_hashes == hashes:
+            return cached
+
+        row_of = {h: i for i, h in enumerate(cached_hashes)}
+        missing = [i for i, h in enumerate(hashes) if h not in row_of]
+        new_vectors = {}
+        if missing:
+            embeddings_model = embeddings_model or get_embeddings_model()
+            batch_size = max(1, settings.embedding_batch_size)
+            for start in range(0, len(missing), batch_size):
+                batch = missing[start:start + batch_size]
+                with timed(EMBEDDING_LATENCY, "embed_documents"):
+                    embedded = embeddings_model.embed_documents([texts[i] for i in batch])
+                new_vectors.update(zip(batch, embedded))
+            logger.info(f"Embedded {len(missing)} of {len(texts)} policy chunks")
+
+        vectors = np.array(
+            [new_vectors[i] if i in new_vectors else cached[row_of[h]] for i, h in enumerate(hashes)],
+            dtype=np.float32,
+        )
+        self.save(hashes, vectors)
+        return vectors
+
+
+class VectorIndex:
+    """L2-normalized float32 matrix for cosine top-k search, optionally int8-quantized.
+
+    Rows are normalized once at build time, so a score is a single dot product
+    per row. With ``quantize`` each row is stored as int8 with a per-row scale
+    (4x smaller) and scored block by block into a reusable float32 buffer. The
+    score buffers are per thread and reused across calls, so a search never
+    allocates anything the size of the index.
+    """
+
+    BLOCK_ROWS = 1024  # int8 rows dequantized per matmul
+
+    def __init__(self, vectors, quantize: bool = False):
+        matrix = np.array(vectors, dtype=np.float32, order="C")
+        if matrix.ndim != 2:
+            raise ValueError(f"Expected a 2-D matrix of vectors, got shape {matrix.shape}")
+        self.norms = np.linalg.norm(matrix, axis=1)
+        matrix /= np.where(self.norms > 0, self.norms, 1)[:, None]
+        self.quantized = quantize
+        if quantize:
+            self.scales = np.abs(matrix).max(axis=1) / 127
+            self._matrix = np.round(matrix / np.where(self.scales > 0, self.scales, 1)[:, None]).astype(np.int8)
+        else:
+            self.scales = None
+            self._matrix = matrix
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return self._matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self._matrix.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def _buffer(self, name: str, size: int) -> np.ndarray:
+        """This thread's reusable float32 buffer of at least ``size`` elements"""
+        buffer = getattr(self._local, name, None)
+        if buffer is None or buffer.size < size:
+            buffer = np.empty(size, dtype=np.float32)
+            setattr(self._local, name, buffer)
+        return buffer[:size]
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """(queries, rows) cosine scores in this thread's score buffer"""
+        n, m = len(self), len(queries)
+        scores = self._buffer("scores", m * n).reshape(m, n)
+        if not self.quantized:
+            np.matmul(queries, self._matrix.T, out=scores)
+            return scores
+        rows = self._buffer("rows", self.BLOCK_ROWS * self.dim).reshape(self.BLOCK_ROWS, self.dim)
+        block_scores = self._buffer("block_scores", m * self.BLOCK_ROWS).reshape(m, self.BLOCK_ROWS)
+        for start in range(0, n, self.BLOCK_ROWS):
+            end = min(start + self.BLOCK_ROWS, n)
+            size = end - start
+            np.copyto(rows[:size], self._matrix[start:end], casting="unsafe")
+            if size == self.BLOCK_ROWS:
+                np.matmul(queries, rows.T, out=block_scores)
+                scores[:, start:end] = block_scores
+            else:
+                scores[:, start:end] = queries @ rows[:size].T
+        scores *= self.scales
+        return scores
+
+    def search_batch(self, queries, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k (indices, scores) per query, best first, both shaped (queries, k)"""
+        queries = np.array(queries, dtype=np.float32, ndmin=2)
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match the index ({self.dim})")
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries /= np.where(norms > 0, norms, 1)
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty((len(queries), 0), dtype=np.intp), np.empty((len(queries), 0), dtype=np.float32)
+        scores = self._scores(queries)
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def search(self, query, k: int) -> tuple[np.ndarray, np.ndarray]:
+        indices, scores = self.search_batch([query], k)
+        return indices[0], scores[0]
+
+
+# Function words that would match every section
+STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from have how i if in is it me my of on or our "
+    "should that the this to was we what when where which will with would you your".split()
+)
+
+
+# (suffix, replacement) tried in order; the first that leaves a 3-letter stem wins
+SUFFIXES = (
+    ("ations", ""), ("ation", ""), ("ies", "y"), ("ied", "y"), ("ings", ""), ("ing", ""), ("ed", ""), ("s", ""),
+)
+
+
+def stem(word: str) -> str:
+    """Light suffix stripping so inflections meet: "cancelled", "cancellations" -> "cancel".
+
+    Only has to map a question and the FAQ text to the same key, not produce words.
+    """
+    if len(word) <= 3:
+        return word
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)] + replacement
+            break
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "aeiou":
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Stemmed lowercase words without stopwords"""
+    return [stem(word) for word in re.findall(r"\w+", text.lower()) if word not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index.
+
+    Each posting stores its document's full term weight (idf and length
+    normalization included), so a query only adds up the postings of its
+    terms: no network, microseconds for an FAQ.
+    """
+
+    def __init__(self, texts: list[str], k1: float = 1.5, b: float = 0.75):
+        tokenized = [tokenize(text) for text in texts]
+        lengths = np.array([len(tokens) for tokens in tokenized], dtype=np.float32)
+        average = float(lengths.mean()) if len(texts) and lengths.mean() > 0 else 1.0
+        term_frequencies: dict[str, dict[int, int]] = {}
+        for doc, tokens in enumerate(tokenized):
+            for term in tokens:
+                frequencies = term_frequencies.setdefault(term, {})
+                frequencies[doc] = frequencies.get(doc, 0) + 1
+
+        self._size = len(texts)
+        self._postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        for term, frequencies in term_frequencies.items():
+            docs = np.fromiter(frequencies.keys(), dtype=np.int64, count=len(frequencies))
+            tf = np.fromiter(frequencies.values(), dtype=np.float32, count=len(frequencies))
+            idf = np.log(1 + (self._size - len(docs) + 0.5) / (len(docs) + 0.5))
+            weights = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[docs] / average))
+            self._postings[term] = (docs, weights.astype(np.float32))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def search(self, query: str, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k (indices, scores) of the documents sharing a term with the query, best first"""
+        postings = [self._postings[term] for term in set(tokenize(query)) if term in self._postings]
+        if not postings or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if len(postings) == 1:
+            candidates, scores = postings[0]
+        else:
+            totals = np.zeros(self._size, dtype=np.float32)
+            for docs, weights in postings:
+                totals[docs] += weights
+            candidates = np.unique(np.concatenate([docs for docs, _ in postings]))
+            scores = totals[candidates]
+        if len(candidates) > k:
+            top = np.argpartition(scores, -k)[-k:]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return candidates[order], scores[order]
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int, rrf_k: int = 60) -> list[tuple[int, float]]:
+    """Top-k (doc, score) of several best-first rankings, scoring sum(1 / (rrf_k + rank))"""
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])[:k]
+
+
+DEFAULT_CORPUS = "policies"
+RETRIEVAL_MODES = ("hybrid", "bm25", "vector")
+
+
+class VectorStoreRetriever:
+    """Top-k search over named corpora, the company policies by default.
+
+    Every corpus gets a BM25 index, which needs no network; corpora with
+    embeddings also get a VectorIndex, and in "hybrid" mode the two rankings
+    are combined by reciprocal rank fusion. If embedding a query fails, the
+    retriever answers from BM25 alone for ``policy_embedding_retry`` seconds
+    instead of failing the lookup.
+
+    Repeated questions dominate policy traffic, so normalized query -> embedding
+    and (corpus, query, k) -> results are kept in bounded TTL caches; a hit skips
+    the embedding network hop entirely. ``query_batch`` scores many questions
+    against a corpus in one matrix product.
+    """
+
+    def __init__(self, docs: list, vectors, client, corpus: str = DEFAULT_CORPUS, mode: Optional[str] = None):
+        self.mode = mode or settings.policy_retrieval
+        if self.mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {self.mode!r}; expected one of {', '.join(RETRIEVAL_MODES)}")
+        self._client = client
+        self._corpora: dict[str, tuple[list, Optional[VectorIndex], Optional[BM25Index]]] = {}
+        self._embeddings_down_until = 0.0
+        self.embedding_cache = TTLCache(settings.query_cache_size, settings.query_cache_ttl)
+        self.result_cache = TTLCache(settings.query_cache_size, settings.query_cache_ttl)
+        self.add_corpus(corpus, docs, vectors)
+
+    @classmethod
+    def from_docs(
+        cls, docs, client, store: Optional[EmbeddingStore] = None, corpus: str = DEFAULT_CORPUS,
+        mode: Optional[str] = None,
+    ):
+        mode = mode or settings.policy_retrieval
+        texts = [doc["page_content"] for doc in docs]
+        vectors = None
+        if mode == "vector":
+            vectors = (store or corpus_store(corpus)).embed(texts, client)
+        elif mode == "hybrid":
+            vectors = cls._try_embed(texts, client, store or corpus_store(corpus))
+        return cls(docs, vectors, client, corpus, mode)
+
+    @staticmethod
+    def _try_embed(texts: list[str], client, store: EmbeddingStore) -> Optional[np.ndarray]:
+        """Document vectors, or None (BM25 only) without an embedding client or when embedding fails"""
+        if client is None and not settings.gemini_api_key:
+            logger.info("No embedding API key; policy search uses BM25 only")
+            return None
+        try:
+            return store.embed(texts, client)
+        except Exception as e:
+            logger.warning(f"Could not embed policy documents, policy search uses BM25 only: {e}")
+            return None
+
+    def add_corpus(self, name: str, docs: list, vectors=None):
+        """Add or replace a corpus; its cached results are dropped with it"""
+        if vectors is not None and len(docs) != len(vectors):
+            raise ValueError(f"Corpus {name} has {len(docs)} docs but {len(vectors)} vectors")
+        if vectors is None and self.mode == "vector":
+            raise ValueError(f"Corpus {name} needs vectors in vector mode")
+        index = VectorIndex(vectors, quantize=settings.policy_index_int8) if vectors is not None else None
+        bm25 = BM25Index([doc["page_content"] for doc in docs]) if self.mode != "vector" else None
+        self._corpora[name] = (docs, index, bm25)
+        self.result_cache.clear()
+
+    def add_docs(self, name: str, docs: list, store: Optional[EmbeddingStore] = None):
+        """Embed (through the cache, where embeddings are used) and add a corpus of documents"""
+        texts = [doc["page_content"] for doc in docs]
+        vectors = None
+        if self.mode == "vector":
+            vectors = (store or corpus_store(name)).embed(texts, self._client)
+        elif self.mode == "hybrid":
+            vectors = self._try_embed(texts, self._client, store or corpus_store(name))
+        self.add_corpus(name, docs, vectors)
+
+    @property
+    def corpora(self) -> list[str]:
+        return list(self._corpora)
+
+    def _embeddings_model(self):
+        return self._client or get_embeddings_model()
+
+    def _corpus(self, name: str) -> tuple[list, Optional[VectorIndex], Optional[BM25Index]]:
+        try:
+            return self._corpora[name]
+        except KeyError:
+            raise KeyError(f"Unknown corpus {name!r}; available: {', '.join(self._corpora)}")
+
+    def _uses_embeddings(self, corpus: str) -> bool:
+        """Whether queries on the corpus should be embedded right now"""
+        if self._corpus(corpus)[1] is None:
+            return False
+        # Vector mode has nothing to fall back to, so it always tries
+        return self.mode == "vector" or time.monotonic() >= self._embeddings_down_until
+
+    def _embedding_failed(self, error: Exception):
+        if self.mode == "vector":
+            raise error
+        self._embeddings_down_until = time.monotonic() + settings.policy_embedding_retry
+        logger.warning(
+            f"Query embedding failed, answering policy lookups from BM25 for "
+            f"{settings.policy_embedding_retry:.0f}s: {error}"
+        )
+
+    def query(self, query: str, k: int = 5, corpus: str = DEFAULT_CORPUS) -> list[dict]:
+        return self.query_batch([query], k, corpus)[0]
+
+    async def aquery(self, query: str, k: int = 5, corpus: str = DEFAULT_CORPUS) -> list[dict]:
+        return (await self.aquery_batch([query], k, corpus))[0]
+
+    def query_batch(self, queries: list[str], k: int = 5, corpus: str = DEFAULT_CORPUS) -> list[list[dict]]:
+        """Top-k docs for every query; the uncached ones are scored in one matmul"""
+        keys, results, embeddings = self._lookup(queries, k, corpus)
+        if embeddings and self._uses_embeddings(corpus):
+            uncached = [key for key, embedding in embeddings.items() if embedding is MISSING]
+            try:
+                for key in uncached:
+                    with timed(EMBEDDING_LATENCY, "embed_query"):
+                        embeddings[key] = self._embeddings_model().embed_query(key)
+                    self.embedding_cache.set(key, embeddings[key])
+            except Exception as e:
+                self._embedding_failed(e)
+        return self._complete(keys, results, embeddings, k, corpus)
+
+    async def aquery_batch(self, queries: list[str], k: int = 5, corpus: str = DEFAULT_CORPUS) -> list[list[dict]]:
+        keys, results, embeddings = self._lookup(queries, k, corpus)
+        uncached = [key for key, embedding in embeddings.items() if embedding is MISSING]
+        if uncached and self._uses_embeddings(corpus):
+            try:
+                model = self._embeddings_model()
+                with timed(EMBEDDING_LATENCY, "embed_query"):
+                    embedded = await asyncio.gather(*(model.aembed_query(key) for key in uncached))
+            except Exception as e:
+                self._embedding_failed(e)
+            else:
+                for key, embedding in zip(uncached, embedded):
+                    embeddings[key] = embedding
+                    self.embedding_cache.set(key, embedding)
+        return self._complete(keys, results, embeddings, k, corpus)
+
+    def _lookup(self, queries: list[str], k: int, corpus: str) -> tuple[list, dict, dict]:
+        """Normalized keys, the cached results, and key -> cached embedding (or MISSING) of the rest"""
+        self._corpus(corpus)
+        keys = [normalize_query(query) for query in queries]
+        results, embeddings = {}, {}
+        for key in keys:
+            if key in results or key in embeddings:
+                continue
+            cached = self.result_cache.get((corpus, key, k))
+            if cached is MISSING:
+                embeddings[key] = self.embedding_cache.get(key)
+            else:
+                results[key] = cached
+        return keys, results, embeddings
+
+    def _complete(self, keys: list, results: dict, embeddings: dict, k: int, corpus: str) -> list[list[dict]]:
+        if embeddings:
+            index = self._corpus(corpus)[1]
+            vectors_used = index is not None and all(e is not MISSING for e in embeddings.values())
+            ranked = self._rank(list(embeddings), list(embeddings.values()) if vectors_used else None, k, corpus)
+            for key, scored in zip(embeddings, ranked):
+                # BM25-only stand-ins for a hybrid corpus aren't cached, so answers
+                # improve again as soon as embeddings are back
+                if vectors_used or index is None:
+                    self.result_cache.set((corpus, key, k), scored)
+                results[key] = scored
+        return [results[key] for key in keys]
+
+    def cache_stats(self) -> dict:
+        return {
+            "embeddings": self.embedding_cache.stats(),
+            "results": self.result_cache.stats(),
+        }
+
+    def _rank(self, keys: list[str], query_embeddings: Optional[list], k: int, corpus: str) -> list[list[dict]]:
+        """Results per query: vector, BM25, or both fused, as the mode and embeddings allow"""
+        docs, index, bm25 = self._corpus(corpus)
+        fused = query_embeddings is not None and bm25 is not None
+        depth = max(k, settings.policy_fusion_candidates) if fused else k
+        vector_hits = index.search_batch(query_embeddings, depth) if query_embeddings is not None else None
+
+        results = []
+        for row, key in enumerate(keys):
+            similarity, lexical = {}, {}
+            if vector_hits is not None:
+                similarity = dict(zip(vector_hits[0][row].tolist(), vector_hits[1][row].tolist()))
+            if bm25 is not None:
+                lexical = dict(zip(*(part.tolist() for part in bm25.search(key, depth))))
+            if fused:
+                ranking = reciprocal_rank_fusion([list(similarity), list(lexical)], k, settings.policy_rrf_k)
+            else:
+                ranking = list((similarity or lexical).items())[:k]
+            hits = []
+            for idx, score in ranking:
+                hit = {**docs[idx], "score": float(score)}
+                if idx in similarity:
+                    hit["similarity"] = float(similarity[idx])
+                if idx in lexical:
+                    hit["bm25"] = float(lexical[idx])
+                hits.append(hit)
+            results.append(hits)
+        return results
+
+
+def corpus_store(name: str) -> EmbeddingStore:
+    """Embedding cache of a corpus: the cache directory itself for the policies, a subdirectory otherwise"""
+    if name == DEFAULT_CORPUS:
+        return EmbeddingStore(settings.embedding_cache_dir)
+    return EmbeddingStore(os.path.join(settings.embedding_cache_dir, name))
@@ -0,0 +1,139 @@
+"""
+Compact text encoding of tool results for the ToolMessages the model reads
+"""
+import json
+import logging
+import re
+from typing import Any, Optional
+
+from langchain_core.messages import ToolMessage
+
+from .config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# "2026-09-16 01:16:22.047118-04:00" -> "2026-09-16 01:16:22-04:00", "...05:30:00.000000-04:00" -> "...05:30-04:00"
+TIMESTAMP_PATTERN = re.compile(
+    r"^(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2})(?::(\d{2})(?:\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?$"
+)
+
+
+def trim_timestamp(value: str) -> str:
+    """Drop fractional seconds, and the seconds too when they are zero"""
+    match = TIMESTAMP_PATTERN.match(value)
+    if match is None:
+        return value
+    minutes, seconds, zone = match.groups()
+    if seconds and seconds != "00":
+        minutes += f":{seconds}"
+    return minutes + (zone or "")
+
+
+# The downloaded sample database stores missing values as the literal "\N"
+NULL_MARKER = "\\N"
+
+
+def _is_null(value: Any) -> bool:
+    return value is None or value == NULL_MARKER
+
+
+def _scalar(value: Any) -> str:
+    if _is_null(value):
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return trim_timestamp(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+    return str(value)
+
+
+def _cell(value: Any) -> str:
+    return _scalar(value).replace("\\", "\\\\").replace("|", "\\|").replace("\n", " ")
+
+
+def _is_table(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(row, dict) for row in value)
+
+
+def encode_table(rows: list[dict]) -> list[str]:
+    """Header line once, then one line per row; all-null columns are left out"""
+    columns = []
+    for row in rows:
+        for column, value in row.items():
+            if not _is_null(value) and column not in columns:
+                columns.append(column)
+    return ["|".join(columns)] + ["|".join(_cell(row.get(column)) for column in columns) for row in rows]
+
+
+def encode_lines(value: Any) -> list[str]:
+    """Lines of the compact encoding; null values are left out"""
+    if _is_table(value):
+        return encode_table(value)
+    if isinstance(value, list):
+        return [_scalar(item) for item in value if not _is_null(item)] if value else ["(no rows)"]
+    if isinstance(value, dict):
+        # Scalars first, so a cursor or count survives truncation of a long table
+        lines, tables = [], []
+        for key, item in value.items():
+            if _is_null(item):
+                continue
+            if _is_table(item):
+                tables.append(f"{key}:")
+                tables.extend(encode_table(item))
+            elif isinstance(item, list) and not item:
+                lines.append(f"{key}: (no rows)")
+            else:
+                lines.append(f"{key}: {_scalar(item)}")
+        return lines + tables
+    return [_scalar(value)]
+
+
+def truncate_lines(lines: list[str], max_chars: int, hint: str = "") -> list[str]:
+    """Whole lines up to ``max_chars``, with a marker saying how many were left out.
+
+    A first line longer than the limit (a long text result) is cut mid-line.
+    """
+    length = sum(len(line) for line in lines) + len(lines) - 1
+    if not max_chars or length <= max_chars:
+        return lines
+    if len(lines[0]) > max_chars:
+        return [lines[0][:max_chars], f"[truncated: {length - max_chars} more characters]"]
+    kept, size = [], -1
+    for line in lines:
+        size += len(line) + 1
+        if size > max_chars:
+            break
+        kept.append(line)
+    return kept + [f"[truncated: {len(lines) - len(kept)} more lines{hint}]"]
+
+
+def encode(value: Any, max_chars: Optional[int] = None) -> str:
+    """Compact text of a tool result: tables for lists of rows, ``key: value`` lines for dicts"""
+    max_chars = settings.tool_result_max_chars if max_chars is None else max_chars
+    if isinstance(value, str):
+        return "\n".join(truncate_lines(value.splitlines(), max_chars))
+    return "\n".join(truncate_lines(encode_lines(value), max_chars, "; narrow the search or ask for fewer rows"))
+
+
+def compact_tool_message(message: Any) -> Any:
+    """Re-encode a tool's JSON result (as ToolNode stringified it) compactly, in place.
+
+    Plain text results are only size-capped; error messages and anything that
+    isn't a ToolMessage (e.g. a Command) pass through untouched.
+    """
+    if not settings.compact_tool_results:
+        return message
+    if not isinstance(message, ToolMessage) or message.status == "error" or not isinstance(message.content, str):
+        return message
+    content = message.content
+    value = content
+    if content[:1] in ("[", "{"):
+        try:
+            value = json.loads(content)
+        except ValueError:
+            pass
+    message.content = encode(value)
+    return message
@@ -2,148 +2,140 @@
 Customer support tools extracted from the notebook
 """
 import re
-import sqlite3
+import asyncio
+import base64
+import hashlib
+import json
 import logging
-from datetime import date, datetime
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
 from typing import Optional, Union, List
-import numpy as np
 import pytz
-import requests
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool, tool
 from langchain_core.runnables import RunnableConfig
+from . import db
 from .config import settings
 from .data_setup import get_company_policies
+from .retrieval import VectorStoreRetriever
+from .web_search import WebSearchUnavailable, get_web_search
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Global database file path
-DB_FILE = "travel2.sqlite"
-
 # Policy retrieval setup
 def setup_policy_retriever():
     """Set up the policy retriever with company FAQs"""
     try:
-        import openai
-        from langchain_google_genai import GoogleGenerativeAIEmbeddings
-        
         faq_text = get_company_policies()
         docs = [{"page_content": txt} for txt in re.split(r"(?=\n##)", faq_text)]
-        
-        class VectorStoreRetriever:
-            def __init__(self, docs: list, vectors: list, client):
-                self._arr = np.array(vectors)
-                self._docs = docs
-                self._client = client
-                
-            @classmethod
-            def from_docs(cls, docs, client):
-                # Use Gemini for embeddings since you have that API key
-                embeddings_model = GoogleGenerativeAIEmbeddings(
-                    model="models/text-embedding-004",
-                    google_api_key=settings.gemini_api_key
-                )                
-                vectors = []
-                for doc in docs:
-                    embedding = embeddings_model.embed_query(doc["page_content"])
-                    vectors.append(embedding)
-                
-                return cls(docs, vectors, client)
-
-            def query(self, query: str, k: int = 5) -> list[dict]:
-                embeddings_model = GoogleGenerativeAIEmbeddings(
-                    model="models/text-embedding-004",
-                    google_api_key=settings.gemini_api_key
-                )
-                query_embedding = embeddings_model.embed_query(query)
-                
-                scores = np.array(query_embedding) @ self._arr.T
-                top_k_idx = np.argpartition(scores, -k)[-k:]
-                top_k_idx_sorted = top_k_idx[np.argsort(-scores[top_k_idx])]
-                return [
-                    {**self._docs[idx], "similarity": scores[idx]} for idx in top_k_idx_sorted
-                ]
-
-        retriever = VectorStoreRetriever.from_docs(docs, None)
-        return retriever
+        return VectorStoreRetriever.from_docs(docs, None)
     except Exception as e:
-        print(f"Warning: Could not set up policy retriever: {e}")
+        logger.warning(f"Could not set up policy retriever (retrying in {settings.policy_setup_retry:.0f}s): {e}")
         return None
 
-# Initialize retriever
-try:
-    policy_retriever = setup_policy_retriever()
-except:
-    policy_retriever = None
-
-@tool
-def lookup_policy(query: str) -> str:
+# Built on first lookup, not at import, so a failed setup (e.g. the FAQ download
+# on an offline first start) is retried after a backoff instead of lasting forever
+_policy_retriever: Optional[VectorStoreRetriever] = None
+_policy_retriever_lock = threading.Lock()
+_policy_retry_at = 0.0
+
+
+def get_policy_retriever() -> Optional[VectorStoreRetriever]:
+    """The policy retriever, or None while setting it up keeps failing"""
+    global _policy_retriever, _policy_retry_at
+    if _policy_retriever is not None:
+        return _policy_retriever
+    with _policy_retriever_lock:
+        if _policy_retriever is None and time.monotonic() >= _policy_retry_at:
+            _policy_retriever = setup_policy_retriever()
+            if _policy_retriever is None:
+                _policy_retry_at = time.monotonic() + settings.policy_setup_retry
+        return _policy_retriever
+
+POLICY_UNAVAILABLE = "Policy information temporarily unavailable. Please contact support for policy questions."
+POLICY_NO_MATCH = "No company policy matches that question. Try again with other keywords."
+
+def _lookup_policy(query: str) -> str:
     """Consult the company policies to check whether certain options are permitted."""
+    policy_retriever = get_policy_retriever()
     if policy_retriever is None:
-        return "Policy information temporarily unavailable. Please contact support for policy questions."
+        return POLICY_UNAVAILABLE
     
     try:
         docs = policy_retriever.query(query, k=2)
-        return "\n\n".join([doc["page_content"] for doc in docs])
+        return "\n\n".join([doc["page_content"] for doc in docs]) or POLICY_NO_MATCH
     except Exception as e:
         return f"Error retrieving policy information: {str(e)}"
 
-@tool
-def fetch_user_flight_information(config: RunnableConfig) -> list[dict]:
-    """Fetch all tickets for the user along with corresponding flight information and seat assignments."""
-    if settings.verbose_logging:
-        logger.info("🎫 TOOL CALLED: fetch_user_flight_information")
-    
-    configuration = config.get("configurable", {})
-    passenger_id = configuration.get("passenger_id", None)
-    
-    if settings.verbose_logging:
-        logger.info(f"👤 Passenger ID: {passenger_id}")
+async def _alookup_policy(query: str) -> str:
+    """Consult the company policies to check whether certain options are permitted."""
+    # Setting up downloads and embeds the FAQ, so it runs off the event loop
+    policy_retriever = _policy_retriever or await asyncio.to_thread(get_policy_retriever)
+    if policy_retriever is None:
+        return POLICY_UNAVAILABLE
     
-    if not passenger_id:
-        if settings.verbose_logging:
-            logger.warning("⚠️ No passenger ID configured")
-        return [{"error": "No passenger ID configured"}]
+    try:
+        docs = await policy_retriever.aquery(query, k=2)
+        return "\n\n".join([doc["page_content"] for doc in docs]) or POLICY_NO_MATCH
+    except Exception as e:
+        return f"Error retrieving policy information: {str(e)}"
 
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    query = """
-    SELECT 
-        t.ticket_no, t.book_ref,
-        f.flight_id, f.flight_no, f.departure_airport, f.arrival_airport, 
-        f.scheduled_departure, f.scheduled_arrival,
-        bp.seat_no, tf.fare_conditions
-    FROM 
-        tickets t
-        JOIN ticket_flights tf ON t.ticket_no = tf.ticket_no
-        JOIN flights f ON tf.flight_id = f.flight_id
-        JOIN boarding_passes bp ON bp.ticket_no = t.ticket_no AND bp.flight_id = f.flight_id
-    WHERE 
-        t.passenger_id = ?
-    """
-    cursor.execute(query, (passenger_id,))
-    rows = cursor.fetchall()
-    column_names = [column[0] for column in cursor.description]
-    results = [dict(zip(column_names, row)) for row in rows]
+# Both variants so ainvoke uses the async embedding client instead of a worker thread
+lookup_policy = StructuredTool.from_function(
+    func=_lookup_policy, coroutine=_alookup_policy, name="lookup_policy"
+)
+
+# Hot queries, kept at module level so benchmarks/check_query_plans.py can
+# verify they stay index-backed (see app/migrations.py)
+USER_FLIGHTS_QUERY = """
+SELECT 
+    t.ticket_no, t.book_ref,
+    f.flight_id, f.flight_no, f.departure_airport, f.arrival_airport, 
+    f.scheduled_departure, f.scheduled_arrival,
+    bp.seat_no, tf.fare_conditions
+FROM 
+    tickets t
+    JOIN ticket_flights tf ON t.ticket_no = tf.ticket_no
+    JOIN flights f ON tf.flight_id = f.flight_id
+    JOIN boarding_passes bp ON bp.ticket_no = t.ticket_no AND bp.flight_id = f.flight_id
+WHERE 
+    t.passenger_id = ?
+"""
 
-    cursor.close()
-    conn.close()
+FLIGHT_BY_ID_QUERY = "SELECT departure_airport, arrival_airport, scheduled_departure FROM flights WHERE flight_id = ?"
 
-    return results
+TICKET_OWNER_QUERY = "SELECT ticket_no FROM tickets WHERE ticket_no = ? AND passenger_id = ?"
 
-@tool
-def search_flights(
+ITINERARY_VERSION_QUERY = "SELECT version FROM passenger_itinerary_versions WHERE passenger_id = ?"
+
+BUMP_ITINERARY_VERSION = """
+INSERT INTO passenger_itinerary_versions (passenger_id, version) VALUES (?, 1)
+ON CONFLICT(passenger_id) DO UPDATE SET version = version + 1
+"""
+
+
+def itinerary_version(passenger_id: str) -> Optional[int]:
+    """Version of the passenger's itinerary, bumped whenever a tool changes it.
+
+    Returns None if the versions table is missing (unmigrated database), in
+    which case callers should not trust anything cached.
+    """
+    try:
+        row = db.fetch_one(ITINERARY_VERSION_QUERY, (passenger_id,), name="itinerary_version")
+    except sqlite3.OperationalError:
+        return None
+    return row["version"] if row else 0
+
+
+def build_flight_search_query(
     departure_airport: Optional[str] = None,
     arrival_airport: Optional[str] = None,
     start_time: Optional[Union[date, datetime]] = None,
     end_time: Optional[Union[date, datetime]] = None,
     limit: int = 20,
-) -> list[dict]:
-    """Search for flights based on departure airport, arrival airport, and departure time range."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
+) -> tuple[str, list]:
     query = "SELECT * FROM flights WHERE 1 = 1"
     params = []
 
@@ -165,16 +157,261 @@ def search_flights(
     
     query += " LIMIT ?"
     params.append(limit)
+    return query, params
+
+# Hotel, car rental and excursion searches return one page of compact rows
+# plus a "next_cursor" to pass back for the following page. Text filters are
+# full-text matches on the <table>_fts indexes (migration 3), ranked by
+# relevance; searches without one page through the table in id order. Price
+# tier and availability dates are plain conditions on the table (migration 4
+# indexes them), applied before the page is cut.
+LISTING_COLUMNS = {
+    "car_rentals": ("id", "name", "location", "price_tier", "start_date", "end_date", "booked"),
+    "hotels": ("id", "name", "location", "price_tier", "checkin_date", "checkout_date", "booked"),
+    "trip_recommendations": ("id", "name", "location", "keywords", "booked"),
+}
+
+
+def _filters_digest(filters: dict) -> str:
+    return hashlib.sha256(json.dumps(filters, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:8]
+
+
+def encode_cursor(table: str, filters: dict, position: int) -> str:
+    """Opaque continuation token: where the next page starts, bound to the table and filters.
+
+    ``position`` is the last id returned for id-ordered pages, or the offset of
+    the next page for ranked ones.
+    """
+    payload = f"{table}:{_filters_digest(filters)}:{position}"
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, table: str, filters: dict) -> int:
+    """The position to continue from; ValueError if the cursor belongs to another search"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_table, digest, position = base64.urlsafe_b64decode(padded).decode("utf-8").split(":")
+        position = int(position)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor. Repeat the search without a cursor.")
+    if cursor_table != table or digest != _filters_digest(filters):
+        raise ValueError("This cursor belongs to a different search. Repeat the search without a cursor.")
+    return position
+
+
+def fts_phrase(text: str) -> Optional[str]:
+    """FTS5 query requiring every word of ``text`` as a prefix, e.g. "zur"* AND "air"*"""
+    words = re.findall(r"\w+", text.lower())
+    return " AND ".join(f'"{word}"*' for word in words) or None
+
+
+def fts_match(text_filters: dict[str, list[str]]) -> Optional[str]:
+    """MATCH expression for column -> alternatives (any alternative may match)"""
+    clauses = []
+    for column, alternatives in text_filters.items():
+        phrases = [phrase for phrase in map(fts_phrase, alternatives) if phrase]
+        if phrases:
+            clauses.append(f"{column} : ({' OR '.join(f'({phrase})' for phrase in phrases)})")
+    return " AND ".join(clauses) or None
+
+
+def like_conditions(text_filters: dict[str, list[str]]) -> list[tuple[str, list]]:
+    """Substring conditions for the same filters, for databases without the FTS indexes"""
+    conditions = []
+    for column, alternatives in text_filters.items():
+        alternatives = [a.strip() for a in alternatives if a.strip()]
+        if alternatives:
+            clause = " OR ".join(f"t.{column} LIKE ?" for _ in alternatives)
+            conditions.append((f"({clause})", [f"%{a}%" for a in alternatives]))
+    return conditions
+
+
+def price_tier_conditions(price_tier: Optional[str]) -> list[tuple[str, list]]:
+    """Tiers starting with any of the comma-separated names, ignoring case.
+
+    The tier names differ between the downloaded sample and generated data, so
+    a prefix ("upper", "lux") matches whatever the database calls its tiers.
+    LIKE without a leading wildcard is a range search on the NOCASE tier index.
+    """
+    tiers = [tier.strip() for tier in (price_tier or "").split(",") if tier.strip()]
+    if not tiers:
+        return []
+    clause = " OR ".join("t.price_tier LIKE ? ESCAPE '\\'" for _ in tiers)
+    escaped = [re.sub(r"([\\%_])", r"\\\1", tier) + "%" for tier in tiers]
+    return [(f"({clause})", escaped)]
+
+
+def _as_date(value: Union[date, datetime]) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def date_overlap_conditions(
+    start_column: str,
+    end_column: str,
+    start: Optional[Union[date, datetime]],
+    end: Optional[Union[date, datetime]],
+    nights: bool = False,
+) -> list[tuple[str, list]]:
+    """Listings whose [start_column, end_column] days overlap the requested days.
+
+    Days are inclusive at both ends, as for a rental. With ``nights`` (a hotel
+    stay) the end day is the checkout day, so the listing must cover at least
+    one night from ``start`` to ``end``: a stay ending on the requested
+    check-in day doesn't count. Compares ISO date strings, so stored dates
+    with or without a time part both work and the date indexes stay usable.
+    ValueError if ``start`` is after ``end`` (or not before it, for nights).
+    """
+    start = _as_date(start) if start else None
+    end = _as_date(end) if end else None
+    if start and end and (start > end or (nights and start == end)):
+        raise ValueError(f"{start_column} {start} is {'not before' if nights else 'after'} {end_column} {end}.")
+    conditions = []
+    if end:
+        # Starts on or before the last requested day (before the checkout day, for nights)
+        last = end if nights else end + timedelta(days=1)
+        conditions.append((f"t.{start_column} < ?", [last.isoformat()]))
+    if start:
+        # Ends on or after the first requested day (after the check-in day, for nights)
+        first = start + timedelta(days=1) if nights else start
+        conditions.append((f"t.{end_column} >= ?", [first.isoformat()]))
+    return conditions
+
+
+def build_listing_search_query(
+    table: str,
+    conditions: list[tuple[str, list]],
+    after_id: Optional[int] = None,
+    limit: int = 10,
+    detailed: bool = False,
+    match: Optional[str] = None,
+    offset: int = 0,
+    candidates: int = 1000,
+) -> tuple[str, list]:
+    """(sql, params) for one page of a listing search; conditions use the alias ``t``.
+
+    With ``match``, rows come from the FTS index ordered by relevance and paged
+    by ``offset``. Every match is scored, but only the best ``candidates`` are
+    kept for paging, so the sort stays bounded for broad terms (a city, a
+    common keyword). Otherwise rows are keyset-paginated in id order after
+    ``after_id``.
+    """
+    columns = "t.*" if detailed else ", ".join(f"t.{column}" for column in LISTING_COLUMNS[table])
+    params = []
+    if match:
+        fts = f"{table}_fts"
+        matches = f"SELECT {fts}.rowid AS id, {fts}.rank AS rank FROM {fts}"
+        if conditions:
+            # CROSS JOIN keeps the FTS index as the driving loop; a prefix range on the
+            # tier index would otherwise probe the FTS table once per listing in the tier
+            matches += f" CROSS JOIN {table} t ON t.id = {fts}.rowid"
+        matches += f" WHERE {fts} MATCH ?"
+        params.append(match)
+        for condition, condition_params in conditions:
+            matches += f" AND {condition}"
+            params.extend(condition_params)
+        query = (
+            f"SELECT {columns} FROM ({matches} ORDER BY {fts}.rank LIMIT ?) m JOIN {table} t ON t.id = m.id"
+            " ORDER BY m.rank LIMIT ? OFFSET ?"
+        )
+        params.extend([candidates, limit, offset])
+        return query, params
+
+    query = f"SELECT {columns} FROM {table} t WHERE 1 = 1"
+    for condition, condition_params in conditions:
+        query += f" AND {condition}"
+        params.extend(condition_params)
+    if after_id is not None:
+        query += " AND t.id > ?"
+        params.append(after_id)
+    query += " ORDER BY t.id LIMIT ?"
+    params.append(limit)
+    return query, params
+
+
+def search_listings(
+    table: str,
+    text_filters: dict[str, list[str]],
+    conditions: list[tuple[str, list]],
+    filters: dict,
+    limit: Optional[int],
+    cursor: Optional[str],
+    detailed: bool,
+) -> dict:
+    """One page of a listing search as {"results": [...], "next_cursor": ...}"""
+    limit = max(1, min(limit or settings.search_page_size, settings.search_max_rows))
+    try:
+        position = decode_cursor(cursor, table, filters) if cursor else None
+    except ValueError as e:
+        return {"error": str(e)}
+
+    # One extra row tells whether there is a next page
+    match = fts_match(text_filters)
+    if match:
+        offset = position or 0
+        candidates = settings.search_rank_candidates
+        # One candidate past the cap tells whether matches were left out
+        query, params = build_listing_search_query(
+            table, conditions, limit=limit + 1, detailed=detailed, match=match, offset=offset,
+            candidates=candidates + 1,
+        )
+        try:
+            rows = db.fetch_all(query, params, name=f"search_{table}")
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            match = None
+        else:
+            within = max(0, candidates - offset)
+            page = {"results": rows[:min(limit, within)]}
+            if len(rows) > limit and offset + limit < candidates:
+                page["next_cursor"] = encode_cursor(table, filters, offset + limit)
+            elif len(rows) > within:
+                page["truncated"] = (
+                    f"Only the {candidates} best matches can be listed; narrow the search to see the others."
+                )
+            return page
+
+    query, params = build_listing_search_query(
+        table, like_conditions(text_filters) + conditions, position, limit + 1, detailed
+    )
+    rows = db.fetch_all(query, params, name=f"search_{table}")
+    page = {"results": rows[:limit]}
+    if len(rows) > limit:
+        page["next_cursor"] = encode_cursor(table, filters, rows[limit - 1]["id"])
+    return page
+
+@tool
+def fetch_user_flight_information(config: RunnableConfig) -> list[dict]:
+    """Fetch all tickets for the user along with corresponding flight information and seat assignments."""
+    if settings.verbose_logging:
+        logger.info("🎫 TOOL CALLED: fetch_user_flight_information")
     
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    column_names = [column[0] for column in cursor.description]
-    results = [dict(zip(column_names, row)) for row in rows]
+    configuration = config.get("configurable", {})
+    passenger_id = configuration.get("passenger_id", None)
+    
+    if settings.verbose_logging:
+        logger.info(f"👤 Passenger ID: {passenger_id}")
+    
+    if not passenger_id:
+        if settings.verbose_logging:
+            logger.warning("⚠️ No passenger ID configured")
+        return [{"error": "No passenger ID configured"}]
 
-    cursor.close()
-    conn.close()
+    return db.fetch_all(USER_FLIGHTS_QUERY, (passenger_id,), name="user_flights")
 
-    return results
+@tool
+def search_flights(
+    departure_airport: Optional[str] = None,
+    arrival_airport: Optional[str] = None,
+    start_time: Optional[Union[date, datetime]] = None,
+    end_time: Optional[Union[date, datetime]] = None,
+    limit: int = 20,
+) -> list[dict]:
+    """Search for flights based on departure airport, arrival airport, and departure time range."""
+    query, params = build_flight_search_query(
+        departure_airport, arrival_airport, start_time, end_time, limit
+    )
+    return db.fetch_all(query, params, name="search_flights")
 
 @tool
 def update_ticket_to_new_flight(
@@ -186,23 +423,11 @@ def update_ticket_to_new_flight(
     if not passenger_id:
         return "No passenger ID configured."
 
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
     # Check if new flight exists
-    cursor.execute(
-        "SELECT departure_airport, arrival_airport, scheduled_departure FROM flights WHERE flight_id = ?",
-        (new_flight_id,),
-    )
-    new_flight = cursor.fetchone()
-    if not new_flight:
-        cursor.close()
-        conn.close()
+    new_flight_dict = db.fetch_one(FLIGHT_BY_ID_QUERY, (new_flight_id,), name="flight_by_id")
+    if not new_flight_dict:
         return "Invalid new flight ID provided."
     
-    column_names = [column[0] for column in cursor.description]
-    new_flight_dict = dict(zip(column_names, new_flight))
-    
     # Check timing constraints
     timezone = pytz.timezone("Etc/GMT-3")
     current_time = datetime.now(tz=timezone)
@@ -214,25 +439,17 @@ def update_ticket_to_new_flight(
         return f"Not permitted to reschedule to a flight that is less than 3 hours from the current time. Selected flight is at {departure_time}."
 
     # Check if ticket exists and belongs to user
-    cursor.execute(
-        "SELECT * FROM tickets WHERE ticket_no = ? AND passenger_id = ?",
-        (ticket_no, passenger_id),
-    )
-    current_ticket = cursor.fetchone()
+    current_ticket = db.fetch_one(TICKET_OWNER_QUERY, (ticket_no, passenger_id), name="ticket_owner")
     if not current_ticket:
-        cursor.close()
-        conn.close()
         return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
 
-    # Update the ticket
-    cursor.execute(
-        "UPDATE ticket_flights SET flight_id = ? WHERE ticket_no = ?",
-        (new_flight_id, ticket_no),
-    )
-    conn.commit()
-
-    cursor.close()
-    conn.close()
+    # Update the ticket and invalidate the cached user info in one commit
+    with db.transaction("update_ticket") as conn:
+        conn.execute(
+            "UPDATE ticket_flights SET flight_id = ? WHERE ticket_no = ?",
+            (new_flight_id, ticket_no),
+        )
+        conn.execute(BUMP_ITINERARY_VERSION, (passenger_id,))
     return "Ticket successfully updated to new flight."
 
 @tool
@@ -243,25 +460,14 @@ def cancel_ticket(ticket_no: str, *, config: RunnableConfig) -> str:
     if not passenger_id:
         return "No passenger ID configured."
     
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
     # Check if user owns the ticket
-    cursor.execute(
-        "SELECT ticket_no FROM tickets WHERE ticket_no = ? AND passenger_id = ?",
-        (ticket_no, passenger_id),
-    )
-    current_ticket = cursor.fetchone()
+    current_ticket = db.fetch_one(TICKET_OWNER_QUERY, (ticket_no, passenger_id), name="ticket_owner")
     if not current_ticket:
-        cursor.close()
-        conn.close()
         return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
 
-    cursor.execute("DELETE FROM ticket_flights WHERE ticket_no = ?", (ticket_no,))
-    conn.commit()
-
-    cursor.close()
-    conn.close()
+    with db.transaction("cancel_ticket") as conn:
+        conn.execute("DELETE FROM ticket_flights WHERE ticket_no = ?", (ticket_no,))
+        conn.execute(BUMP_ITINERARY_VERSION, (passenger_id,))
     return "Ticket successfully cancelled."
 
 # Car Rental Tools
@@ -272,43 +478,46 @@ def search_car_rentals(
     price_tier: Optional[str] = None,
     start_date: Optional[Union[datetime, date]] = None,
     end_date: Optional[Union[datetime, date]] = None,
-) -> list[dict]:
-    """Search for car rentals based on location, name, price tier, start date, and end date."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM car_rentals WHERE 1=1"
-    params = []
-
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    detailed: bool = False,
+) -> dict:
+    """Search for car rentals based on location, name, price tier, start date, and end date.
+
+    Location and name match words or word prefixes, best matches first.
+    ``price_tier`` is one or more comma-separated tier names or name prefixes,
+    ignoring case, as in the ``price_tier`` of earlier results ("lux" finds
+    "Luxury"). Only rentals whose rental days include at least one day from
+    ``start_date`` to ``end_date`` (both inclusive) are returned.
+    Returns one page of results (up to ``limit``) with the key columns; set
+    ``detailed`` for every column. If there are more matches, pass the returned
+    ``next_cursor`` as ``cursor`` with the same filters to get the next page.
+    """
+    text_filters = {}
     if location:
-        query += " AND location LIKE ?"
-        params.append(f"%{location}%")
+        text_filters["location"] = [location]
     if name:
-        query += " AND name LIKE ?"
-        params.append(f"%{name}%")
-    
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    column_names = [column[0] for column in cursor.description]
-    
-    conn.close()
+        text_filters["name"] = [name]
 
-    return [dict(zip(column_names, row)) for row in results]
+    try:
+        conditions = price_tier_conditions(price_tier) + date_overlap_conditions(
+            "start_date", "end_date", start_date, end_date
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+
+    filters = {
+        "location": location, "name": name, "price_tier": price_tier,
+        "start_date": start_date, "end_date": end_date,
+    }
+    return search_listings("car_rentals", text_filters, conditions, filters, limit, cursor, detailed)
 
 @tool
 def book_car_rental(rental_id: int) -> str:
     """Book a car rental by its ID."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    cursor.execute("UPDATE car_rentals SET booked = 1 WHERE id = ?", (rental_id,))
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
+    if db.execute("UPDATE car_rentals SET booked = 1 WHERE id = ?", (rental_id,)) > 0:
         return f"Car rental {rental_id} successfully booked."
     else:
-        conn.close()
         return f"No car rental found with ID {rental_id}."
 
 # Hotel Tools
@@ -319,43 +528,47 @@ def search_hotels(
     price_tier: Optional[str] = None,
     checkin_date: Optional[Union[datetime, date]] = None,
     checkout_date: Optional[Union[datetime, date]] = None,
-) -> list[dict]:
-    """Search for hotels based on location, name, price tier, check-in date, and check-out date."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM hotels WHERE 1=1"
-    params = []
-
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    detailed: bool = False,
+) -> dict:
+    """Search for hotels based on location, name, price tier, check-in date, and check-out date.
+
+    Location and name match words or word prefixes, best matches first.
+    ``price_tier`` is one or more comma-separated tier names or name prefixes,
+    ignoring case, as in the ``price_tier`` of earlier results ("lux" finds
+    "Luxury"). Only hotels available for at least one night of the stay from
+    ``checkin_date`` to ``checkout_date`` are returned; a hotel whose checkout
+    is on ``checkin_date`` has no night in common.
+    Returns one page of results (up to ``limit``) with the key columns; set
+    ``detailed`` for every column. If there are more matches, pass the returned
+    ``next_cursor`` as ``cursor`` with the same filters to get the next page.
+    """
+    text_filters = {}
     if location:
-        query += " AND location LIKE ?"
-        params.append(f"%{location}%")
+        text_filters["location"] = [location]
     if name:
-        query += " AND name LIKE ?"
-        params.append(f"%{name}%")
-    
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    column_names = [column[0] for column in cursor.description]
+        text_filters["name"] = [name]
 
-    conn.close()
-
-    return [dict(zip(column_names, row)) for row in results]
+    try:
+        conditions = price_tier_conditions(price_tier) + date_overlap_conditions(
+            "checkin_date", "checkout_date", checkin_date, checkout_date, nights=True
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+
+    filters = {
+        "location": location, "name": name, "price_tier": price_tier,
+        "checkin_date": checkin_date, "checkout_date": checkout_date,
+    }
+    return search_listings("hotels", text_filters, conditions, filters, limit, cursor, detailed)
 
 @tool
 def book_hotel(hotel_id: int) -> str:
     """Book a hotel by its ID."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    cursor.execute("UPDATE hotels SET booked = 1 WHERE id = ?", (hotel_id,))
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
+    if db.execute("UPDATE hotels SET booked = 1 WHERE id = ?", (hotel_id,)) > 0:
         return f"Hotel {hotel_id} successfully booked."
     else:
-        conn.close()
         return f"No hotel found with ID {hotel_id}."
 
 # Excursion Tools
@@ -364,76 +577,66 @@ def search_trip_recommendations(
     location: Optional[str] = None,
     name: Optional[str] = None,
     keywords: Optional[str] = None,
-) -> list[dict]:
-    """Search for trip recommendations based on location, name, and keywords."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM trip_recommendations WHERE 1=1"
-    params = []
-
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    detailed: bool = False,
+) -> dict:
+    """Search for trip recommendations based on location, name, and keywords.
+
+    Location, name and any of the comma-separated keywords match words or
+    word prefixes, best matches first. Returns one page of results (up to
+    ``limit``) with the key columns; set ``detailed`` for every column,
+    including the details text. If there are
+    more matches, pass the returned ``next_cursor`` as ``cursor`` with the same
+    filters to get the next page.
+    """
+    text_filters = {}
     if location:
-        query += " AND location LIKE ?"
-        params.append(f"%{location}%")
+        text_filters["location"] = [location]
     if name:
-        query += " AND name LIKE ?"
-        params.append(f"%{name}%")
+        text_filters["name"] = [name]
     if keywords:
-        keyword_list = keywords.split(",")
-        keyword_conditions = " OR ".join(["keywords LIKE ?" for _ in keyword_list])
-        query += f" AND ({keyword_conditions})"
-        params.extend([f"%{keyword.strip()}%" for keyword in keyword_list])
-
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    column_names = [column[0] for column in cursor.description]
-
-    conn.close()
+        # Any of the comma-separated keywords
+        text_filters["keywords"] = keywords.split(",")
 
-    return [dict(zip(column_names, row)) for row in results]
+    filters = {"location": location, "name": name, "keywords": keywords}
+    return search_listings("trip_recommendations", text_filters, [], filters, limit, cursor, detailed)
 
 @tool
 def book_excursion(recommendation_id: int) -> str:
     """Book an excursion by its recommendation ID."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    cursor.execute(
+    if db.execute(
         "UPDATE trip_recommendations SET booked = 1 WHERE id = ?", (recommendation_id,)
-    )
-    conn.commit()
-
-    if cursor.rowcount > 0:
-        conn.close()
+    ) > 0:
         return f"Trip recommendation {recommendation_id} successfully booked."
     else:
-        conn.close()
         return f"No trip recommendation found with ID {recommendation_id}."
 
 # Web Search Tool
-@tool
-def tavily_search(query: str) -> str:
+WEB_SEARCH_UNAVAILABLE = "Web search temporarily unavailable - API key not configured."
+
+def _tavily_search(query: str) -> str:
     """Search the web for current information using Tavily."""
     try:
-        from tavily import TavilyClient
-        
-        if not settings.tavily_api_key:
-            return "Web search temporarily unavailable - API key not configured."
-        
-        tavily = TavilyClient(api_key=settings.tavily_api_key)
-        response = tavily.search(query=query, search_depth="basic", max_results=3)
-        
-        if response and "results" in response:
-            results = []
-            for result in response["results"][:3]:
-                results.append(f"Title: {result.get('title', 'N/A')}\nContent: {result.get('content', 'N/A')}\nURL: {result.get('url', 'N/A')}")
-            return "\n\n".join(results)
-        else:
-            return "No search results found."
-            
+        return get_web_search().search(query)
+    except WebSearchUnavailable:
+        return WEB_SEARCH_UNAVAILABLE
+    except Exception as e:
+        return f"Search error: {str(e)}"
+
+async def _atavily_search(query: str) -> str:
+    """Search the web for current information using Tavily."""
+    try:
+        return await get_web_search().asearch(query)
+    except WebSearchUnavailable:
+        return WEB_SEARCH_UNAVAILABLE
     except Exception as e:
         return f"Search error: {str(e)}"
 
+tavily_search = StructuredTool.from_function(
+    func=_tavily_search, coroutine=_atavily_search, name="tavily_search"
+)
+
 # Collect all tools
 ALL_TOOLS = [
     lookup_policy,
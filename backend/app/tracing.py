@@ -0,0 +1,292 @@
+"""
+Per-request flight recorder: span timelines of recent and slow chat requests
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .config import settings
+from .metrics import graph_node
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class RequestTrace:
+    """Timeline of one request: graph nodes, tools, LLM calls and SQL as spans"""
+
+    def __init__(self, session_id: str, endpoint: str, max_spans: int = 1000):
+        self.request_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.endpoint = endpoint
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.duration = None
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.max_spans = max_spans
+        self.spans: list[dict] = []
+        self.dropped_spans = 0
+        # run_id -> open span of a LangChain run
+        self._open: dict[UUID, dict] = {}
+
+    def _offset_ms(self, at: float) -> float:
+        return round((at - self.start) * 1000, 3)
+
+    def add(self, kind: str, name: str, start: float, end: float, **attrs):
+        """Record a finished span; perf_counter timestamps"""
+        # Appends come from the event loop and tool worker threads; list.append is atomic
+        if len(self.spans) >= self.max_spans:
+            self.dropped_spans += 1
+            return
+        self.spans.append({
+            "kind": kind,
+            "name": name,
+            "start_ms": self._offset_ms(start),
+            "duration_ms": round((end - start) * 1000, 3),
+            **attrs,
+        })
+
+    def open(self, run_id: UUID, kind: str, name: str, **attrs):
+        self._open[run_id] = {"kind": kind, "name": name, "start": time.perf_counter(), **attrs}
+
+    def close(self, run_id: UUID, **attrs):
+        span = self._open.pop(run_id, None)
+        if span is not None:
+            kind, name, start = span.pop("kind"), span.pop("name"), span.pop("start")
+            self.add(kind, name, start, time.perf_counter(), **span, **attrs)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+        self.status = "error" if self.error else "ok"
+        self._open.clear()
+
+    def to_dict(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "session_id": self.session_id,
+            "endpoint": self.endpoint,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"]),
+            "dropped_spans": self.dropped_spans,
+        }
+
+
+class FlightRecorder:
+    """Ring buffer of the last finished requests, plus a JSONL log of slow ones"""
+
+    def __init__(self, capacity: int, slow_threshold: float, slow_log: str):
+        self.slow_threshold = slow_threshold
+        self.slow_log = slow_log
+        self._recent = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        # One writer thread: record() runs on the request path (often the event loop) and
+        # must not wait on disk, and a single writer keeps appended lines whole
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-trace")
+
+    def record(self, trace: RequestTrace):
+        with self._lock:
+            self._recent.append(trace)
+        if self.slow_log and self.slow_threshold and trace.duration >= self.slow_threshold:
+            try:
+                self._writer.submit(self._write_slow, trace)
+            except RuntimeError:
+                # Shut down: the timeline stays in the ring buffer only
+                pass
+
+    def close(self):
+        """Finish writing queued slow timelines"""
+        self._writer.shutdown(wait=True)
+
+    def _write_slow(self, trace: RequestTrace):
+        line = json.dumps(trace.to_dict(), default=str)
+        try:
+            directory = os.path.dirname(self.slow_log)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.slow_log, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            logger.warning(
+                f"Slow request {trace.request_id} ({trace.endpoint}, session {trace.session_id}) "
+                f"took {trace.duration:.1f}s; timeline written to {self.slow_log}"
+            )
+        except OSError as e:
+            logger.warning(f"Could not write slow request timeline: {e}")
+
+    def recent(self, session_id: str) -> list[dict]:
+        with self._lock:
+            traces = [t for t in self._recent if t.session_id == session_id]
+        return [t.to_dict() for t in traces]
+
+    def slow(self, session_id: str, limit: int = 50) -> list[dict]:
+        """Slow timelines of the session from the JSONL log, most recent last"""
+        if not self.slow_log or not os.path.exists(self.slow_log):
+            return []
+        matches = deque(maxlen=limit)
+        needle = json.dumps(session_id)
+        with open(self.slow_log, "r", encoding="utf-8") as f:
+            for line in f:
+                # Cheap substring test before parsing every line
+                if needle in line:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # The writer thread is still appending this line
+                        continue
+                    if entry.get("session_id") == session_id:
+                        matches.append(entry)
+        return list(matches)
+
+
+recorder = FlightRecorder(
+    capacity=settings.trace_buffer_size,
+    slow_threshold=settings.trace_slow_threshold,
+    slow_log=settings.trace_slow_log,
+)
+
+_current: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("request_trace", default=None)
+
+
+@contextmanager
+def request_trace(session_id: str, endpoint: str):
+    """Trace the block as one request and hand it to the flight recorder"""
+    if not settings.trace_enabled:
+        yield None
+        return
+    trace = RequestTrace(session_id, endpoint, settings.trace_max_spans)
+    token = _current.set(trace)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.error = repr(e)
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # A streaming generator finalized from another context
+            pass
+        trace.finish()
+        recorder.record(trace)
+
+
+@contextmanager
+def span(kind: str, name: str, **attrs):
+    """Record the block as a span of the current request, if one is traced"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(kind, name, start, time.perf_counter(), **attrs)
+
+
+def hash_args(value: Any) -> str:
+    """Short digest of tool arguments: enough to spot repeats without storing PII"""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:12]
+
+
+def _token_usage(response) -> dict:
+    """Input/output token counts of an LLMResult, when the provider reports them"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {"input_tokens": usage.get("input_tokens"), "output_tokens": usage.get("output_tokens")}
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage:
+        return {
+            "input_tokens": token_usage.get("prompt_tokens"),
+            "output_tokens": token_usage.get("completion_tokens"),
+        }
+    return {}
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """Turns graph node, tool and chat model runs into spans of the current request"""
+
+    run_inline = True
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id: UUID, tags: Optional[list] = None,
+        metadata: Optional[dict] = None, **kwargs: Any
+    ):
+        trace = _current.get()
+        if trace is None:
+            return
+        node = graph_node(kwargs.get("name"), tags, metadata)
+        if node is not None:
+            trace.open(run_id, "node", node)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any):
+        trace = _current.get()
+        if trace is not None:
+            trace.close(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        trace = _current.get()
+        if trace is not None:
+            trace.close(run_id, error=type(error).__name__)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, inputs: Optional[dict] = None, **kwargs: Any):
+        trace = _current.get()
+        if trace is not None:
+            name = kwargs.get("name") or (serialized or {}).get("name", "unknown")
+            trace.open(run_id, "tool", name, args_hash=hash_args(inputs if inputs is not None else input_str))
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs: Any):
+        trace = _current.get()
+        if trace is not None:
+            trace.close(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        trace = _current.get()
+        if trace is not None:
+            trace.close(run_id, error=type(error).__name__)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs: Any):
+        trace = _current.get()
+        if trace is None:
+            return
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or kwargs.get("name") or (serialized or {}).get("name", "unknown")
+        trace.open(run_id, "llm", model, node=metadata.get("langgraph_node"), messages=sum(len(m) for m in messages))
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        trace = _current.get()
+        if trace is not None:
+            trace.close(run_id, **_token_usage(response))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        trace = _current.get()
+        if trace is not None:
+            trace.close(run_id, error=type(error).__name__)
+
+
+_callback_handler = TraceCallbackHandler()
+
+
+def callbacks() -> list:
+    """Callbacks to add to every agent run's config"""
+    return [_callback_handler] if settings.trace_enabled else []
@@ -0,0 +1,192 @@
+"""
+Web search backends for the tavily_search tool, with a shared result cache
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import weakref
+from typing import Optional
+
+from .cache import MISSING, SingleFlight, TTLCache, normalize_query
+from .config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MAX_RESULTS = 3
+
+
+class WebSearchUnavailable(Exception):
+    """The backend can't search at all (e.g. no API key); not worth retrying"""
+
+
+class TavilyBackend:
+    """Tavily API with one long-lived client (and connection pool) per process"""
+
+    name = "tavily"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+        # AsyncTavilyClient wraps an httpx.AsyncClient, which is tied to one event loop
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _check_key(self):
+        if not self.api_key:
+            raise WebSearchUnavailable()
+
+    def client(self):
+        self._check_key()
+        with self._lock:
+            if self._client is None:
+                from tavily import TavilyClient
+                self._client = TavilyClient(api_key=self.api_key)
+            return self._client
+
+    def async_client(self):
+        self._check_key()
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            from tavily import AsyncTavilyClient
+            client = self._async_clients[loop] = AsyncTavilyClient(api_key=self.api_key)
+        return client
+
+    def search(self, query: str) -> dict:
+        return self.client().search(query=query, search_depth="basic", max_results=MAX_RESULTS)
+
+    async def asearch(self, query: str) -> dict:
+        return await self.async_client().search(query=query, search_depth="basic", max_results=MAX_RESULTS)
+
+
+class StubBackend:
+    """Offline backend for CI, benchmarks and load tests.
+
+    Answers from a JSON file mapping normalized queries to Tavily-style
+    result lists when one is configured, otherwise with deterministic
+    placeholder results derived from the query. ``latency`` simulates the
+    network round trip.
+    """
+
+    name = "stub"
+
+    def __init__(self, fixture_file: str = "", latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.fixtures = {}
+        if fixture_file:
+            with open(fixture_file, "r", encoding="utf-8") as f:
+                self.fixtures = {normalize_query(q): results for q, results in json.load(f).items()}
+
+    def _response(self, query: str) -> dict:
+        self.calls += 1
+        results = self.fixtures.get(normalize_query(query))
+        if results is None:
+            digest = hashlib.sha256(query.encode("utf-8")).hexdigest()[:8]
+            results = [
+                {
+                    "title": f"Result {i + 1} for {query}",
+                    "content": f"Offline stub content {digest}-{i + 1} about {query}.",
+                    "url": f"https://example.com/search/{digest}/{i + 1}",
+                }
+                for i in range(MAX_RESULTS)
+            ]
+        return {"query": query, "results": results}
+
+    def search(self, query: str) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._response(query)
+
+    async def asearch(self, query: str) -> dict:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._response(query)
+
+
+def format_search_results(response) -> str:
+    if response and "results" in response:
+        results = []
+        for result in response["results"][:MAX_RESULTS]:
+            results.append(f"Title: {result.get('title', 'N/A')}\nContent: {result.get('content', 'N/A')}\nURL: {result.get('url', 'N/A')}")
+        return "\n\n".join(results)
+    else:
+        return "No search results found."
+
+
+class WebSearch:
+    """Cached web search: normalized query -> formatted results.
+
+    Concurrent misses for the same query share one backend call, so an
+    agent retrying a query (or many sessions asking the same thing) costs a
+    single request per TTL. Errors are not cached.
+    """
+
+    def __init__(self, backend, cache_size: int = 512, ttl: Optional[float] = None):
+        self.backend = backend
+        self.cache = TTLCache(maxsize=cache_size, ttl=ttl)
+        self._flight = SingleFlight()
+
+    def search(self, query: str) -> str:
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached
+        return self._flight.do(key, lambda: self._fetch(key, query))
+
+    async def asearch(self, query: str) -> str:
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached
+        return await self._flight.ado(key, lambda: self._afetch(key, query))
+
+    def stats(self) -> dict:
+        """Cache stats where ``misses`` are backend calls; callers that shared one are ``coalesced``"""
+        stats = self.cache.stats()
+        stats["coalesced"] = self._flight.coalesced
+        stats["misses"] -= stats["coalesced"]
+        return stats
+
+    def _fetch(self, key: str, query: str) -> str:
+        result = format_search_results(self.backend.search(query))
+        self.cache.set(key, result)
+        return result
+
+    async def _afetch(self, key: str, query: str) -> str:
+        result = format_search_results(await self.backend.asearch(query))
+        self.cache.set(key, result)
+        return result
+
+
+def create_backend():
+    """Build the backend selected by ``settings.web_search_backend``"""
+    if settings.web_search_backend == "stub":
+        return StubBackend(settings.web_search_stub_file, settings.web_search_stub_latency)
+    if settings.web_search_backend != "tavily":
+        raise ValueError(
+            f"Unknown web search backend '{settings.web_search_backend}' (expected 'tavily' or 'stub')"
+        )
+    return TavilyBackend(settings.tavily_api_key)
+
+
+# Process-wide search, created on first use
+_web_search: Optional[WebSearch] = None
+_web_search_lock = threading.Lock()
+
+
+def get_web_search() -> WebSearch:
+    global _web_search
+    with _web_search_lock:
+        if _web_search is None:
+            _web_search = WebSearch(
+                create_backend(),
+                cache_size=settings.web_search_cache_size,
+                ttl=settings.web_search_cache_ttl,
+            )
+            logger.info(f"Web search backend: {_web_search.backend.name}")
+        return _web_search
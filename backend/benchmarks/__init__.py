@@ -0,0 +1 @@
+# Empty __init__.py to make benchmarks runnable with python -m
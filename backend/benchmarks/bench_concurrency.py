@@ -0,0 +1,94 @@
+"""
+Concurrent /chat conversations on a single worker, using the offline fake chat model
+
+With the async request path, N conversations whose LLM turn takes L seconds
+should finish in roughly L seconds total (not N * L), and /health should keep
+answering in milliseconds while they run. Exits non-zero otherwise.
+
+Run from the backend directory:
+    python -m benchmarks.bench_concurrency --sessions 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+
+async def run(sessions: int, latency: float, max_health_ms: float) -> bool:
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(latency)
+
+    import httpx
+    from app import db
+    from app.main import app
+
+    from .fixtures import build_travel_db
+
+    tmp = tempfile.mkdtemp()
+    db.configure(build_travel_db(os.path.join(tmp, "bench.sqlite")))
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            # Warm up graph compilation outside the measured window
+            await client.post("/chat", json={"message": "hello", "session_id": "warmup"})
+
+            health_latencies = []
+            done = asyncio.Event()
+
+            async def probe_health():
+                while not done.is_set():
+                    start = time.perf_counter()
+                    await client.get("/health")
+                    health_latencies.append(time.perf_counter() - start)
+                    await asyncio.sleep(0.02)
+
+            async def converse(i: int):
+                response = await client.post(
+                    "/chat", json={"message": f"question {i}", "session_id": f"bench-{i}"}
+                )
+                return response.status_code
+
+            prober = asyncio.create_task(probe_health())
+            start = time.perf_counter()
+            statuses = await asyncio.gather(*(converse(i) for i in range(sessions)))
+            elapsed = time.perf_counter() - start
+            done.set()
+            await prober
+
+    errors = sum(1 for status in statuses if status != 200)
+    serial = sessions * latency
+    print(f"sessions={sessions} llm_latency={latency:.2f}s errors={errors}")
+    print(f"wall time {elapsed:.2f}s (serial would be >= {serial:.2f}s)")
+    if health_latencies:
+        print(f"/health during load: max {max(health_latencies) * 1000:.1f}ms over {len(health_latencies)} probes")
+    db.close_all()
+
+    failures = []
+    if errors:
+        failures.append(f"{errors} of {sessions} conversations failed")
+    # Concurrent if the whole batch took well under two sequential LLM turns
+    if elapsed >= latency * 2 + 1:
+        failures.append(f"took {elapsed:.2f}s, expected under {latency * 2 + 1:.2f}s")
+    if health_latencies and max(health_latencies) * 1000 > max_health_ms:
+        failures.append(f"/health took {max(health_latencies) * 1000:.1f}ms (limit {max_health_ms:.0f}ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("OK" if not failures else f"{len(failures)} failure(s)")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--max-health-ms", type=float, default=250, help="Slowest acceptable /health under load")
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.sessions, args.latency, args.max_health_ms))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
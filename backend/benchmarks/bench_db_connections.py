@@ -0,0 +1,95 @@
+"""
+Tool query latency with a fresh sqlite3.connect per call vs. the pooled connections
+
+Runs the exact queries the tools build, on a migrated database, once through the
+connect/query/close pattern the tools used before pooling and once through
+``db.fetch_all``, so the difference is the connection strategy alone. Run from
+the backend directory:
+    python -m benchmarks.bench_db_connections
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from app import db
+from app.config import settings
+from app.migrations import migrate
+from app.tools import (
+    USER_FLIGHTS_QUERY,
+    build_flight_search_query,
+    build_listing_search_query,
+    fts_match,
+)
+
+from .fixtures import build_travel_db, passenger_id
+
+
+def legacy_fetch_all(db_file: str, query: str, params) -> list[dict]:
+    """The connect/query/close pattern the tools used before pooling."""
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    column_names = [column[0] for column in cursor.description]
+    results = [dict(zip(column_names, row)) for row in rows]
+    cursor.close()
+    conn.close()
+    return results
+
+
+def timed(fn, iterations: int) -> list[float]:
+    fn()  # warm up
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def report(name: str, before: list[float], after: list[float]):
+    def p(samples, q):
+        return statistics.quantiles(samples, n=100)[q - 1]
+
+    print(
+        f"{name:<32} connect p50={p(before, 50):8.1f}us p95={p(before, 95):8.1f}us | "
+        f"pooled p50={p(after, 50):8.1f}us p95={p(after, 95):8.1f}us | "
+        f"speedup x{statistics.median(before) / statistics.median(after):.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--passengers", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = build_travel_db(os.path.join(tmp, "bench.sqlite"), passengers=args.passengers)
+        migrate(db_file)
+        db.configure(db_file)
+        pid = passenger_id(args.passengers // 2)
+
+        # (name, sql, params) as the tools run them
+        cases = [
+            ("search_flights", *build_flight_search_query(departure_airport="ZRH")),
+            ("fetch_user_flight_information", USER_FLIGHTS_QUERY, (pid,)),
+            ("search_hotels", *build_listing_search_query(
+                "hotels", [], limit=settings.search_page_size + 1, match=fts_match({"location": ["Basel"]}),
+                candidates=settings.search_rank_candidates + 1,
+            )),
+        ]
+        for name, query, params in cases:
+            report(
+                name,
+                timed(lambda: legacy_fetch_all(db_file, query, params), args.iterations),
+                timed(lambda: db.fetch_all(query, params, name=name), args.iterations),
+            )
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
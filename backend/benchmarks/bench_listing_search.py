@@ -0,0 +1,116 @@
+"""
+Listing search: FTS5 MATCH against the LIKE scans it replaced
+
+Times the hotel and excursion search queries on generated databases three ways:
+the original unpaged ``LIKE '%x%'`` query, the same LIKE filters paged in id
+order (the fallback on databases without migration 3), and the ranked FTS5
+page the tools now run. Broad terms are slower under FTS5: ranking has to score
+every match where a paged LIKE stops at the first matches in id order, and the
+comparison columns say how much slower. Selective and missing terms are where
+the LIKE scan has to read the whole table and FTS5 wins. Run from the backend
+directory:
+    python -m benchmarks.bench_listing_search --listings 10000,100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from app import db
+from app.config import settings
+from app.migrations import migrate
+from app.tools import build_listing_search_query, fts_match, like_conditions
+
+from .bench_tools import measure
+from .fixtures import build_travel_db
+
+PAGE = 11  # search_page_size + 1, as search_listings asks for
+
+# (label, table, text filters)
+CASES = [
+    ("hotels: location (broad)", "hotels", {"location": ["Zurich"]}),
+    ("hotels: name (selective)", "hotels", {"name": ["Hotel 4242"]}),
+    ("hotels: location + name prefix", "hotels", {"location": ["gen"], "name": ["hotel 77"]}),
+    ("hotels: no match", "hotels", {"name": ["Nonexistent"]}),
+    ("excursions: keywords (any of 2)", "trip_recommendations", {"keywords": ["museum", "lake"]}),
+    ("excursions: keyword (rare)", "trip_recommendations", {"keywords": ["castle"], "location": ["lugano"]}),
+]
+
+
+def unpaged_like(table: str, text_filters: dict) -> tuple[str, list]:
+    """The query the tools ran before pagination and FTS: every column of every match"""
+    query = f"SELECT * FROM {table} t WHERE 1 = 1"
+    params = []
+    for condition, condition_params in like_conditions(text_filters):
+        query += f" AND {condition}"
+        params.extend(condition_params)
+    return query, params
+
+
+def variants(table: str, text_filters: dict) -> dict:
+    return {
+        "LIKE (unpaged)": unpaged_like(table, text_filters),
+        "LIKE (page)": build_listing_search_query(table, like_conditions(text_filters), limit=PAGE),
+        "FTS5 (ranked page)": build_listing_search_query(
+            table, [], limit=PAGE, match=fts_match(text_filters), candidates=settings.search_rank_candidates
+        ),
+    }
+
+
+def ratio(baseline_ms: float, fts_ms: float) -> str:
+    """"x3.2 faster" or "x29.8 slower" for the FTS page against a baseline"""
+    if fts_ms <= baseline_ms:
+        return f"x{baseline_ms / fts_ms:.1f} faster"
+    return f"x{fts_ms / baseline_ms:.1f} slower"
+
+
+def run(listings: int, iterations: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        db_file = build_travel_db(os.path.join(tmp, "search.sqlite"), passengers=100, flights=200, listings=listings)
+        migrate(db_file)
+        print(f"\n# {listings} listings per table (built and indexed in {time.perf_counter() - start:.1f}s)")
+        print(
+            f"{'case':<34} {'variant':<20} {'rows':>6} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'vs unpaged':>15} {'vs LIKE page':>15}"
+        )
+        db.configure(db_file)
+        slower = []
+        try:
+            for label, table, text_filters in CASES:
+                p50 = {}
+                for variant, (query, params) in variants(table, text_filters).items():
+                    rows = len(db.fetch_all(query, params))
+                    stats = measure(lambda i: db.fetch_all(query, params), iterations)
+                    p50[variant] = stats["p50_ms"]
+                    speedups = ["", ""]
+                    if variant.startswith("FTS"):
+                        speedups = [ratio(p50[base], stats["p50_ms"]) for base in ("LIKE (unpaged)", "LIKE (page)")]
+                        if stats["p50_ms"] > p50["LIKE (page)"]:
+                            slower.append(label)
+                    print(
+                        f"{label:<34} {variant:<20} {rows:>6} {stats['p50_ms']:8.3f} {stats['p95_ms']:8.3f} "
+                        f"{speedups[0]:>15} {speedups[1]:>15}"
+                    )
+        finally:
+            db.close_all()
+        if slower:
+            print(
+                f"Slower under FTS5 ranking than the paged LIKE: {', '.join(slower)} "
+                "(ranking scores every match; a paged LIKE stops at the first ones in id order)"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--listings", default="10000,100000", help="Rows per listing table")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    for listings in args.listings.split(","):
+        run(int(listings), args.iterations)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
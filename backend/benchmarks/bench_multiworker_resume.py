@@ -0,0 +1,132 @@
+"""
+Resume a pending approval on a different worker process via the SQLite checkpointer
+
+Starts two independent uvicorn processes that share one checkpoint database,
+interrupts a conversation before sensitive_tools on the first, then checks the
+status and approves it on the second, and finally checks the first sees the
+finished thread. Exits non-zero if any step fails. Run from the backend
+directory:
+    python -m benchmarks.bench_multiworker_resume
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .fixtures import build_travel_db
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEMO_PASSENGER = "3442 587242"
+DEMO_TICKET = "7240005432906569"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_worker(workdir: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_healthy(client: httpx.Client, url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.get(f"{url}/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Worker at {url} did not become healthy")
+
+
+def step(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<48} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    return result
+
+
+def run() -> bool:
+    workdir = tempfile.mkdtemp()
+    db_file = build_travel_db(os.path.join(workdir, "travel2.sqlite"), passengers=200)
+    conn = sqlite3.connect(db_file)
+    conn.execute("INSERT INTO tickets VALUES (?, ?, ?)", (DEMO_TICKET, "DEMO01", DEMO_PASSENGER))
+    conn.execute("INSERT INTO ticket_flights VALUES (?, 1, 'Economy', 100)", (DEMO_TICKET,))
+    conn.execute("INSERT INTO boarding_passes VALUES (?, 1, 1, '12A')", (DEMO_TICKET,))
+    conn.commit()
+    conn.close()
+
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "fake",
+        "CHECKPOINTER": "sqlite",
+        "CHECKPOINT_DB": os.path.join(workdir, "checkpoints.sqlite"),
+    }
+    ports = [free_port(), free_port()]
+    workers = [start_worker(workdir, port, env) for port in ports]
+    url_a, url_b = (f"http://127.0.0.1:{port}" for port in ports)
+    session_id = "multiworker-demo"
+    failures = []
+
+    try:
+        with httpx.Client(timeout=60) as client:
+            wait_healthy(client, url_a)
+            wait_healthy(client, url_b)
+
+            message = f"call:cancel_ticket {json.dumps({'ticket_no': DEMO_TICKET})}"
+            step("worker A: /chat (interrupts before cancel)", lambda: client.post(
+                f"{url_a}/chat", json={"message": message, "session_id": session_id}
+            ).raise_for_status())
+
+            status = step("worker B: /chat/{id}/status", lambda: client.get(
+                f"{url_b}/chat/{session_id}/status"
+            ).json())
+            if status.get("next_actions") != ["sensitive_tools"]:
+                failures.append(f"worker B did not see the pending approval: {status}")
+
+            result = step("worker B: /chat/continue (approve)", lambda: client.post(
+                f"{url_b}/chat/continue", params={"session_id": session_id, "approve": True}
+            ).json())
+            if "successfully cancelled" not in result.get("response", ""):
+                failures.append(f"approval did not run the tool: {result}")
+
+            final = step("worker A: /chat/{id}/status", lambda: client.get(
+                f"{url_a}/chat/{session_id}/status"
+            ).json())
+            if final.get("has_interrupt") or final.get("messages_count") != status.get("messages_count", 0) + 2:
+                failures.append(f"worker A does not see the resumed thread: {final}")
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait(timeout=10)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("OK" if not failures else f"{len(failures)} failure(s)")
+    return not failures
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__.splitlines()[1]).parse_args()
+    sys.exit(0 if run() else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Latency of one AI message with several safe tool calls: serial vs. the limited ToolNode
+
+Builds the safe tool node the agent uses around artificially delayed tools
+(sync and async), one that fails and one that exceeds its timeout, and checks
+the turn takes about as long as the slowest tool rather than the sum, with
+every other result intact. Also checks a tool calling ``interrupt()`` pauses
+the graph instead of becoming an error result. Exits non-zero otherwise. Run from the backend
+directory:
+    python -m benchmarks.bench_parallel_tools --delay 0.5 --calls 6
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.types import Command, interrupt
+
+from app.agent import ToolCallLimiter, create_tool_node_with_fallback
+
+
+def delayed_tools(delay: float):
+    @tool
+    def slow_sync_search(query: str) -> str:
+        """Sync tool standing in for a SQLite search."""
+        time.sleep(delay)
+        return f"sync results for {query}"
+
+    @tool
+    async def slow_async_search(query: str) -> str:
+        """Async tool standing in for an embedding or web search call."""
+        await asyncio.sleep(delay)
+        return f"async results for {query}"
+
+    @tool
+    def broken_search(query: str) -> str:
+        """Tool that always fails."""
+        raise RuntimeError("backend unavailable")
+
+    @tool
+    async def hung_search(query: str) -> str:
+        """Tool that never answers in time."""
+        await asyncio.sleep(3600)
+        return "unreachable"
+
+    @tool
+    async def confirming_search(query: str) -> str:
+        """Tool that asks the user before answering."""
+        return f"confirmed {interrupt('Search for ' + query + '?')}"
+
+    return [slow_sync_search, slow_async_search, broken_search, hung_search, confirming_search]
+
+
+def tool_graph(node, checkpointer=None):
+    """ToolNode needs a graph runtime, so run it as the only node of one"""
+    builder = StateGraph(MessagesState)
+    builder.add_node("safe_tools", node)
+    builder.add_edge(START, "safe_tools")
+    builder.add_edge("safe_tools", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def tool_calls(names: list[str]) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": name, "args": {"query": f"q{i}"}, "id": f"call_{i}"}
+            for i, name in enumerate(names)
+        ],
+    )
+
+
+async def run(delay: float, calls: int, concurrency: int) -> bool:
+    tools = delayed_tools(delay)
+    timeout = delay * 2
+    node = create_tool_node_with_fallback(
+        tools, ToolCallLimiter(max_concurrency=concurrency, default_timeout=timeout)
+    )
+    graph = tool_graph(node)
+    failures = []
+
+    # Only delayed tools: the turn should cost about one delay
+    names = [("slow_sync_search", "slow_async_search")[i % 2] for i in range(calls)]
+    start = time.perf_counter()
+    result = await graph.ainvoke({"messages": [tool_calls(names)]})
+    results = result["messages"][1:]
+    elapsed = time.perf_counter() - start
+    serial = delay * calls
+    print(f"{calls} delayed calls, serial estimate            {serial * 1000:8.1f} ms")
+    print(f"{calls} delayed calls, limited ToolNode           {elapsed * 1000:8.1f} ms")
+    if [m.status for m in results] != ["success"] * calls:
+        failures.append(f"expected {calls} successful results, got {results}")
+    expected = delay * -(-calls // concurrency)
+    if elapsed > expected + delay * 0.5:
+        failures.append(f"took {elapsed:.2f}s, expected about {expected:.2f}s")
+
+    # Mixed with a failing and a hung tool: both are reported, the rest survive
+    names = ["slow_sync_search", "slow_async_search", "broken_search", "hung_search"]
+    start = time.perf_counter()
+    result = await graph.ainvoke({"messages": [tool_calls(names)]})
+    results = result["messages"][1:]
+    elapsed = time.perf_counter() - start
+    print(f"mixed calls with a failure and a timeout       {elapsed * 1000:8.1f} ms")
+    for message in results:
+        print(f"    {message.name or '?':<20} {message.status:<8} {str(message.content)[:60]!r}")
+    statuses = {m.name: m.status for m in results}
+    wanted = {
+        "slow_sync_search": "success",
+        "slow_async_search": "success",
+        "broken_search": "error",
+        "hung_search": "error",
+    }
+    if statuses != wanted:
+        failures.append(f"unexpected statuses {statuses}")
+    # The timeout covers execution only; calls queued behind the limit wait first
+    queued = delay * (-(-len(names) // concurrency) - 1)
+    if elapsed > timeout + queued + delay * 0.5:
+        failures.append(f"a hung tool held the turn for {elapsed:.2f}s (timeout {timeout:.2f}s)")
+
+    # interrupt() is graph control flow, not a tool failure: the turn pauses and resumes
+    graph = tool_graph(node, InMemorySaver())
+    config = {"configurable": {"thread_id": "interrupt"}}
+    result = await graph.ainvoke({"messages": [tool_calls(["confirming_search"])]}, config)
+    paused = bool(result.get("__interrupt__"))
+    result = await graph.ainvoke(Command(resume="yes"), config)
+    resumed = result["messages"][-1].content
+    print(f"tool calling interrupt()                       paused={paused} resumed={resumed!r}")
+    if not paused or resumed != "confirmed yes":
+        failures.append(f"interrupt() inside a tool didn't pause the graph (resumed with {resumed!r})")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("OK" if not failures else f"{len(failures)} failure(s)")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--delay", type=float, default=0.5, help="Seconds each delayed tool takes")
+    parser.add_argument("--calls", type=int, default=6, help="Delayed tool calls in one message")
+    parser.add_argument("--concurrency", type=int, default=32, help="ToolCallLimiter max_concurrency")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.delay, args.calls, args.concurrency)) else 1)
+
+
+if __name__ == "__main__":
+    main()
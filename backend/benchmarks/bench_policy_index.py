@@ -0,0 +1,105 @@
+"""
+Policy vector index microbenchmark: float64 dot product vs float32/int8, single vs batched
+
+Builds clustered synthetic embeddings (768-d, like text-embedding-004) at
+several corpus sizes and times top-k search the previous way (a float64 query
+list against the matrix, which upcasts all of it on every call) against
+VectorIndex in float32 and int8, one query at a time and 32 per matmul.
+Reports p50/p95 latency per query, allocation peaks and index size. Exits
+non-zero if float32 search disagrees with the exact ranking or int8 recall@k
+drops below --min-recall. Run from the backend directory:
+    python -m benchmarks.bench_policy_index --chunks 1000,10000,50000
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from app.retrieval import VectorIndex
+
+from .bench_tools import measure
+
+DIM = 768
+K = 5
+BATCH = 32
+
+
+def corpus(chunks: int, seed: int = 7) -> tuple[np.ndarray, np.ndarray]:
+    """(vectors, queries): chunks scattered around topics, queries near random chunks"""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(max(1, chunks // 50), DIM))
+    vectors = topics[rng.integers(len(topics), size=chunks)] + 0.6 * rng.normal(size=(chunks, DIM))
+    queries = vectors[rng.integers(chunks, size=256)] + 0.4 * rng.normal(size=(256, DIM))
+    return vectors.astype(np.float32), queries
+
+
+def previous_top_k(matrix: np.ndarray, query: list, k: int) -> np.ndarray:
+    """The retriever's old scoring: unnormalized, float64, a fresh upcast of the matrix per query"""
+    scores = np.array(query) @ matrix.T
+    top = np.argpartition(scores, -k)[-k:]
+    return top[np.argsort(-scores[top])]
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = queries @ normalized.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall(found: np.ndarray, expected: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, expected)]))
+
+
+def run(chunks: int, iterations: int, min_recall: float) -> bool:
+    vectors, queries = corpus(chunks)
+    query_lists = [q.tolist() for q in queries]
+    # The previous retriever scored raw vectors; give it normalized rows so rankings are comparable
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    exact = exact_top_k(vectors, queries, K)
+    indexes = {"float32": VectorIndex(vectors), "int8": VectorIndex(vectors, quantize=True)}
+
+    print(f"\n# {chunks} chunks x {DIM} dims")
+    print(f"{'variant':<28} {'index MB':>9} {'p50 ms/q':>9} {'p95 ms/q':>9} {'alloc KB':>9} {'recall':>7}")
+
+    def row(name: str, megabytes: float, stats: dict, per: int, found: np.ndarray):
+        print(
+            f"{name:<28} {megabytes:>9.1f} {stats['p50_ms'] / per:>9.3f} {stats['p95_ms'] / per:>9.3f} "
+            f"{stats['alloc_peak_kb'] / per:>9.1f} {recall(found, exact):>7.3f}"
+        )
+
+    n = len(queries)
+    found = np.array([previous_top_k(normalized, q, K) for q in query_lists])
+    stats = measure(lambda i: previous_top_k(normalized, query_lists[i % n], K), iterations)
+    row("float64 dot (previous)", normalized.nbytes / 2**20, stats, 1, found)
+
+    ok = True
+    for name, index in indexes.items():
+        found = index.search_batch(queries, K)[0]
+        stats = measure(lambda i: index.search(query_lists[i % n], K), iterations)
+        row(f"{name} single", index.nbytes / 2**20, stats, 1, found)
+        batches = [queries[start:start + BATCH] for start in range(0, n, BATCH)]
+        stats = measure(lambda i: index.search_batch(batches[i % len(batches)], K), max(1, iterations // 4))
+        row(f"{name} batch of {BATCH}", index.nbytes / 2**20, stats, BATCH, found)
+
+        score = recall(found, exact)
+        if name == "float32" and score < 1.0:
+            print(f"FAIL: float32 search disagrees with the exact ranking (recall {score:.3f})")
+            ok = False
+        if name == "int8" and score < min_recall:
+            print(f"FAIL: int8 recall@{K} {score:.3f} is below {min_recall}")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", default="1000,10000,50000", help="Policy chunk counts")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Lowest acceptable int8 recall@5")
+    args = parser.parse_args()
+    ok = all([run(int(chunks), args.iterations, args.min_recall) for chunks in args.chunks.split(",")])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
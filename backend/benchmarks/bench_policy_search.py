@@ -0,0 +1,170 @@
+"""
+Offline policy search: BM25, vectors and their reciprocal rank fusion
+
+Checks that lookup-style questions find the right section of a small FAQ with
+BM25 alone, that a hybrid retriever keeps answering (from BM25) when the
+embedding API fails at startup or mid-flight, then times BM25 and hybrid
+queries over generated corpora with a deterministic fake embedding model.
+Exits non-zero if a check fails. Run from the backend directory:
+    python -m benchmarks.bench_policy_search --chunks 100,1000,10000
+"""
+import argparse
+import random
+import sys
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.retrieval import VectorStoreRetriever
+
+from .bench_tools import measure
+
+FAQ = [
+    "## Invoice questions\nAn invoice for your booking is sent by email after payment. "
+    "Request a corrected invoice within 30 days.",
+    "## Booking changes\nYou can change your flight date or destination online up to 24 hours "
+    "before departure. A change fee applies to Economy Light fares.",
+    "## Cancellation and refunds\nTickets cancelled within 24 hours of booking are refunded in full. "
+    "Later cancellations are refunded according to the fare conditions, minus taxes already paid.",
+    "## Baggage allowance\nEconomy passengers may check one bag of 23 kg. Extra bags and sports "
+    "equipment must be booked in advance.",
+    "## Payment methods\nWe accept credit cards, PayPal and bank transfer. Payments in instalments "
+    "are not available.",
+    "## Seat reservation\nSeats can be reserved during booking or in Manage my booking. "
+    "Preferred seats are charged.",
+    "## Travelling with pets\nSmall dogs and cats travel in the cabin in an approved carrier up to 8 kg.",
+    "## Special assistance\nPassengers with reduced mobility can request wheelchair assistance "
+    "at least 48 hours before the flight.",
+]
+
+# (question, title of the section that must rank first)
+QUESTIONS = [
+    ("Can I get a refund if I cancel my ticket?", "Cancellation and refunds"),
+    ("how many kg of baggage can I check", "Baggage allowance"),
+    ("Is it possible to change the date of my flight?", "Booking changes"),
+    ("do you take paypal", "Payment methods"),
+    ("can my dog fly with me in the cabin", "Travelling with pets"),
+    ("I need a wheelchair at the airport", "Special assistance"),
+    ("corrected invoice", "Invoice questions"),
+]
+
+
+class FailingEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings that can be switched to fail like an unreachable API"""
+
+    failing: bool = False
+
+    def embed_documents(self, texts):
+        if self.failing:
+            raise ConnectionError("embedding API unreachable")
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        if self.failing:
+            raise ConnectionError("embedding API unreachable")
+        return super().embed_query(text)
+
+
+class MemoryStore:
+    """EmbeddingStore stand-in that embeds without touching the disk cache"""
+
+    def embed(self, texts, client):
+        return client.embed_documents(texts)
+
+
+def title(doc: dict) -> str:
+    return doc["page_content"].split("\n", 1)[0].lstrip("# ")
+
+
+def check_answers() -> bool:
+    docs = [{"page_content": text} for text in FAQ]
+    retriever = VectorStoreRetriever.from_docs(docs, None, MemoryStore(), mode="bm25")
+    ok = True
+    for question, expected in QUESTIONS:
+        hits = retriever.query(question, k=2)
+        found = title(hits[0]) if hits else "(nothing)"
+        status = "ok" if found == expected else "FAIL"
+        print(f"bm25: {question:<48} -> {found:<26} {status}")
+        ok = ok and found == expected
+    return ok
+
+
+def check_fallbacks() -> bool:
+    docs = [{"page_content": text} for text in FAQ]
+
+    # Unreachable at startup: the corpus is built for BM25 alone
+    client = FailingEmbeddings(size=64, failing=True)
+    retriever = VectorStoreRetriever.from_docs(docs, client, MemoryStore(), mode="hybrid")
+    hits = retriever.query("refund after cancelling", k=1)
+    startup_ok = bool(hits) and title(hits[0]) == "Cancellation and refunds"
+    print(f"hybrid, embeddings down at startup: {'ok' if startup_ok else 'FAIL'}")
+
+    # Unreachable mid-flight: BM25 answers, and the answer isn't cached as final
+    client = FailingEmbeddings(size=64)
+    retriever = VectorStoreRetriever.from_docs(docs, client, MemoryStore(), mode="hybrid")
+    fused = retriever.query("baggage allowance", k=2)
+    client.failing = True
+    fallback = retriever.query("extra bags", k=2)
+    fallback_ok = (
+        all("similarity" in hit and "bm25" in hit for hit in fused[:1])
+        and bool(fallback) and all("similarity" not in hit for hit in fallback)
+        and title(fallback[0]) == "Baggage allowance"
+        and retriever.result_cache.get(("policies", "extra bags", 2), None) is None
+    )
+    print(f"hybrid, embeddings down mid-flight: {'ok' if fallback_ok else 'FAIL'}")
+    return startup_ok and fallback_ok
+
+
+WORDS = [
+    "baggage", "refund", "cancel", "change", "seat", "payment", "invoice", "pet", "wheelchair", "meal",
+    "lounge", "upgrade", "miles", "visa", "passport", "delay", "compensation", "infant", "sports", "fare",
+]
+
+
+def generated_docs(count: int, seed: int = 3) -> list[dict]:
+    """Sections mixing common policy words with a long tail of rarer terms"""
+    rng = random.Random(seed)
+    vocabulary = WORDS + [f"term{n}" for n in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return [
+        {"page_content": f"## Section {i}\n" + " ".join(rng.choices(vocabulary, weights, k=60)) + f" rule{i}"}
+        for i in range(count)
+    ]
+
+
+def run_scales(scales: list[int], iterations: int):
+    print(f"\n{'mode':<8} {'chunks':>7} {'p50 us':>9} {'p95 us':>9} {'alloc KB':>9}")
+    questions = [f"{word} term{n * 37} rule{n}" for n, word in enumerate(WORDS)]
+    for chunks in scales:
+        docs = generated_docs(chunks)
+        embeddings = DeterministicFakeEmbedding(size=768)
+        vectors = embeddings.embed_documents([doc["page_content"] for doc in docs])
+        for mode in ("bm25", "hybrid"):
+            retriever = VectorStoreRetriever(docs, vectors if mode == "hybrid" else None, embeddings, mode=mode)
+            # Warm the embedding cache so the timings are search only, as for a repeated question
+            for question in questions:
+                retriever.embedding_cache.set(question, embeddings.embed_query(question))
+
+            def search(i):
+                retriever.result_cache.clear()
+                retriever.query(questions[i % len(questions)], k=2)
+
+            stats = measure(search, iterations)
+            print(
+                f"{mode:<8} {chunks:>7} {stats['p50_ms'] * 1000:>9.1f} {stats['p95_ms'] * 1000:>9.1f} "
+                f"{stats['alloc_peak_kb']:>9.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", default="100,1000,10000", help="Generated corpus sizes to time")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    ok = check_answers()
+    ok = check_fallbacks() and ok
+    run_scales([int(c) for c in args.chunks.split(",")], args.iterations)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
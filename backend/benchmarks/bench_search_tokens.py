@@ -0,0 +1,102 @@
+"""
+Prompt tokens of the hotel / car rental / excursion search results, paged vs unpaged
+
+Runs broad listing searches against generated databases and compares the
+ToolMessage the assistant would receive from the paginated, compact tools with
+the previous behaviour (every matching row, every column, price tier and dates
+ignored). Token counts use
+langchain's approximate counter, the same one the history window uses. Exits
+non-zero if a first page is ever larger than the unpaged result. Run from the
+backend directory:
+    python -m benchmarks.bench_search_tokens --listings 500,5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from langchain_core.messages import ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.prebuilt.tool_node import msg_content_output
+
+from app import db, tools
+from app.migrations import migrate
+
+from .fixtures import build_travel_db
+
+# Generated listings start within two months of today
+STAY = ((date.today() + timedelta(days=20)).isoformat(), (date.today() + timedelta(days=23)).isoformat())
+
+# (label, tool, args, table, conditions of the unpaged query)
+CASES = [
+    ("search_hotels(location)", tools.search_hotels, {"location": "Zurich"}, "hotels",
+     [("location LIKE ?", ["%Zurich%"])]),
+    ("search_hotels(all)", tools.search_hotels, {}, "hotels", []),
+    ("search_car_rentals(location)", tools.search_car_rentals, {"location": "Basel"}, "car_rentals",
+     [("location LIKE ?", ["%Basel%"])]),
+    # Price tier and dates used to be ignored: every hotel in the city came back
+    ("search_hotels(location+tier+dates)", tools.search_hotels,
+     {"location": "Zurich", "price_tier": "Upscale, Luxury",
+      "checkin_date": STAY[0], "checkout_date": STAY[1]}, "hotels",
+     [("location LIKE ?", ["%Zurich%"])]),
+    ("search_trip_recommendations(keyword)", tools.search_trip_recommendations, {"keywords": "museum"},
+     "trip_recommendations", [("(keywords LIKE ?)", ["%museum%"])]),
+]
+
+
+def message_tokens(output) -> int:
+    """Approximate tokens of a tool output as a ToolMessage"""
+    return count_tokens_approximately([ToolMessage(content=msg_content_output(output), tool_call_id="call_0")])
+
+
+def unpaged(table: str, conditions: list) -> list[dict]:
+    """What the search tools returned before pagination: SELECT * of every match"""
+    query = f"SELECT * FROM {table} WHERE 1 = 1"
+    params = []
+    for condition, condition_params in conditions:
+        query += f" AND {condition}"
+        params.extend(condition_params)
+    return db.fetch_all(query, params)
+
+
+def run(listings: int) -> bool:
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = build_travel_db(os.path.join(tmp, "listings.sqlite"), passengers=100, flights=200, listings=listings)
+        migrate(db_file)
+        db.configure(db_file)
+        try:
+            print(f"\n# {listings} listings per table")
+            print(f"{'case':<38} {'rows':>6} {'before tok':>10} {'page tok':>9} {'pages':>6} {'saved':>7}")
+            for label, tool, args, table, conditions in CASES:
+                rows = unpaged(table, conditions)
+                before = message_tokens(rows)
+
+                page = tool.invoke(args)
+                first = message_tokens(page)
+                pages = 1
+                while "next_cursor" in page:
+                    page = tool.invoke({**args, "cursor": page["next_cursor"]})
+                    pages += 1
+
+                saved = 1 - first / before if before else 0.0
+                print(f"{label:<38} {len(rows):>6} {before:>10} {first:>9} {pages:>6} {saved:>7.1%}")
+                if first > before:
+                    print(f"FAIL: first page of {label} is larger than the unpaged result")
+                    ok = False
+        finally:
+            db.close_all()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--listings", default="500,5000", help="Rows per listing table")
+    args = parser.parse_args()
+    ok = all([run(int(n)) for n in args.listings.split(",")])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Startup cost of shifting the sample dates: legacy pandas rewrite vs. in-place SQL
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup_dates --passengers 100000 --flights 200000
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from app.data_setup import update_dates
+
+from .fixtures import generate_travel_db
+
+
+def legacy_update_dates(file: str, backup_file: str):
+    """The previous implementation: restore the backup and rewrite every table via pandas."""
+    import pandas as pd
+
+    shutil.copy(backup_file, file)
+    conn = sqlite3.connect(file)
+    tables = pd.read_sql("SELECT name FROM sqlite_master WHERE type='table';", conn).name.tolist()
+    tdf = {t: pd.read_sql(f"SELECT * from {t}", conn) for t in tables}
+    example_time = pd.to_datetime(
+        tdf["flights"]["actual_departure"].replace("\\N", pd.NaT), format="ISO8601"
+    ).max()
+    time_diff = pd.to_datetime("now").tz_localize(example_time.tz) - example_time
+    tdf["bookings"]["book_date"] = (
+        pd.to_datetime(tdf["bookings"]["book_date"].replace("\\N", pd.NaT), utc=True, format="ISO8601")
+        + time_diff
+    )
+    for column in ["scheduled_departure", "scheduled_arrival", "actual_departure", "actual_arrival"]:
+        tdf["flights"][column] = (
+            pd.to_datetime(tdf["flights"][column].replace("\\N", pd.NaT), format="ISO8601") + time_diff
+        )
+    for table_name, df in tdf.items():
+        df.to_sql(table_name, conn, if_exists="replace", index=False)
+    conn.commit()
+    conn.close()
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {elapsed * 1000:10.1f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--passengers", type=int, default=50_000)
+    parser.add_argument("--flights", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Data generated as of 90 days ago, like the stale downloaded sample, so the first shift has real work to do
+        backup = generate_travel_db(
+            os.path.join(tmp, "backup.sqlite"),
+            passengers=args.passengers,
+            flights=args.flights,
+            now=time.time() - 90 * 86400,
+        )
+
+        legacy_file = os.path.join(tmp, "legacy.sqlite")
+        timed("legacy pandas rewrite (every start)", lambda: legacy_update_dates(legacy_file, backup))
+
+        sql_file = os.path.join(tmp, "sql.sqlite")
+        shutil.copy(backup, sql_file)
+        timed("in-place SQL shift (first start)", lambda: update_dates(sql_file))
+        timed("in-place SQL shift (quick restart)", lambda: update_dates(sql_file))
+
+        # Pretend the last shift happened a day ago
+        conn = sqlite3.connect(sql_file)
+        conn.execute(
+            "UPDATE app_metadata SET value = CAST(value AS REAL) - 86400 WHERE key = 'date_shift_applied'"
+        )
+        conn.commit()
+        conn.close()
+        timed("in-place SQL shift (next-day restart)", lambda: update_dates(sql_file))
+
+
+if __name__ == "__main__":
+    main()
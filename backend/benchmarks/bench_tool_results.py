@@ -0,0 +1,106 @@
+"""
+Prompt tokens per tool result: JSON ToolMessages vs the compact encoding
+
+Runs representative tool calls against a generated database and counts the
+tokens of the ToolMessage the model would read, as ToolNode's JSON and as the
+compact tables the tool nodes now send. Token counts use langchain's
+approximate counter, the same one the history window uses. Also runs one call
+through the agent's tool node to check the encoding is applied there. Exits
+non-zero if a compact result is ever larger than its JSON. Run from the
+backend directory:
+    python -m benchmarks.bench_tool_results
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.graph import START, MessagesState, StateGraph
+from langgraph.prebuilt.tool_node import msg_content_output
+
+from app import db, tools
+from app.agent import create_tool_node_with_fallback
+from app.migrations import migrate
+from app.tool_output import encode
+
+from .fixtures import build_travel_db, passenger_id
+
+STAY = ((date.today() + timedelta(days=20)).isoformat(), (date.today() + timedelta(days=23)).isoformat())
+
+
+def cases() -> list[tuple]:
+    """(label, tool, args, config)"""
+    user = {"configurable": {"passenger_id": passenger_id(1)}}
+    return [
+        ("fetch_user_flight_information", tools.fetch_user_flight_information, {}, user),
+        ("search_flights(departure, 20)", tools.search_flights, {"departure_airport": "ZRH"}, None),
+        ("search_flights(route, 5)", tools.search_flights,
+         {"departure_airport": "ZRH", "arrival_airport": "CDG", "limit": 5}, None),
+        ("search_hotels(location)", tools.search_hotels, {"location": "Zurich"}, None),
+        ("search_car_rentals(tier+dates)", tools.search_car_rentals,
+         {"price_tier": "Economy", "start_date": STAY[0], "end_date": STAY[1]}, None),
+        ("search_trip_recommendations(detailed)", tools.search_trip_recommendations,
+         {"keywords": "museum", "detailed": True}, None),
+    ]
+
+
+def tokens(content: str) -> int:
+    return count_tokens_approximately([ToolMessage(content=content, tool_call_id="call_0")])
+
+
+def check_tool_node() -> bool:
+    """The agent's tool node sends the compact encoding of the tool's output"""
+    args = {"departure_airport": "ZRH", "limit": 3}
+    call = {"name": "search_flights", "args": args, "id": "call_0", "type": "tool_call"}
+    # ToolNode only runs inside a graph
+    builder = StateGraph(MessagesState)
+    builder.add_node("tools", create_tool_node_with_fallback([tools.search_flights]))
+    builder.add_edge(START, "tools")
+    result = builder.compile().invoke({"messages": [AIMessage(content="", tool_calls=[call])]})
+    return result["messages"][-1].content == encode(tools.search_flights.invoke(args))
+
+
+def run(passengers: int) -> bool:
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = build_travel_db(os.path.join(tmp, "results.sqlite"), passengers=passengers)
+        migrate(db_file)
+        db.configure(db_file)
+        try:
+            print(f"{'case':<40} {'json chars':>10} {'json tok':>9} {'compact tok':>12} {'saved':>7}")
+            total_json = total_compact = 0
+            for label, tool, args, config in cases():
+                output = tool.invoke(args, config)
+                as_json = msg_content_output(output)
+                json_tokens, compact_tokens = tokens(as_json), tokens(encode(output))
+                total_json += json_tokens
+                total_compact += compact_tokens
+                saved = 1 - compact_tokens / json_tokens
+                print(f"{label:<40} {len(as_json):>10} {json_tokens:>9} {compact_tokens:>12} {saved:>7.1%}")
+                if compact_tokens > json_tokens:
+                    print(f"FAIL: compact result of {label} is larger than its JSON")
+                    ok = False
+            print(f"{'total':<40} {'':>10} {total_json:>9} {total_compact:>12} {1 - total_compact / total_json:>7.1%}")
+
+            if check_tool_node():
+                print("tool node sends the compact encoding: ok")
+            else:
+                print("FAIL: the tool node did not send the compact encoding")
+                ok = False
+        finally:
+            db.close_all()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--passengers", type=int, default=1000, help="Size of the generated database")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.passengers) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Per-tool latency and allocation benchmark at several synthetic data scales
+
+Times every tool in app/tools.py through ``tool.invoke`` (as the agent calls
+them) against generated travel databases, and VectorStoreRetriever.query over
+generated policy corpora with a deterministic fake embedding model, so it runs
+fully offline. Reports p50/p95/p99 latency and tracemalloc peak allocations per
+call, and writes JSON that can be diffed between releases with --baseline. Run
+from the backend directory:
+    python -m benchmarks.bench_tools --scales 1000,10000,100000 --output bench.json
+    python -m benchmarks.bench_tools --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app import db
+from app.migrations import migrate
+from app.retrieval import VectorStoreRetriever
+from app import tools
+
+from .fixtures import AIRPORTS, CITIES, build_travel_db, passenger_id
+
+EMBEDDING_DIM = 768
+
+
+def percentiles(samples: list[float]) -> dict:
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"p50_ms": p50 * 1000, "p95_ms": p95 * 1000, "p99_ms": p99 * 1000}
+
+
+def measure(fn, iterations: int, warmup: int = 3) -> dict:
+    """Time ``fn(i)`` for each iteration, then re-run a sample under tracemalloc.
+
+    Allocations are measured in a separate pass so tracing overhead doesn't
+    leak into the latency figures.
+    """
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(warmup, warmup + iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(warmup + iterations, warmup + iterations + min(iterations, 20)):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            fn(i)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+    return {**percentiles(samples), "alloc_peak_kb": float(np.median(peaks)) / 1024, "iterations": iterations}
+
+
+def tool_cases(db_file: str, passengers: int) -> dict:
+    """name -> fn(i) invoking one tool; i varies the arguments between calls."""
+    conn = sqlite3.connect(db_file)
+    cutoff = (datetime.now().astimezone() + timedelta(days=1)).isoformat(" ")
+    future_flights = [row[0] for row in conn.execute(
+        "SELECT flight_id FROM flights WHERE scheduled_departure > ? LIMIT 1000", (cutoff,)
+    )]
+    listings = conn.execute("SELECT COUNT(*) FROM hotels").fetchone()[0]
+    conn.close()
+
+    def config(n: int) -> dict:
+        return {"configurable": {"passenger_id": passenger_id(n)}}
+
+    start = datetime.now().date()
+    return {
+        "fetch_user_flight_information": lambda i: tools.fetch_user_flight_information.invoke(
+            {}, config(i % passengers)
+        ),
+        "search_flights(route)": lambda i: tools.search_flights.invoke({
+            "departure_airport": AIRPORTS[i % len(AIRPORTS)],
+            "arrival_airport": AIRPORTS[(i + 1) % len(AIRPORTS)],
+        }),
+        "search_flights(window)": lambda i: tools.search_flights.invoke({
+            "start_time": (start + timedelta(days=i % 30)).isoformat(),
+            "end_time": (start + timedelta(days=i % 30 + 1)).isoformat(),
+        }),
+        "update_ticket_to_new_flight": lambda i: tools.update_ticket_to_new_flight.invoke(
+            {"ticket_no": f"{i % passengers:010d}000", "new_flight_id": future_flights[i % len(future_flights)]},
+            config(i % passengers),
+        ),
+        # Leg 1 of a different passenger every call, so each cancel deletes a row
+        "cancel_ticket": lambda i: tools.cancel_ticket.invoke(
+            {"ticket_no": f"{i % passengers:010d}001"}, config(i % passengers)
+        ),
+        "search_car_rentals": lambda i: tools.search_car_rentals.invoke({"location": CITIES[i % len(CITIES)]}),
+        "book_car_rental": lambda i: tools.book_car_rental.invoke({"rental_id": i % listings + 1}),
+        "search_hotels": lambda i: tools.search_hotels.invoke({"location": CITIES[i % len(CITIES)]}),
+        "book_hotel": lambda i: tools.book_hotel.invoke({"hotel_id": i % listings + 1}),
+        "search_trip_recommendations": lambda i: tools.search_trip_recommendations.invoke(
+            {"keywords": "museum, lake"}
+        ),
+        "book_excursion": lambda i: tools.book_excursion.invoke({"recommendation_id": i % listings + 1}),
+    }
+
+
+def policy_docs(count: int) -> list[dict]:
+    return [
+        {"page_content": f"## Policy section {i}\nRules for case {i}: baggage, refunds and changes."}
+        for i in range(count)
+    ]
+
+
+def retriever_cases(docs: int) -> dict:
+    embeddings = DeterministicFakeEmbedding(size=EMBEDDING_DIM)
+    corpus = policy_docs(docs)
+    vectors = np.asarray(embeddings.embed_documents([d["page_content"] for d in corpus]), dtype=np.float32)
+    retriever = VectorStoreRetriever(corpus, vectors, embeddings)
+    return {
+        # A new query each call: embedding + top-k on every call
+        "VectorStoreRetriever.query(miss)": lambda i: retriever.query(f"can I change flight {i}?", k=2),
+        # The same query: served from the result cache
+        "VectorStoreRetriever.query(hit)": lambda i: retriever.query("can I change my flight?", k=2),
+    }
+
+
+def run(scales: list[int], doc_scales: list[int], iterations: int) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for passengers in scales:
+            db_file = os.path.join(tmp, f"travel_{passengers}.sqlite")
+            start = time.perf_counter()
+            build_travel_db(db_file, passengers=passengers, flights=passengers * 2, listings=max(500, passengers // 10))
+            migrate(db_file)
+            print(f"\n# {passengers} passengers (built in {time.perf_counter() - start:.1f}s)")
+            db.configure(db_file)
+            try:
+                for name, fn in tool_cases(db_file, passengers).items():
+                    stats = measure(fn, min(iterations, passengers // 2))
+                    results.append({"case": name, "scale": passengers, **stats})
+                    print_row(name, passengers, stats)
+            finally:
+                db.close_all()
+
+    for docs in doc_scales:
+        print(f"\n# {docs} policy chunks")
+        for name, fn in retriever_cases(docs).items():
+            stats = measure(fn, iterations)
+            results.append({"case": name, "scale": docs, **stats})
+            print_row(name, docs, stats)
+
+    return {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "results": results,
+    }
+
+
+def print_row(name: str, scale: int, stats: dict, baseline: dict = None):
+    row = (
+        f"{name:<36} {scale:>8} {stats['p50_ms']:8.3f} {stats['p95_ms']:8.3f} "
+        f"{stats['p99_ms']:8.3f} {stats['alloc_peak_kb']:10.1f}"
+    )
+    if baseline:
+        row += f"  p50 x{stats['p50_ms'] / baseline['p50_ms']:.2f}"
+    print(row)
+
+
+def compare(report: dict, baseline_file: str):
+    with open(baseline_file, encoding="utf-8") as f:
+        baseline = {(r["case"], r["scale"]): r for r in json.load(f)["results"]}
+    print(f"\n# Compared with {baseline_file}")
+    for result in report["results"]:
+        previous = baseline.get((result["case"], result["scale"]))
+        if previous:
+            print_row(result["case"], result["scale"], result, previous)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", default="1000,10000", help="Passenger counts (flights = 2x)")
+    parser.add_argument("--doc-scales", default="100,1000,10000", help="Policy chunk counts")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare p50 against")
+    args = parser.parse_args()
+
+    print(f"{'case':<36} {'scale':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'alloc KB':>10}")
+    report = run(
+        [int(s) for s in args.scales.split(",")],
+        [int(s) for s in args.doc_scales.split(",")],
+        args.iterations,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        compare(report, args.baseline)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+tavily_search against the offline stub backend: cache hits and stampede protection
+
+Runs the real tool (sync and async) with WEB_SEARCH_BACKEND=stub semantics and
+a simulated round trip, and checks that concurrent identical queries and
+"persistent" retries with different casing cost one backend call, and that the
+cache stats count the callers who shared a call as coalesced, not as misses.
+Exits non-zero otherwise; needs no network. Run from the backend directory:
+    python -m benchmarks.bench_web_search --latency 0.2 --callers 50
+"""
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import web_search
+from app.tools import tavily_search
+
+
+def install_stub(latency: float) -> web_search.StubBackend:
+    backend = web_search.StubBackend(latency=latency)
+    web_search._web_search = web_search.WebSearch(backend, cache_size=512, ttl=900)
+    return backend
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<52} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    return result
+
+
+async def run(latency: float, callers: int) -> bool:
+    failures = []
+
+    backend = install_stub(latency)
+    query = "Zurich airport strike today"
+    results = await asyncio.gather(*(
+        tavily_search.ainvoke({"query": query}) for _ in range(callers)
+    ))
+    if backend.calls != 1 or len(set(results)) != 1:
+        failures.append(f"{callers} concurrent async callers made {backend.calls} backend calls")
+    print(f"{callers} concurrent async callers, backend calls: {backend.calls}")
+
+    retries = ["zurich airport strike today?", "  Zurich   Airport strike TODAY ", query]
+    timed("retries with different casing (cached)", lambda: [
+        tavily_search.invoke({"query": q}) for q in retries
+    ])
+    if backend.calls != 1:
+        failures.append(f"retries reached the backend: {backend.calls} calls")
+
+    backend = install_stub(latency)
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        timed(f"{callers} concurrent sync callers (one miss)", lambda: list(pool.map(
+            lambda _: tavily_search.invoke({"query": "Basel hotels near the station"}), range(callers)
+        )))
+    if backend.calls != 1:
+        failures.append(f"{callers} concurrent sync callers made {backend.calls} backend calls")
+    print(f"{callers} concurrent sync callers, backend calls: {backend.calls}")
+
+    stats = web_search.get_web_search().stats()
+    print(f"cache: {stats}")
+    if stats["misses"] != backend.calls or stats["coalesced"] != callers - backend.calls:
+        failures.append(f"expected {backend.calls} misses and {callers - backend.calls} coalesced, got {stats}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("OK" if not failures else f"{len(failures)} failure(s)")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated backend round trip, seconds")
+    parser.add_argument("--callers", type=int, default=50, help="Concurrent callers per query")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.latency, args.callers)) else 1)
+
+
+if __name__ == "__main__":
+    main()
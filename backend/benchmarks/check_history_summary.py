@@ -0,0 +1,137 @@
+"""
+Rolling history summary check, offline
+
+Runs a long conversation through the agent with the fake chat model and a short
+history window, then folds history with a stand-in LLM summarizer inside a graph
+that has callbacks attached. Fails if a summary carries the previous summary's
+prompt wrapper ("Existing summary:", "New lines:", the echo model's "You said:"
+around them), or if the summarizer's calls reach the graph's callbacks. Run from
+the backend directory:
+    python -m benchmarks.check_history_summary
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from typing import Annotated, TypedDict
+
+WRAPPERS = ("Existing summary:", "New lines:", "You said: Existing summary")
+
+
+def wrapper_failures(label: str, summaries: list[str]) -> list[str]:
+    return [
+        f"{label}: summary after turn {turn} contains {wrapper!r}"
+        for turn, summary in enumerate(summaries, 1)
+        for wrapper in WRAPPERS
+        if wrapper in summary
+    ]
+
+
+async def agent_summaries(turns: int) -> list[str]:
+    """Summaries after each turn of one fake-provider conversation"""
+    from app import db
+    from app.agent import get_agent
+
+    from .fixtures import build_travel_db
+
+    db.configure(build_travel_db(os.path.join(tempfile.mkdtemp(), "check.sqlite"), passengers=50))
+    agent = get_agent()
+    config = {"configurable": {"passenger_id": "3442 587242", "thread_id": "history-check"}}
+    summaries = []
+    for i in range(turns):
+        await agent.ainvoke({"messages": [("user", f"question {i}")]}, config)
+        summaries.append((await agent.aget_state(config)).values.get("summary") or "")
+    db.close_all()
+    return summaries
+
+
+async def isolated_summaries(turns: int) -> tuple[list[str], int]:
+    """Summaries from an LLM summarizer in a graph with a callback, and how many chat runs it saw"""
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.messages import AIMessage, HumanMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from langgraph.graph import END, START, StateGraph
+    from langgraph.graph.message import add_messages
+
+    from app.fake_llm import FakeChatModel
+    from app.history import HistoryManager
+
+    class NewLinesSummarizer(FakeChatModel):
+        """Answers a summary request with its new lines, as a well-behaved summarizer would"""
+
+        def _respond(self, messages):
+            request = messages[-1].content
+            summary = request.split("New lines:\n", 1)[-1].replace("\n", " ")
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=summary))])
+
+    class ChatRuns(BaseCallbackHandler):
+        def __init__(self):
+            self.count = 0
+
+        def on_chat_model_start(self, *args, **kwargs):
+            self.count += 1
+
+    class State(TypedDict):
+        messages: Annotated[list, add_messages]
+        summary: str
+
+    def reply(state: State):
+        return {"messages": [AIMessage(content=f"answer {len(state['messages'])}")]}
+
+    builder = StateGraph(State)
+    builder.add_node("manage_history", HistoryManager(NewLinesSummarizer()).as_runnable())
+    builder.add_node("reply", reply)
+    builder.add_edge(START, "manage_history")
+    builder.add_edge("manage_history", "reply")
+    builder.add_edge("reply", END)
+    graph = builder.compile()
+
+    runs = ChatRuns()
+    state = {"messages": [], "summary": ""}
+    summaries = []
+    for i in range(turns):
+        state["messages"].append(HumanMessage(content=f"question {i}"))
+        state = await graph.ainvoke(state, {"callbacks": [runs]})
+        summaries.append(state.get("summary") or "")
+    return summaries, runs.count
+
+
+async def run(turns: int) -> bool:
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["HISTORY_MAX_TURNS"] = "2"
+    from app.config import settings
+
+    failures = []
+    summaries = await agent_summaries(turns)
+    print(f"agent (fake provider): {turns} turns, final summary {len(summaries[-1])} chars")
+    if not summaries[-1]:
+        failures.append("agent: no summary after folding old turns")
+    failures += wrapper_failures("agent", summaries)
+
+    summaries, chat_runs = await isolated_summaries(turns)
+    print(f"LLM summarizer: {turns} turns, final summary {len(summaries[-1])} chars, "
+          f"{chat_runs} chat runs seen by the graph callbacks")
+    if not summaries[-1]:
+        failures.append("LLM summarizer: no summary after folding old turns")
+    failures += wrapper_failures("LLM summarizer", summaries)
+    if chat_runs:
+        failures.append(f"LLM summarizer: {chat_runs} summary calls reached the graph callbacks")
+    if any(len(summary) > settings.history_summary_max_chars for summary in summaries):
+        failures.append(f"a summary exceeds history_summary_max_chars={settings.history_summary_max_chars}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("OK" if not failures else f"{len(failures)} failure(s)")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=8)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.turns)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+EXPLAIN QUERY PLAN regression check for the tool queries
+
+Builds a synthetic travel database (or uses --db), applies the migrations and
+fails if any hot tool query plans a full table scan. Run from the backend
+directory:
+    python -m benchmarks.check_query_plans
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from app.migrations import explain_query_plan, full_scans, migrate
+from app.tools import (
+    BUMP_ITINERARY_VERSION,
+    FLIGHT_BY_ID_QUERY,
+    ITINERARY_VERSION_QUERY,
+    TICKET_OWNER_QUERY,
+    USER_FLIGHTS_QUERY,
+    build_flight_search_query,
+    build_listing_search_query,
+    date_overlap_conditions,
+    fts_match,
+    price_tier_conditions,
+)
+
+from .fixtures import build_travel_db
+
+
+def tool_queries() -> list[tuple[str, str, list]]:
+    """(name, sql, params) for every query a tool runs that must stay index-backed."""
+    start, end = "2026-01-01 00:00:00", "2026-01-08 00:00:00"
+    checkin, checkout = date.today() + timedelta(days=14), date.today() + timedelta(days=17)
+    return [
+        ("fetch_user_flight_information", USER_FLIGHTS_QUERY, ["3442 587242"]),
+        ("search_flights(departure)", *build_flight_search_query(departure_airport="ZRH")),
+        ("search_flights(arrival)", *build_flight_search_query(arrival_airport="BSL")),
+        ("search_flights(route+window)", *build_flight_search_query("ZRH", "BSL", start, end)),
+        ("search_flights(window)", *build_flight_search_query(start_time=start, end_time=end)),
+        ("update_ticket_to_new_flight(flight)", FLIGHT_BY_ID_QUERY, [1]),
+        ("update_ticket_to_new_flight(owner)", TICKET_OWNER_QUERY, ["0000000001000", "3442 587242"]),
+        (
+            "update_ticket_to_new_flight(update)",
+            "UPDATE ticket_flights SET flight_id = ? WHERE ticket_no = ?",
+            [1, "0000000001000"],
+        ),
+        ("cancel_ticket(delete)", "DELETE FROM ticket_flights WHERE ticket_no = ?", ["0000000001000"]),
+        ("fetch_user_info(version)", ITINERARY_VERSION_QUERY, ["3442 587242"]),
+        ("update/cancel(bump version)", BUMP_ITINERARY_VERSION, ["3442 587242"]),
+        # Text filters are FTS5 MATCH lookups
+        ("search_hotels(location)", *build_listing_search_query(
+            "hotels", [], limit=11, match=fts_match({"location": ["Zurich"]})
+        )),
+        ("search_trip_recommendations(keywords)", *build_listing_search_query(
+            "trip_recommendations", [], limit=11, match=fts_match({"keywords": ["museum", "lake"]})
+        )),
+        # A price tier prefix is a range search on the tier index, dates or not (date-only
+        # filters walk the id index like an unfiltered first page)
+        ("search_hotels(price tier)", *build_listing_search_query("hotels", price_tier_conditions("Luxury"))),
+        ("search_car_rentals(tier+dates, page 2)", *build_listing_search_query(
+            "car_rentals",
+            price_tier_conditions("economy") + date_overlap_conditions("start_date", "end_date", checkin, checkout),
+            100,
+        )),
+        ("search_hotels(location+tier+dates)", *build_listing_search_query(
+            "hotels",
+            price_tier_conditions("Upscale") + date_overlap_conditions(
+                "checkin_date", "checkout_date", checkin, checkout, nights=True
+            ),
+            limit=11, match=fts_match({"location": ["Zurich"]}),
+        )),
+        # Later unfiltered pages continue from the id index (the first page walks it in id order)
+        ("search_car_rentals(next page)", *build_listing_search_query("car_rentals", [], 100)),
+        ("book_car_rental", "UPDATE car_rentals SET booked = 1 WHERE id = ?", [1]),
+        ("book_hotel", "UPDATE hotels SET booked = 1 WHERE id = ?", [1]),
+        ("book_excursion", "UPDATE trip_recommendations SET booked = 1 WHERE id = ?", [1]),
+    ]
+
+
+def check(db_file: str, verbose: bool = False) -> bool:
+    migrate(db_file)
+    conn = sqlite3.connect(db_file)
+    ok = True
+    try:
+        for name, query, params in tool_queries():
+            scans = full_scans(conn, query, params)
+            status = "FULL SCAN" if scans else "ok"
+            print(f"{name:<40} {status}")
+            if verbose or scans:
+                for step in explain_query_plan(conn, query, params):
+                    print(f"    {step}")
+            ok = ok and not scans
+    finally:
+        conn.close()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", help="Check an existing database instead of a synthetic one")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan")
+    args = parser.parse_args()
+
+    if args.db:
+        ok = check(args.db, args.verbose)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            ok = check(build_travel_db(os.path.join(tmp, "plans.sqlite")), args.verbose)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Small synthetic travel2-schema database for offline benchmarks
+"""
+from app.data_generator import (  # noqa: F401 - re-exported for the benchmarks
+    AIRPORTS,
+    CITIES,
+    KEYWORDS,
+    PRICE_TIERS,
+    SCHEMA,
+    generate_travel_db,
+    passenger_id,
+    ticket_no,
+)
+
+
+def build_travel_db(path: str, passengers: int = 1000, flights: int = 2000, listings: int = 500, seed: int = 42) -> str:
+    """Write a travel2-compatible database with ``passengers * 2`` tickets."""
+    return generate_travel_db(
+        path,
+        passengers=passengers,
+        flights=flights,
+        hotels=listings,
+        car_rentals=listings,
+        excursions=listings,
+        seed=seed,
+    )
@@ -0,0 +1,239 @@
+"""
+HTTP load test of the full FastAPI stack with the scripted fake chat model
+
+Every session plays the same deterministic script through /chat,
+/chat/{id}/status and /chat/continue: a plain question, two safe tool calls, a
+ticket cancellation that stops for approval, a status check and the approval.
+The fake model (LLM_PROVIDER=fake) turns "call:<tool> {...}" messages into tool
+calls, so the numbers are server, graph and database overhead without provider
+noise. Reports throughput, latency percentiles and error rate per endpoint and
+the server's memory growth, optionally as JSON. Runs in-process over ASGI by
+default, or against a real uvicorn process with --server. Run from the backend
+directory:
+    python -m benchmarks.load_test --sessions 200 --concurrency 20
+    python -m benchmarks.load_test --server --sessions 500 --concurrency 50 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+from .fixtures import generate_travel_db, passenger_id, ticket_no
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb(pid: str = "self") -> float:
+    """Resident set size of a process in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def fake_env(latency: float) -> dict:
+    return {"LLM_PROVIDER": "fake", "FAKE_LLM_LATENCY": str(latency), "LOG_LEVEL": "WARNING"}
+
+
+def script(n: int) -> list[tuple]:
+    """(endpoint, payload, check) steps for the n-th session"""
+    search = json.dumps({"departure_airport": "ZRH", "limit": 5})
+    cancel = json.dumps({"ticket_no": ticket_no(n, 1)})
+    return [
+        ("chat", "Hi, what can you help me with?", lambda r: r["response"].startswith("You said")),
+        ("chat", f"call:search_flights {search}", lambda r: r["response"].startswith("Tool result")),
+        ("chat", "call:fetch_user_flight_information {}", lambda r: r["response"].startswith("Tool result")),
+        ("chat", f"call:cancel_ticket {cancel}", lambda r: True),
+        ("status", None, lambda r: r["next_actions"] == ["sensitive_tools"]),
+        ("continue", True, lambda r: "successfully cancelled" in r["response"]),
+        ("status", None, lambda r: not r["has_interrupt"]),
+    ]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.check_failures = defaultdict(int)
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, samples in sorted(self.latencies.items()):
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+            endpoints[name] = {
+                "requests": len(samples),
+                "rps": len(samples) / elapsed,
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "p99_ms": p99,
+                "error_rate": (self.errors[name] + self.check_failures[name]) / len(samples),
+                "http_errors": self.errors[name],
+                "check_failures": self.check_failures[name],
+            }
+        return endpoints
+
+
+async def run_session(client: httpx.AsyncClient, n: int, recorder: Recorder):
+    session_id = f"load-{n}"
+    passenger = passenger_id(n)
+    for endpoint, payload, check in script(n):
+        start = time.perf_counter()
+        if endpoint == "chat":
+            response = await client.post(
+                "/chat", json={"message": payload, "session_id": session_id, "passenger_id": passenger}
+            )
+        elif endpoint == "continue":
+            response = await client.post(
+                "/chat/continue",
+                params={"session_id": session_id, "approve": payload, "passenger_id": passenger},
+            )
+        else:
+            response = await client.get(f"/chat/{session_id}/status")
+        recorder.latencies[endpoint].append(time.perf_counter() - start)
+        if response.status_code != 200:
+            recorder.errors[endpoint] += 1
+            return
+        if not check(response.json()):
+            recorder.check_failures[endpoint] += 1
+
+
+async def drive(client: httpx.AsyncClient, sessions: int, concurrency: int, recorder: Recorder) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(n: int):
+        async with semaphore:
+            await run_session(client, n, recorder)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bounded(n) for n in range(sessions)))
+    return time.perf_counter() - start
+
+
+async def warm_up(client: httpx.AsyncClient, sessions: int):
+    """Compile the graph and fill the connection pools before measuring"""
+    await run_session(client, sessions, Recorder())
+
+
+async def run_in_process(args, workdir: str) -> dict:
+    os.environ.update(fake_env(args.latency))
+    # app.main prepares ./travel2.sqlite on import, as a server started in workdir would
+    os.chdir(workdir)
+
+    from app import db
+    from app.main import app
+
+    db.configure(os.path.join(workdir, "travel2.sqlite"))
+    recorder = Recorder()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=120) as client:
+            await warm_up(client, args.sessions)
+            rss_before = rss_mb()
+            elapsed = await drive(client, args.sessions, args.concurrency, recorder)
+            rss_after = rss_mb()
+    db.close_all()
+    return {"elapsed": elapsed, "rss_before_mb": rss_before, "rss_after_mb": rss_after, "recorder": recorder}
+
+
+async def run_server(args, workdir: str) -> dict:
+    env = {**os.environ, **fake_env(args.latency)}
+    port = args.port
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    recorder = Recorder()
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline:
+                        raise RuntimeError("Server did not become healthy")
+                await asyncio.sleep(0.2)
+            await warm_up(client, args.sessions)
+            rss_before = rss_mb(str(server.pid))
+            elapsed = await drive(client, args.sessions, args.concurrency, recorder)
+            rss_after = rss_mb(str(server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return {"elapsed": elapsed, "rss_before_mb": rss_before, "rss_after_mb": rss_after, "recorder": recorder}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=200, help="Scripted conversations to run")
+    parser.add_argument("--concurrency", type=int, default=20, help="Conversations in flight at once")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake LLM latency per turn, seconds")
+    parser.add_argument("--passengers", type=int, default=10_000, help="Size of the generated database")
+    parser.add_argument("--server", action="store_true", help="Run against a uvicorn process instead of ASGI")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+    if args.output:
+        # The in-process run changes directory into the temporary workdir
+        args.output = os.path.abspath(args.output)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # One spare passenger for the warm-up session
+        generate_travel_db(os.path.join(workdir, "travel2.sqlite"), passengers=max(args.passengers, args.sessions + 1))
+        runner = run_server if args.server else run_in_process
+        result = asyncio.run(runner(args, workdir))
+
+    elapsed = result["elapsed"]
+    endpoints = result["recorder"].report(elapsed)
+    total = sum(e["requests"] for e in endpoints.values())
+    failed = sum(e["http_errors"] + e["check_failures"] for e in endpoints.values())
+    growth = result["rss_after_mb"] - result["rss_before_mb"]
+    report = {
+        "mode": "server" if args.server else "in-process",
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "llm_latency": args.latency,
+        "elapsed_s": elapsed,
+        "requests": total,
+        "rps": total / elapsed,
+        "sessions_per_s": args.sessions / elapsed,
+        "error_rate": failed / total if total else 0.0,
+        "rss_before_mb": result["rss_before_mb"],
+        "rss_after_mb": result["rss_after_mb"],
+        "rss_growth_kb_per_session": growth * 1024 / args.sessions,
+        "endpoints": endpoints,
+    }
+
+    print(f"{report['mode']}: {args.sessions} sessions, concurrency {args.concurrency}, "
+          f"{total} requests in {elapsed:.2f}s ({report['rps']:.1f} req/s, {report['sessions_per_s']:.1f} sessions/s)")
+    print(f"{'endpoint':<10} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>8}")
+    for name, e in endpoints.items():
+        print(f"{name:<10} {e['requests']:>8} {e['rps']:>8.1f} {e['p50_ms']:>8.1f} {e['p95_ms']:>8.1f} "
+              f"{e['p99_ms']:>8.1f} {e['error_rate']:>8.1%}")
+    print(f"memory: {result['rss_before_mb']:.1f} MB -> {result['rss_after_mb']:.1f} MB "
+          f"({report['rss_growth_kb_per_session']:.1f} KB/session)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if failed == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
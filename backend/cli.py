@@ -124,10 +124,7 @@ class SimpleCliChat:
                 print(f"🎫 Passenger ID: {self.passenger_id}")
                 print(f"🆔 Session ID: {self.session_id}")
             
-            state = {
-                "messages": [("user", message)],
-                "user_info": f"Passenger ID: {self.passenger_id}"
-            }
+            state = {"messages": [("user", message)]}
             
             result = await self.agent.ainvoke(state, config)
             